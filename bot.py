@@ -13,7 +13,7 @@ from middlewares.access_control import AccessControlMiddleware
 import config
 
 import services.storage as json_storage
-from datetime import datetime, timedelta
+from services import snapshots
 
 log_dir = Path("logs")
 log_dir.mkdir(exist_ok=True)
@@ -81,50 +81,47 @@ dp.include_router(reports_router)
 async def cleanup_old_archives():
     """Удаляет из архива записи старше одного года."""
     logger.info("Запуск очистки старых архивов...")
-    one_year_ago = datetime.now() - timedelta(days=365)
 
-    archive_repairs = json_storage.get_archive_repairs()
+    # Записи с некорректной датой архивации не удаляются: хранилище
+    # держит их отдельно и под очистку они не попадают.
+    removed = await json_storage.adelete_archive_older_than(365)
 
-    recent_archive = []
-    for r in archive_repairs:
-        archive_date_str = r.get("archive_date", "01.01.1970")
-        try:
-            archive_date = datetime.strptime(archive_date_str, "%d.%m.%Y")
-        except ValueError:
-            # Некорректная/повреждённая дата — не удаляем запись молча,
-            # а сохраняем её и логируем предупреждение, чтобы данные
-            # не терялись из-за некорректного формата даты.
-            logger.warning(
-                "Некорректная дата архивации %r у ремонта ID:%s — запись сохранена без изменений.",
-                archive_date_str,
-                r.get("id"),
-            )
-            recent_archive.append(r)
-            continue
-        if archive_date > one_year_ago:
-            recent_archive.append(r)
-
-    if len(recent_archive) < len(archive_repairs):
-        json_storage.update_archive_repairs(recent_archive)
-        logger.info(
-            "Очистка завершена. Удалено %s старых записей.",
-            len(archive_repairs) - len(recent_archive),
-        )
+    if removed:
+        logger.info("Очистка завершена. Удалено %s старых записей.", removed)
     else:
         logger.info("Старых записей для удаления не найдено.")
 
 
 async def main():
     await cleanup_old_archives()
-
-    while True:
+    # Снимок отчётов по умолчанию пересчитывается в фоне (см. services.snapshots).
+    snapshot_task = asyncio.create_task(snapshots.run_refresher())
+
+    try:
+        while True:
+            try:
+                logger.info("Бот запускается...")
+                await dp.start_polling(bot)
+            except Exception:
+                logger.exception("Произошла критическая ошибка при работе бота.")
+                logger.info("Перезапуск через 10 секунд...")
+                await asyncio.sleep(10)
+                continue
+            # start_polling штатно возвращается по SIGINT/SIGTERM — это
+            # остановка, а не сбой: выходим, чтобы finally дописал журнал.
+            logger.info("Бот остановлен.")
+            break
+    finally:
+        snapshot_task.cancel()
+        # Задача должна завершиться до закрытия хранилища; пересчёт снимка,
+        # уже идущий в пуле хранилища, дождётся shutdown().
         try:
-            logger.info("Бот запускается...")
-            await dp.start_polling(bot)
+            await snapshot_task
+        except asyncio.CancelledError:
+            pass
         except Exception:
-            logger.exception("Произошла критическая ошибка при работе бота.")
-            logger.info("Перезапуск через 10 секунд...")
-            await asyncio.sleep(10)
+            logger.exception("Фоновая задача снимка отчётов завершилась с ошибкой.")
+        json_storage.shutdown()
 
 
 if __name__ == "__main__":
@@ -28,6 +28,58 @@ ALLOWED_USER_IDS = [
 BASE_DIR = Path(__file__).parent
 ACTIVE_PATH = BASE_DIR / "data" / "active_repairs.json"
 ARCHIVE_PATH = BASE_DIR / "data" / "archive_repairs.json"
+# Архив JSON-хранилища разбит на файлы по месяцам даты архивации
+# (ГГГГ-ММ.json) с манифестом manifest.json. Если каталога ещё нет,
+# архив один раз загружается из ARCHIVE_PATH и раскладывается по месяцам.
+ARCHIVE_DIR = BASE_DIR / "data" / "archive"
+
+# Бэкенд хранилища: "json" (файлы выше) или "sqlite" (один файл SQLite
+# в режиме WAL). Перенести существующие данные из JSON в SQLite:
+#   python -m services.migrations json-to-sqlite
+STORAGE_BACKEND = "json"
+SQLITE_PATH = BASE_DIR / "data" / "repairs.sqlite3"
+
+# Журнал изменений JSON-хранилища и его размер (в байтах), после которого
+# журнал сворачивается в свежие снимки active/archive.
+JOURNAL_PATH = BASE_DIR / "data" / "journal.jsonl"
+JOURNAL_COMPACT_BYTES = 512 * 1024
+
+# Когда изменения попадают на диск:
+#   "immediate" — каждая операция сразу дописывается в журнал;
+#   "batched"   — операции копятся в памяти и дописываются пачкой раз в
+#                 JOURNAL_FLUSH_INTERVAL секунд или по JOURNAL_FLUSH_BATCH
+#                 операций (при падении процесса теряется не больше пачки);
+#   "fsync"     — каждая операция дописывается и сбрасывается на диск.
+# Для SQLite "fsync" включает PRAGMA synchronous=FULL.
+STORAGE_DURABILITY = "immediate"
+JOURNAL_FLUSH_INTERVAL = 1.0
+JOURNAL_FLUSH_BATCH = 50
+
+# Размер пула потоков, в котором асинхронные хендлеры выполняют
+# блокирующие операции хранилища.
+STORAGE_WORKERS = 4
+
+# Счётчик ID ремонтов JSON-хранилища. Создаётся автоматически по данным;
+# ID удалённых ремонтов повторно не выдаются.
+ID_SEQUENCE_PATH = BASE_DIR / "data" / "id_sequence.json"
+
+# С какого размера архива отчёты считаются по колонкам NumPy (если пакет
+# numpy установлен; иначе — по дневным итогам).
+REPORTS_NUMPY_THRESHOLD = 50_000
+
+# Снимок отчётов за 4 недели и 12 месяцев, который фоновая задача
+# пересчитывает после полуночи и после изменений архива — когда данные
+# не менялись REPORT_SNAPSHOT_DEBOUNCE секунд. Хранится на диске, чтобы
+# пережить перезапуск.
+REPORT_SNAPSHOT_PATH = BASE_DIR / "data" / "report_snapshot.json"
+REPORT_SNAPSHOT_DEBOUNCE = 30.0
+
+# Сколько ремонтов показывать на одной странице списка действующих
+# ремонтов (с навигацией по страницам).
+ACTIVE_REPAIRS_PAGE_SIZE = 10
+
+# Сколько архивных ремонтов показывать на одной странице списка архива.
+ARCHIVE_PAGE_SIZE = 10
 
 # Источники (каналы) поступления ремонтов: ключ -> отображаемое имя.
 REPAIR_SOURCES = {
@@ -0,0 +1,137 @@
+"""
+Бенчмарк колоночных отчётов: services.storage.compute_reports_data
+(выборка по индексу дат и цикл по записям) против get_columnar_report
+(массивы NumPy, services.analytics) на архивах 10 тыс., 100 тыс. и
+1 млн записей, со сверкой результатов. Для сравнения приведены и
+compute_report_totals (суммы по дневным итогам архива).
+
+Архив размножается из файла, созданного data/generatetestdata.py, и
+пишется во временный каталог. Запуск из корня проекта (нужны config.py
+и NumPy):
+
+    python data/generatetestdata.py
+    python data/benchmark_analytics.py
+    python data/benchmark_analytics.py --sizes 10000 100000
+
+Строка «построение колонок» — первый отчёт после изменения архива,
+включая чтение записей и сборку массивов.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(DATA_DIR.parent))
+
+import config  # noqa: E402
+import services.storage as storage  # noqa: E402
+from benchmark_reports import load_archive, timed  # noqa: E402
+from services import analytics  # noqa: E402
+from services.backends import JsonBackend  # noqa: E402
+
+REPORTS = (("week", 4, "all"), ("month", 12, "all"), ("month", 12, "scooter"))
+
+
+def loop_totals(period_type, num_periods, source, today) -> list:
+    """Итоги compute_reports_data без списков ремонтов — для сверки."""
+    return [
+        {key: value for key, value in report.items() if key != "repairs"}
+        for report in storage.compute_reports_data(
+            period_type, num_periods, source, today=today
+        )
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--archive",
+        type=Path,
+        default=DATA_DIR / "archive_repairs.json",
+        help="файл архива (по умолчанию data/archive_repairs.json)",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="размеры архива",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="повторов каждого замера"
+    )
+    args = parser.parse_args(argv)
+    if not analytics.HAS_NUMPY:
+        print("NumPy не установлен: pip install numpy")
+        return 1
+
+    base = load_archive(args.archive, 1)
+    if not base:
+        print("Архив пуст — сначала запустите data/generatetestdata.py.")
+        return 1
+    today = max(
+        datetime.strptime(r["archive_date"], "%d.%m.%Y").date()
+        for r in base
+        if r.get("archive_date")
+    )
+    # Колоночный путь — на любом размере архива из замера.
+    config.REPORTS_NUMPY_THRESHOLD = 0
+
+    print(
+        f"{'записей':>10}{'отчёт':>20}{'циклом, мс':>14}"
+        f"{'NumPy, мс':>12}{'ускорение':>12}{'итоги дней, мс':>16}"
+    )
+    for size in args.sizes:
+        archive = load_archive(args.archive, -(-size // len(base)))[:size]
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            backend = JsonBackend(tmp / "active.json", tmp / "archive.json")
+            backend.replace_archive(archive)
+            storage.set_backend(backend)
+            try:
+                started = time.perf_counter()
+                storage.get_columnar_report("week", 4, "all", today=today)
+                build = (time.perf_counter() - started) * 1000
+                for period_type, num_periods, source in REPORTS:
+                    expected = loop_totals(period_type, num_periods, source, today)
+                    actual = storage.get_columnar_report(
+                        period_type, num_periods, source, today=today
+                    )
+                    if actual != expected:
+                        print(f"РАСХОЖДЕНИЕ на {size} записях: {period_type} {source}")
+                        return 1
+                    loop = timed(
+                        lambda: storage.compute_reports_data(
+                            period_type, num_periods, source, today=today
+                        ),
+                        args.repeat,
+                    )
+                    columnar = timed(
+                        lambda: storage.get_columnar_report(
+                            period_type, num_periods, source, today=today
+                        ),
+                        args.repeat,
+                    )
+                    totals = timed(
+                        lambda: storage.compute_report_totals(
+                            period_type, num_periods, source, today=today
+                        ),
+                        args.repeat,
+                    )
+                    name = f"{period_type} x{num_periods} {source}"
+                    print(
+                        f"{size:>10}{name:>20}{loop:>14.2f}{columnar:>12.2f}"
+                        f"{loop / columnar:>11.1f}x{totals:>16.2f}"
+                    )
+                print(f"{size:>10}{'построение колонок':>20}{'':>14}{build:>12.2f}")
+            finally:
+                storage.set_backend(None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Бенчмарк отчётов: прежний алгоритм get_reports_data (повторный проход
+по всему архиву и strptime для каждого периода) против текущего
+services.storage.compute_reports_data (одна выборка по индексу дат и
+раскладка по периодам за один проход) и compute_report_totals (суммы по
+дневным итогам архива, без чтения записей).
+
+Архив берётся из файла, созданного data/generatetestdata.py. Данные
+копируются во временный каталог, рабочие файлы бота не затрагиваются.
+Запуск из корня проекта (нужен config.py):
+
+    python data/generatetestdata.py
+    python data/benchmark_reports.py
+    python data/benchmark_reports.py --scale 10 --repeat 20
+"""
+
+import argparse
+import calendar
+import json
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(DATA_DIR.parent))
+
+import services.storage as storage  # noqa: E402
+from services.backends import JsonBackend  # noqa: E402
+
+
+def reference_reports(archive, period_type, num_periods, source_filter, today):
+    """Прежняя реализация get_reports_data (эталон для сверки и замеров)."""
+    if source_filter != "all":
+        archive = [r for r in archive if r.get("repair_type") == source_filter]
+
+    reports = []
+    for i in range(num_periods):
+        if period_type == "week":
+            current_sunday = today + timedelta(days=6 - today.weekday())
+            end = current_sunday - timedelta(weeks=i)
+            start = end - timedelta(days=6)
+        else:
+            target_month = today.month - i
+            target_year = today.year
+            while target_month <= 0:
+                target_month += 12
+                target_year -= 1
+            start = date(target_year, target_month, 1)
+            end = date(
+                target_year,
+                target_month,
+                calendar.monthrange(target_year, target_month)[1],
+            )
+
+        period_repairs = []
+        total_cost = 0
+        for repair in archive:
+            archive_date_str = repair.get("archive_date")
+            if not archive_date_str:
+                continue
+            try:
+                arch_date = datetime.strptime(archive_date_str, "%d.%m.%Y").date()
+            except ValueError:
+                continue
+            if start <= arch_date <= end:
+                period_repairs.append(repair)
+                total_cost += repair.get("cost", 0)
+        reports.append(
+            {
+                "start_date": start.strftime("%d.%m.%Y"),
+                "end_date": end.strftime("%d.%m.%Y"),
+                "bike_count": len(period_repairs),
+                "total_cost": total_cost,
+                "repairs": period_repairs,
+            }
+        )
+    reports.reverse()
+    return reports
+
+
+def _summary(reports):
+    return [
+        (
+            r["start_date"],
+            r["end_date"],
+            r["bike_count"],
+            r["total_cost"],
+            sorted(x["id"] for x in r["repairs"]),
+        )
+        for r in reports
+    ]
+
+
+def load_archive(path: Path, scale: int) -> list:
+    """
+    Читает архив и при scale > 1 размножает его копиями с новыми ID,
+    чтобы получить архив нужного размера на тех же датах.
+    """
+    with path.open("r", encoding="utf-8") as f:
+        archive = json.load(f)
+    if scale <= 1:
+        return archive
+    step = max((r.get("id", 0) for r in archive), default=0) + 1
+    return [
+        {**r, "id": r.get("id", 0) + step * copy}
+        for copy in range(scale)
+        for r in archive
+    ]
+
+
+def timed(func, repeat: int) -> float:
+    """Среднее время одного вызова в миллисекундах."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--archive",
+        type=Path,
+        default=DATA_DIR / "archive_repairs.json",
+        help="файл архива (по умолчанию data/archive_repairs.json)",
+    )
+    parser.add_argument(
+        "--scale", type=int, default=1, help="во сколько раз размножить архив"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=10, help="повторов каждого замера"
+    )
+    args = parser.parse_args(argv)
+
+    archive = load_archive(args.archive, args.scale)
+    dates = [
+        datetime.strptime(r["archive_date"], "%d.%m.%Y").date()
+        for r in archive
+        if r.get("archive_date")
+    ]
+    if not dates:
+        print("Архив пуст — сначала запустите data/generatetestdata.py.")
+        return 1
+    # Отчёт строится «на дату» последней архивации, иначе окно отчёта
+    # не пересечётся со сгенерированными данными.
+    today = max(dates)
+    print(f"Архив: {len(archive)} записей, отчёты на {today:%d.%m.%Y}.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        backend = JsonBackend(tmp / "active.json", tmp / "archive.json")
+        backend.replace_archive(archive)
+        storage.set_backend(backend)
+        try:
+            # Первое обращение читает партиции с диска — прогреваем.
+            storage.compute_reports_data("month", 12, today=today)
+            print(
+                f"{'отчёт':<22}{'было, мс':>12}{'стало, мс':>12}"
+                f"{'ускорение':>12}{'итоги, мс':>12}"
+            )
+            for period_type, num_periods in (("week", 4), ("month", 12)):
+                for source in ("all", "scooter"):
+                    expected = reference_reports(
+                        archive, period_type, num_periods, source, today
+                    )
+                    actual = storage.compute_reports_data(
+                        period_type, num_periods, source, today=today
+                    )
+                    totals = storage.compute_report_totals(
+                        period_type, num_periods, source, today=today
+                    )
+                    if _summary(expected) != _summary(actual) or [
+                        (r["bike_count"], r["total_cost"]) for r in expected
+                    ] != [(r["bike_count"], r["total_cost"]) for r in totals]:
+                        print(f"РАСХОЖДЕНИЕ: {period_type}/{source}")
+                        return 1
+                    old = timed(
+                        lambda: reference_reports(
+                            archive, period_type, num_periods, source, today
+                        ),
+                        args.repeat,
+                    )
+                    new = timed(
+                        lambda: storage.compute_reports_data(
+                            period_type, num_periods, source, today=today
+                        ),
+                        args.repeat,
+                    )
+                    agg = timed(
+                        lambda: storage.compute_report_totals(
+                            period_type, num_periods, source, today=today
+                        ),
+                        args.repeat,
+                    )
+                    print(
+                        f"{period_type + ' x' + str(num_periods) + ' ' + source:<22}"
+                        f"{old:>12.2f}{new:>12.2f}{old / new:>11.1f}x{agg:>12.2f}"
+                    )
+        finally:
+            storage.set_backend(None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
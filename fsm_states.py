@@ -16,6 +16,7 @@ class RepairForm(StatesGroup):
 
 class ReportState(StatesGroup):
     waiting_for_period = State()
+    waiting_for_range = State()
 
 
 class EditRepairForm(StatesGroup):
@@ -38,6 +39,12 @@ class EditArchiveForm(StatesGroup):
     waiting_for_date = State()
 
 
+class ArchiveBrowseForm(StatesGroup):
+    """Просмотр архива: ввод номера страницы списка."""
+
+    waiting_for_page = State()
+
+
 class FakeRepairForm(StatesGroup):
     """Состояния для быстрого добавления суммы: ввод суммы -> выбор источника."""
 
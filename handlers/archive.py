@@ -4,37 +4,158 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
+import config
 import services.storage as storage
-from utils.formatter import format_archived_repair_details
+from utils.formatter import (
+    format_archived_repair_details,
+    format_archived_repair_line,
+)
+from services.reports import month_title
 from utils.keyboard import (
     main_reply_kb,
     archive_pagination_kb,
+    archive_list_page_inline,
+    archive_period_inline,
+    calendar_inline,
 )
-from datetime import datetime
+import calendar
+from datetime import date, datetime
 
-from fsm_states import EditArchiveForm
+from fsm_states import ArchiveBrowseForm, EditArchiveForm
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
 
+# Архивных ремонтов на одной странице списка архива.
+DEFAULT_ARCHIVE_PAGE_SIZE = 10
+
+RECENT_ARCHIVE_TITLE = "за последние 2 месяца"
+
+
 def register_handlers(dp):
     dp.include_router(router)
 
 
-
+def _archive_page_size() -> int:
+    return getattr(config, "ARCHIVE_PAGE_SIZE", DEFAULT_ARCHIVE_PAGE_SIZE)
 
 
 @router.callback_query(F.data.startswith("archive_filter:"))
 async def handle_archive_filter(callback: CallbackQuery, state: FSMContext):
     source_filter = callback.data.split(":")[1]
-    await state.update_data(source_filter=source_filter)
+    # Новый фильтр — список ID архива будет собран заново, период —
+    # снова последние 2 месяца.
+    await state.update_data(
+        source_filter=source_filter, archive_range=None, archive_ids=None
+    )
     # Используем message из callback, чтобы отправить новое сообщение
-    await process_archive_page(callback.message, 0, is_edit=True, state=state)
+    await process_archive_list(callback.message, 0, is_edit=True, state=state)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("archive_list:"))
+async def handle_archive_list(callback: CallbackQuery, state: FSMContext):
+    page = int(callback.data.split(":")[1])
+    await process_archive_list(callback.message, page, is_edit=True, state=state)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "archive_goto")
+async def archive_goto_start(callback: CallbackQuery, state: FSMContext):
+    await state.set_state(ArchiveBrowseForm.waiting_for_page)
+    await callback.message.answer("Введите номер страницы списка архива:")
+    await callback.answer()
+
+
+@router.message(ArchiveBrowseForm.waiting_for_page)
+async def process_archive_goto(message: Message, state: FSMContext):
+    try:
+        page = int(message.text.strip()) - 1
+    except (ValueError, AttributeError):
+        await message.answer("Введите номер страницы числом:")
+        return
+    # Данные FSM (фильтр и список ID) сохраняются — сбрасываем только ввод.
+    await state.set_state(state=None)
+    await process_archive_list(message, page, state=state)
+
+
+@router.callback_query(F.data == "archive_period")
+async def show_archive_period(callback: CallbackQuery, state: FSMContext):
+    """Меню периода архива: месяцы с ремонтами и свой период."""
+    fsm_data = await state.get_data()
+    months = await storage.aget_archive_months(fsm_data.get("source_filter", "all"))
+    await callback.message.edit_text(
+        "📅 Выберите период архива:", reply_markup=archive_period_inline(months)
+    )
+    await callback.answer()
+
+
+async def _show_archive_range(
+    callback: CallbackQuery, state: FSMContext, archive_range
+) -> None:
+    await state.update_data(archive_range=archive_range, archive_ids=None)
+    await process_archive_list(callback.message, 0, is_edit=True, state=state)
     await callback.answer()
 
 
+@router.callback_query(F.data == "archive_range:recent")
+async def handle_archive_recent(callback: CallbackQuery, state: FSMContext):
+    await _show_archive_range(callback, state, None)
+
+
+@router.callback_query(F.data.startswith("archive_month:"))
+async def handle_archive_month(callback: CallbackQuery, state: FSMContext):
+    year, month = map(int, callback.data.split(":")[1].split("-"))
+    start = date(year, month, 1)
+    end = start.replace(day=calendar.monthrange(year, month)[1])
+    await _show_archive_range(callback, state, [start.isoformat(), end.isoformat()])
+
+
+@router.callback_query(F.data.startswith("archive_cal:"))
+async def handle_archive_calendar(callback: CallbackQuery, state: FSMContext):
+    """
+    Выбор своего периода календарём: archive_cal:<start|end>:nav:ГГГГ-ММ
+    листает месяцы, archive_cal:<start|end>:day:ГГГГ-ММ-ДД выбирает
+    начало, затем конец периода.
+    """
+    _, stage, action, value = callback.data.split(":")
+    prefix = f"archive_cal:{stage}"
+    if action == "nav":
+        year, month = map(int, value.split("-"))
+        keyboard = calendar_inline(year, month, prefix, "archive_period")
+        if stage == "start":
+            await callback.message.edit_text(
+                "🗓 Выберите начало периода:", reply_markup=keyboard
+            )
+        else:
+            await callback.message.edit_reply_markup(reply_markup=keyboard)
+        await callback.answer()
+        return
+
+    day = date.fromisoformat(value)
+    if stage == "start":
+        await state.update_data(archive_range_start=value)
+        await callback.message.edit_text(
+            f"Начало периода: <b>{day.strftime('%d.%m.%Y')}</b>.\n"
+            "Выберите конец периода:",
+            reply_markup=calendar_inline(
+                day.year, day.month, "archive_cal:end", "archive_period"
+            ),
+        )
+        await callback.answer()
+        return
+
+    fsm_data = await state.get_data()
+    start_value = fsm_data.get("archive_range_start")
+    if not start_value:
+        await callback.answer("Сначала выберите начало периода.", show_alert=True)
+        return
+    start, end = sorted((date.fromisoformat(start_value), day))
+    await _show_archive_range(callback, state, [start.isoformat(), end.isoformat()])
+
+
 @router.callback_query(F.data.startswith("archive_page:"))
 async def handle_archive_pagination(callback: CallbackQuery, state: FSMContext):
     page = int(callback.data.split(":")[1])
@@ -42,40 +163,125 @@ async def handle_archive_pagination(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-async def process_archive_page(
-    message: Message, page: int, is_edit: bool = False, state: FSMContext = None
-):
-    # Получаем фильтр из состояния FSM
+def _archive_window(fsm_data: dict) -> tuple:
+    """
+    Период просмотра архива из данных FSM: (начало, конец, подпись).
+    По умолчанию — последние 2 месяца; archive_range — выбранные месяц
+    или даты [ГГГГ-ММ-ДД, ГГГГ-ММ-ДД].
+    """
+    archive_range = fsm_data.get("archive_range")
+    if not archive_range:
+        return storage.recent_archive_since(), date.max, RECENT_ARCHIVE_TITLE
+    start, end = (date.fromisoformat(day) for day in archive_range)
+    month_days = calendar.monthrange(start.year, start.month)[1]
+    if start.day == 1 and end == start.replace(day=month_days):
+        return start, end, f"за {month_title(start.year, start.month)}"
+    return (
+        start,
+        end,
+        f"с {start.strftime('%d.%m.%Y')} по {end.strftime('%d.%m.%Y')}",
+    )
+
+
+async def _archive_ids(state: FSMContext) -> list:
+    """
+    Отсортированный список ID архива для текущего фильтра и периода.
+    Собирается один раз и хранится в данных FSM пользователя вместе с
+    версией архива (storage.archive_version) и датой: пока архив не менялся
+    (и не наступил новый день), листание страниц не перечитывает архив.
+    Правки активных ремонтов список не сбрасывают, а после перезапуска
+    бота версия другая, и список собирается заново.
+    """
     fsm_data = await state.get_data()
     source_filter = fsm_data.get("source_filter", "all")
+    key = [
+        source_filter,
+        fsm_data.get("archive_range"),
+        await storage.aarchive_version(),
+        datetime.now().date().isoformat(),
+    ]
+    ids = fsm_data.get("archive_ids")
+    if ids is not None and fsm_data.get("archive_ids_key") == key:
+        return ids
+    start, end, _ = _archive_window(fsm_data)
+    ids = await storage.aget_archived_repair_ids_range(start, end, source_filter)
+    await state.update_data(archive_ids=ids, archive_ids_key=key)
+    return ids
+
+
+async def _answer_empty_archive(message: Message, is_edit: bool, title: str) -> None:
+    text = f"В этой категории нет архивированных ремонтов {title}."
+    # Пустой период — предлагаем выбрать другой.
+    keyboard = archive_list_page_inline([], 0, 0, 1)
+    if is_edit:
+        await message.edit_text(text, reply_markup=keyboard)
+    else:
+        await message.answer(text, reply_markup=keyboard)
 
-    repairs_list = storage.get_archived_repairs_last_two_months(source_filter)
 
-    if not repairs_list:
-        await message.answer(
-            "В этой категории нет архивированных ремонтов за последние 2 месяца.",
-            reply_markup=main_reply_kb(),
-        )
-        # Если редактируем сообщение, удаляем клавиатуру
-        if is_edit:
-            await message.edit_reply_markup(reply_markup=None)
+async def process_archive_list(
+    message: Message, page: int, is_edit: bool = False, state: FSMContext = None
+):
+    """
+    Показывает страницу списка архива: ARCHIVE_PAGE_SIZE кратких строк и
+    кнопки подробностей. Номер страницы приводится к допустимому; из
+    хранилища читаются только записи этой страницы по списку ID.
+    """
+    repair_ids = await _archive_ids(state)
+    _, _, title = _archive_window(await state.get_data())
+    if not repair_ids:
+        await _answer_empty_archive(message, is_edit, title)
         return
 
-    repairs_list.sort(
-        key=lambda r: datetime.strptime(
-            r.get("archive_date", "01.01.1970"), "%d.%m.%Y"
-        ),
-        reverse=True,
+    page_size = _archive_page_size()
+    total_pages = -(-len(repair_ids) // page_size)
+    page = min(max(page, 0), total_pages - 1)
+    first = page * page_size
+    repairs = await storage.aget_archive_repairs_by_ids(
+        repair_ids[first : first + page_size]
+    )
+    lines = [
+        format_archived_repair_line(repair, first + i + 1)
+        for i, repair in enumerate(repairs)
+    ]
+    text = (
+        f"📦 Ремонтов в архиве {title}: <b>{len(repair_ids)}</b>"
+        f" (страница {page + 1}/{total_pages}).\n\n" + "\n".join(lines)
     )
+    keyboard = archive_list_page_inline(repairs, first, page, total_pages)
+    if is_edit:
+        await message.edit_text(text, reply_markup=keyboard)
+    else:
+        await message.answer(text, reply_markup=keyboard)
 
-    total_pages = len(repairs_list)
+
+async def process_archive_page(
+    message: Message, page: int, is_edit: bool = False, state: FSMContext = None
+):
+    # Хранилище отдаёт ремонты уже отсортированными от новых к старым;
+    # на странице читается только одна запись по ID.
+    repair_ids = await _archive_ids(state)
+
+    if not repair_ids:
+        _, _, title = _archive_window(await state.get_data())
+        await _answer_empty_archive(message, is_edit, title)
+        return
+
+    total_pages = len(repair_ids)
     if page < 0 or page >= total_pages:
         return
 
-    repair = repairs_list[page]
-    repair_id = repair.get("id")
+    repair_id = repair_ids[page]
+    repair = await storage.aget_archive_repair_by_id(repair_id)
+    if repair is None:
+        # Архив изменился между чтением списка и записи — список соберётся
+        # заново при следующем переходе.
+        await message.answer("Ремонт не найден в архиве.", reply_markup=main_reply_kb())
+        return
     text = format_archived_repair_details(repair)
-    keyboard = archive_pagination_kb(page, total_pages, repair_id)
+    keyboard = archive_pagination_kb(
+        page, total_pages, repair_id, list_page=page // _archive_page_size()
+    )
 
     if is_edit:
         await message.edit_text(text, reply_markup=keyboard)
@@ -97,7 +303,7 @@ async def restore_repair(callback: CallbackQuery):
         await callback.answer("Некорректный ID ремонта.", show_alert=True)
         return
 
-    restored = storage.restore_repair_by_id(repair_id)
+    restored = await storage.arestore_repair_by_id(repair_id)
 
     if restored:
         logger.info(
@@ -130,7 +336,7 @@ async def delete_repair(callback: CallbackQuery):
         await callback.answer("Ошибка ID ремонта.", show_alert=True)
         return
 
-    deleted = storage.delete_repair_from_archive_by_id(repair_id)
+    deleted = await storage.adelete_repair_from_archive_by_id(repair_id)
 
     if deleted:
         logger.warning(
@@ -184,7 +390,7 @@ async def process_new_archive_date(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    updated = storage.update_archive_repair_field(
+    updated = await storage.aupdate_archive_repair_field(
         repair_id, "archive_date", new_date_str
     )
 
@@ -76,7 +76,7 @@ async def _create_fake_archived_repair(
     repair_data["date"] = today
     repair_data["archive_date"] = today
 
-    new_id = storage.create_archived_repair(repair_data)
+    new_id = await storage.acreate_archived_repair(repair_data)
 
     logger.info(
         "Создан быстрый ремонт ID:%s на сумму %s руб. (источник=%s, сразу в архив). "
@@ -445,7 +445,7 @@ async def finalize_repair_creation(message: Message, state: FSMContext):
 
     # Атомарно присваиваем ID и сохраняем — устраняет гонку между
     # получением следующего ID и записью ремонта.
-    new_repair_id = storage.create_repair(user_data)
+    new_repair_id = await storage.acreate_repair(user_data)
 
     logger.info(
         "Создан новый ремонт ID:%s. Клиент=%s, контакт=%s, стоимость=%s руб. user_id=%s.",
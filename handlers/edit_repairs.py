@@ -32,7 +32,7 @@ def register_handlers(dp):
 @router.callback_query(F.data.startswith("edit_repair:"))
 async def edit_repair(callback: CallbackQuery, state: FSMContext):
     repair_id = int(callback.data.split(":")[1])
-    repair_data = storage.get_active_repair_data_by_id(int(repair_id))
+    repair_data = await storage.aget_active_repair_data_by_id(int(repair_id))
     if not repair_data:
         await callback.message.answer("Ремонт не найден.")
         await callback.answer()
@@ -52,7 +52,7 @@ async def select_field_to_edit(callback: CallbackQuery, state: FSMContext):
     _, field_name, repair_id = callback.data.split(":")
     await state.update_data(field_name=field_name)
 
-    current_repair_data = storage.get_active_repair_data_by_id(int(repair_id))
+    current_repair_data = await storage.aget_active_repair_data_by_id(int(repair_id))
     if not current_repair_data:
         await callback.message.answer("Ремонт не найден.")
         await state.clear()
@@ -150,14 +150,14 @@ async def set_repair_source(callback: CallbackQuery, state: FSMContext):
     source_key = data_parts[1]
     repair_id = int(data_parts[2])
 
-    storage.update_repair_field(repair_id, "repair_type", source_key)
+    await storage.aupdate_repair_field(repair_id, "repair_type", source_key)
     logger.info(
         "Источник ремонта ID:%s изменён на '%s'. user_id=%s.",
         repair_id,
         source_key,
         callback.from_user.id,
     )
-    repair = storage.get_active_repair_data_by_id(repair_id)
+    repair = await storage.aget_active_repair_data_by_id(repair_id)
     sources_dict = storage.get_repair_sources()
     source_name = sources_dict.get(source_key, source_key)
 
@@ -257,7 +257,7 @@ async def process_edit_e_bike_custom_breakdowns(message: Message, state: FSMCont
     final_breakdowns = list(normalized.values())
 
     # Сохраняем
-    storage.update_repair_field(repair_id, "breakdowns", final_breakdowns)
+    await storage.aupdate_repair_field(repair_id, "breakdowns", final_breakdowns)
 
     # Считаем итоговую стоимость
     total_cost_from_breakdowns = 0
@@ -301,7 +301,7 @@ async def finish_edit_e_bike_selection(callback: CallbackQuery, state: FSMContex
 
     final_breakdowns = list(normalized.values())
 
-    storage.update_repair_field(repair_id, "breakdowns", final_breakdowns)
+    await storage.aupdate_repair_field(repair_id, "breakdowns", final_breakdowns)
 
     total_cost_from_breakdowns = 0
     for bd in final_breakdowns:
@@ -328,7 +328,7 @@ async def process_edit_mechanical_breakdowns(message: Message, state: FSMContext
 
     user_data = await state.get_data()
     repair_id = user_data.get("repair_id_to_edit")
-    storage.update_repair_field(repair_id, "breakdowns", parsed_breakdowns)
+    await storage.aupdate_repair_field(repair_id, "breakdowns", parsed_breakdowns)
     logger.info(
         "Поломки обновлены для ремонта ID:%s (механический). user_id=%s.",
         repair_id,
@@ -362,14 +362,14 @@ async def process_confirm_cost_edit(callback: CallbackQuery, state: FSMContext):
         await state.clear()
         return
 
-    storage.update_repair_field(repair_id, "cost", cost)
+    await storage.aupdate_repair_field(repair_id, "cost", cost)
     logger.info(
         "Стоимость ремонта ID:%s подтверждена/обновлена на %s руб. user_id=%s.",
         repair_id,
         cost,
         callback.from_user.id,
     )
-    repair = storage.get_active_repair_data_by_id(int(repair_id))
+    repair = await storage.aget_active_repair_data_by_id(int(repair_id))
 
     await callback.message.edit_text(
         f"✅ Стоимость обновлена для ремонта ID: {repair_id}.\n\n"
@@ -412,14 +412,14 @@ async def process_cost_input_edit(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    storage.update_repair_field(repair_id, "cost", cost)
+    await storage.aupdate_repair_field(repair_id, "cost", cost)
     logger.info(
         "Стоимость ремонта ID:%s обновлена на %s руб. user_id=%s.",
         repair_id,
         cost,
         message.from_user.id,
     )
-    repair = storage.get_active_repair_data_by_id(int(repair_id))
+    repair = await storage.aget_active_repair_data_by_id(int(repair_id))
 
     await message.answer(
         f"✅ Стоимость обновлена для ремонта ID: {repair_id}.\n\n"
@@ -443,13 +443,13 @@ async def update_fio(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    storage.update_repair_field(repair_id, "FIO", message.text)
+    await storage.aupdate_repair_field(repair_id, "FIO", message.text)
     logger.info(
         "ФИО клиента обновлено для ремонта ID:%s. user_id=%s.",
         repair_id,
         message.from_user.id,
     )
-    repair = storage.get_active_repair_data_by_id(int(repair_id))
+    repair = await storage.aget_active_repair_data_by_id(int(repair_id))
     await message.answer(
         f"✅ ФИО обновлено для ремонта ID: {repair_id}.\n\n"
         + format_repair_details(repair),
@@ -469,14 +469,14 @@ async def update_contact(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    storage.update_repair_field(repair_id, "contact", message.text)
+    await storage.aupdate_repair_field(repair_id, "contact", message.text)
     logger.info(
         "Контакт обновлён для ремонта ID:%s (новое значение: %s). user_id=%s.",
         repair_id,
         mask_contact(message.text),
         message.from_user.id,
     )
-    repair = storage.get_active_repair_data_by_id(int(repair_id))
+    repair = await storage.aget_active_repair_data_by_id(int(repair_id))
     await message.answer(
         f"✅ Контакт обновлен для ремонта ID: {repair_id}.\n\n"
         + format_repair_details(repair),
@@ -503,7 +503,7 @@ async def update_bike_type(callback: CallbackQuery, state: FSMContext):
         await state.clear()
         return
 
-    storage.update_repair_field(repair_id, "isMechanics", is_mechanics)
+    await storage.aupdate_repair_field(repair_id, "isMechanics", is_mechanics)
     # Раньше при переключении на электровелосипед имя принудительно
     # затиралось на "Электровелосипед". Больше так не делаем: имя не зависит
     # от типа, его можно задать/поменять через кнопку «Название велосипеда».
@@ -514,7 +514,7 @@ async def update_bike_type(callback: CallbackQuery, state: FSMContext):
         is_mechanics,
         callback.from_user.id,
     )
-    repair = storage.get_active_repair_data_by_id(int(repair_id))
+    repair = await storage.aget_active_repair_data_by_id(int(repair_id))
     await callback.message.edit_text(
         f"✅ Тип велосипеда обновлен для ремонта ID: {repair_id}.\n\n"
         + format_repair_details(repair),
@@ -535,13 +535,13 @@ async def update_namebike(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    storage.update_repair_field(repair_id, "namebike", message.text)
+    await storage.aupdate_repair_field(repair_id, "namebike", message.text)
     logger.info(
         "Название велосипеда обновлено для ремонта ID:%s. user_id=%s.",
         repair_id,
         message.from_user.id,
     )
-    repair = storage.get_active_repair_data_by_id(int(repair_id))
+    repair = await storage.aget_active_repair_data_by_id(int(repair_id))
     await message.answer(
         f"✅ Название велосипеда обновлено для ремонта ID: {repair_id}.\n\n"
         + format_repair_details(repair),
@@ -561,13 +561,13 @@ async def update_notes(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    storage.update_repair_field(repair_id, "notes", message.text)
+    await storage.aupdate_repair_field(repair_id, "notes", message.text)
     logger.info(
         "Примечания обновлены для ремонта ID:%s. user_id=%s.",
         repair_id,
         message.from_user.id,
     )
-    repair = storage.get_active_repair_data_by_id(int(repair_id))
+    repair = await storage.aget_active_repair_data_by_id(int(repair_id))
     await message.answer(
         f"✅ Примечания обновлены для ремонта ID: {repair_id}.\n\n"
         + format_repair_details(repair),
@@ -595,14 +595,14 @@ async def update_date(message: Message, state: FSMContext):
         )
         return
 
-    storage.update_repair_field(repair_id, "date", message.text)
+    await storage.aupdate_repair_field(repair_id, "date", message.text)
     logger.info(
         "Дата ремонта ID:%s обновлена на %s. user_id=%s.",
         repair_id,
         message.text,
         message.from_user.id,
     )
-    repair = storage.get_active_repair_data_by_id(int(repair_id))
+    repair = await storage.aget_active_repair_data_by_id(int(repair_id))
     await message.answer(
         f"✅ Дата обновлена для ремонта ID: {repair_id}.\n\n"
         + format_repair_details(repair),
@@ -615,7 +615,7 @@ async def update_date(message: Message, state: FSMContext):
 async def cancel_edit(callback: CallbackQuery, state: FSMContext):
     repair_id = int(callback.data.split(":")[1])
     await state.clear()
-    repair_data = storage.get_active_repair_data_by_id(int(repair_id))
+    repair_data = await storage.aget_active_repair_data_by_id(int(repair_id))
     if repair_data:
         await callback.message.edit_text(
             f"Редактирование отменено.\n\n" + format_repair_details(repair_data),
@@ -637,7 +637,7 @@ async def close_repair(callback: CallbackQuery, state: FSMContext):
             await callback.answer("Некорректный ID ремонта.", show_alert=True)
             return
 
-        if storage.archive_repair_by_id(repair_id):
+        if await storage.aarchive_repair_by_id(repair_id):
             logger.info(
                 "Ремонт ID:%s закрыт и перемещён в архив. user_id=%s.",
                 repair_id,
@@ -1,9 +1,12 @@
 import logging
+from datetime import datetime
+from html import escape
 
 from aiogram import Router, F
-from aiogram.types import CallbackQuery
+from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 import services.storage as storage
+from services import snapshots
 from utils.keyboard import (
     main_reply_kb,
     report_options_inline_kb,
@@ -32,6 +35,52 @@ async def handle_report_source_filter(callback: CallbackQuery, state: FSMContext
     await callback.answer()
 
 
+# Тип отчёта -> (число периодов, заголовок). Для отчёта по дням число
+# периодов — сегодняшнее число месяца (см. _report_params).
+REPORT_TYPES = {
+    "week": (4, "Отчёты за последние 4 календарные недели"),
+    "month": (12, "Отчёты за последние 12 календарных месяцев"),
+    "day": (None, "Отчёт по дням текущего месяца"),
+    "quarter": (4, "Отчёты за последние 4 квартала"),
+    "year": (3, "Отчёты за последние 3 года"),
+}
+
+RANGE_SEPARATORS = ("–", "—", "-")
+
+# «Топ поломок»: сколько поломок показывать и за какие периоды.
+TOP_BREAKDOWNS = 10
+BREAKDOWN_PERIODS = ("quarter", 4)
+
+# Сроки ремонта (медиана, p90, p99) — по последним 6 месяцам.
+TURNAROUND_PERIODS = ("month", 6)
+
+
+def _report_params(period_type: str):
+    num_periods, title = REPORT_TYPES[period_type]
+    if num_periods is None:
+        num_periods = datetime.now().day
+    return num_periods, title
+
+
+def _parse_range(text: str):
+    """
+    Разбирает диапазон 'ДД.ММ.ГГГГ–ДД.ММ.ГГГГ' (через тире или дефис).
+    Возвращает (начало, конец) или None, если формат неверный.
+    """
+    for separator in RANGE_SEPARATORS:
+        parts = text.split(separator)
+        if len(parts) != 2:
+            continue
+        try:
+            start, end = (
+                datetime.strptime(part.strip(), "%d.%m.%Y").date() for part in parts
+            )
+        except ValueError:
+            return None
+        return (start, end) if start <= end else None
+    return None
+
+
 @router.callback_query(
     F.data.startswith("report_type:"), ReportState.waiting_for_period
 )
@@ -40,37 +89,131 @@ async def generate_report(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Ошибка: данные не получены.", show_alert=True)
         return
 
+    period_type = callback.data.split(":")[1]
+    if period_type == "range":
+        # Фильтр источника остаётся в состоянии до ввода диапазона.
+        await state.set_state(ReportState.waiting_for_range)
+        await callback.message.edit_text(
+            "🗓️ Введите период в формате ДД.ММ.ГГГГ–ДД.ММ.ГГГГ\n"
+            "(например, 01.03.2025–15.04.2025):"
+        )
+        await callback.answer()
+        return
+
     # Получаем фильтр из состояния
     fsm_data = await state.get_data()
     source_filter = fsm_data.get("source_filter", "all")
     await state.clear()  # Очищаем состояние
 
-    period_type = callback.data.split(":")[1]
     await callback.message.edit_text("⏳ Генерирую отчёт, пожалуйста, подождите...")
 
-    if period_type == "week":
-        num_periods = 4
-        title = "Отчёты за последние 4 календарные недели"
-    elif period_type == "month":
-        num_periods = 12
-        title = "Отчёты за последние 12 календарных месяцев"
-    else:
+    if period_type == "breakdowns":
+        stats = await storage.aget_breakdown_stats(*BREAKDOWN_PERIODS, source_filter)
+        logger.info(
+            "Сформирован топ поломок (фильтр=%s). user_id=%s.",
+            source_filter,
+            callback.from_user.id,
+        )
+        await _send_breakdowns(callback.message, source_filter, stats)
+        return
+
+    if period_type == "turnaround":
+        stats = await storage.aget_turnaround_stats(*TURNAROUND_PERIODS, source_filter)
+        logger.info(
+            "Сформирован отчёт по срокам ремонта (фильтр=%s). user_id=%s.",
+            source_filter,
+            callback.from_user.id,
+        )
+        await _send_turnaround(callback.message, source_filter, stats)
+        return
+
+    if period_type == "compare":
+        comparison = await storage.aget_month_comparison(source_filter)
+        logger.info(
+            "Сформировано сравнение месяцев (фильтр=%s). user_id=%s.",
+            source_filter,
+            callback.from_user.id,
+        )
+        await _send_comparison(callback.message, source_filter, comparison)
+        return
+
+    if period_type not in REPORT_TYPES:
         await callback.message.answer(
             "❌ Неизвестный тип отчёта.", reply_markup=main_reply_kb()
         )
         return
+    num_periods, title = _report_params(period_type)
 
-    # Передаем фильтр в функцию
-    reports_data = storage.get_reports_data(period_type, num_periods, source_filter)
+    # Отчёты по умолчанию обычно уже посчитаны фоновой задачей.
+    reports_data = await snapshots.aget_report(period_type, num_periods, source_filter)
+    engine = "снимок"
+    if reports_data is None:
+        # Архив больше REPORTS_NUMPY_THRESHOLD — по колонкам NumPy
+        # (None, если этот путь неприменим).
+        reports_data = await storage.aget_columnar_report(
+            period_type, num_periods, source_filter
+        )
+        engine = "колонки NumPy"
+    if reports_data is None:
+        reports_data = await storage.aget_report_totals(
+            period_type, num_periods, source_filter
+        )
+        engine = "дневные итоги"
+    cache = storage.report_cache_stats()
     logger.info(
-        "Сформирован отчёт (%s, фильтр=%s). user_id=%s.",
+        "Сформирован отчёт (%s, фильтр=%s, источник: %s). user_id=%s. "
+        "Кэш отчётов: %s попаданий, %s промахов.",
         period_type,
         source_filter,
+        engine,
         callback.from_user.id,
+        cache["hits"],
+        cache["misses"],
+    )
+    await _send_reports(
+        callback.message, title, source_filter, period_type, reports_data
+    )
+
+
+@router.message(ReportState.waiting_for_range)
+async def generate_range_report(message: Message, state: FSMContext):
+    period = _parse_range(message.text or "")
+    if period is None:
+        await message.answer(
+            "Неверный формат. Введите период в формате ДД.ММ.ГГГГ–ДД.ММ.ГГГГ "
+            "(начало не позже конца):"
+        )
+        return
+
+    fsm_data = await state.get_data()
+    source_filter = fsm_data.get("source_filter", "all")
+    await state.clear()
+
+    start, end = period
+    progress = await message.answer("⏳ Генерирую отчёт, пожалуйста, подождите...")
+    report = await storage.aget_range_totals(start, end, source_filter)
+    logger.info(
+        "Сформирован отчёт за период %s–%s (фильтр=%s). user_id=%s.",
+        report["start_date"],
+        report["end_date"],
+        source_filter,
+        message.from_user.id,
+    )
+    await _send_reports(
+        progress, "Отчёт за выбранный период", source_filter, "range", [report]
     )
 
+
+async def _send_reports(
+    message: Message,
+    title: str,
+    source_filter: str,
+    period_type: str,
+    reports_data: list,
+):
+    """Выводит отчёт по периодам (см. _send_parts)."""
     if not reports_data or all(report["bike_count"] == 0 for report in reports_data):
-        await callback.message.edit_text(
+        await message.edit_text(
             f"🚫 В выбранной категории нет данных для отчёта за указанный период.",
         )
         return
@@ -98,20 +241,154 @@ async def generate_report(callback: CallbackQuery, state: FSMContext):
         )
         response_messages.append(message_part)
 
+    await _send_parts(message, response_messages)
+
+
+async def _send_breakdowns(message: Message, source_filter: str, stats: list):
+    """Выводит «Топ поломок»: частота, выручка, разбивка по периодам и источникам."""
+    if not stats:
+        await message.edit_text(
+            "🚫 В выбранной категории нет поломок за последние 4 квартала.",
+        )
+        return
+
+    from utils.keyboard import REPAIR_SOURCES  # Локальный импорт для получения названия
+
+    filter_name = REPAIR_SOURCES.get(source_filter, "Все категории")
+    total = sum(item["count"] for item in stats)
+    parts = [
+        f"✨ <b>Топ поломок за последние 4 квартала</b>\n"
+        f"(Категория: <b>{filter_name}</b>) ✨\n\n"
+    ]
+    for place, item in enumerate(stats[:TOP_BREAKDOWNS], start=1):
+        by_period = " · ".join(
+            f"{period_name}: {count}" for period_name, count in item["by_period"]
+        )
+        part = (
+            f"{place}. <b>{escape(item['name'])}</b>\n"
+            f"  🛠️ <code>{item['count']}</code> раз "
+            f"({item['count'] * 100 // total}%), "
+            f"💰 <code>{item['revenue']} руб.</code>\n"
+            f"  🗓️ {by_period}\n"
+        )
+        if source_filter == "all":
+            by_source = ", ".join(
+                f"{REPAIR_SOURCES.get(source, source or '—')}: {count}"
+                for source, count in sorted(
+                    item["by_source"].items(), key=lambda pair: -pair[1]
+                )
+            )
+            part += f"  👥 {by_source}\n"
+        parts.append(part + "\n")
+    await _send_parts(message, parts)
+
+
+def _format_turnaround(summary: dict) -> str:
+    return (
+        f"медиана <code>{summary['median']}</code>, "
+        f"p90 <code>{summary['p90']}</code>, "
+        f"p99 <code>{summary['p99']}</code> дн."
+    )
+
+
+async def _send_turnaround(message: Message, source_filter: str, stats: list):
+    """Выводит сроки ремонта по месяцам: медиана, p90, p99 (и по источникам)."""
+    if not any(period["count"] for period in stats):
+        await message.edit_text(
+            "🚫 В выбранной категории нет ремонтов с известным сроком "
+            "за последние 6 месяцев.",
+        )
+        return
+
+    from utils.keyboard import REPAIR_SOURCES  # Локальный импорт для получения названия
+
+    filter_name = REPAIR_SOURCES.get(source_filter, "Все категории")
+    parts = [
+        f"⏱️ <b>Сроки ремонта за последние 6 месяцев</b>\n"
+        f"(Категория: <b>{filter_name}</b>) ⏱️\n"
+        f"Дней от приёма до выдачи.\n\n"
+    ]
+    for period in stats:
+        part = f"🗓️ <b>{period['period_name']}</b>\n"
+        if not period["count"]:
+            parts.append(part + "  Ремонтов нет.\n\n")
+            continue
+        part += (
+            f"  🚲 <code>{period['count']}</code> ремонтов, "
+            f"в среднем <code>{period['mean']}</code> дн.\n"
+            f"  📊 {_format_turnaround(period)}\n"
+        )
+        if source_filter == "all":
+            for source, summary in period["by_source"].items():
+                part += (
+                    f"  👥 {REPAIR_SOURCES.get(source, source or '—')} "
+                    f"({summary['count']}): {_format_turnaround(summary)}\n"
+                )
+        parts.append(part + "\n")
+    await _send_parts(message, parts)
+
+
+def _delta(current: int, base: int) -> str:
+    """Изменение current относительно base в процентах ('—', если base = 0)."""
+    if not base:
+        return "—"
+    return f"{(current - base) * 100 / base:+.0f}%"
+
+
+async def _send_comparison(message: Message, source_filter: str, comparison: dict):
+    """
+    Выводит текущий месяц (с 1-го числа по сегодня) в сравнении с теми же
+    днями прошлого месяца (MoM) и того же месяца прошлого года (YoY) по
+    источникам и типам велосипедов.
+    """
+    from utils.keyboard import REPAIR_SOURCES  # Локальный импорт для получения названия
+
+    filter_name = REPAIR_SOURCES.get(source_filter, "Все категории")
+    parts = [
+        f"📈 <b>{comparison['current_name']}</b>\n"
+        f"в сравнении с теми же днями: {comparison['previous_name']} (MoM) и "
+        f"{comparison['last_year_name']} (YoY)\n"
+        f"(Категория: <b>{filter_name}</b>)\n\n"
+    ]
+    for row in comparison["rows"]:
+        if row["repair_type"] == "all":
+            source = "Все источники"
+        else:
+            source = REPAIR_SOURCES.get(row["repair_type"], row["repair_type"] or "—")
+        if row["isMechanics"] is None:
+            title = "Итого" if row["repair_type"] == "all" else f"Итого — {source}"
+            title = f"<b>{title}</b>"
+        else:
+            kind = "механика" if row["isMechanics"] else "электро"
+            title = f"<b>{source}</b> · {kind}"
+        count, cost = row["current"]
+        prev_count, prev_cost = row["previous"]
+        year_count, year_cost = row["last_year"]
+        parts.append(
+            f"🚲 {title}: <code>{count}</code> рем., <code>{cost} руб.</code>\n"
+            f"  MoM: {_delta(count, prev_count)} рем., "
+            f"{_delta(cost, prev_cost)} руб. (было {prev_count} / {prev_cost})\n"
+            f"  YoY: {_delta(count, year_count)} рем., "
+            f"{_delta(cost, year_cost)} руб. (было {year_count} / {year_cost})\n\n"
+        )
+    await _send_parts(message, parts)
+
+
+async def _send_parts(message: Message, response_messages: list):
+    """
+    Заменяет сообщение «⏳ Генерирую отчёт...» первой частью текста,
+    остальные части (если текст длиннее лимита) отправляет следом.
+    """
     current_message_batch = ""
     for part in response_messages:
         if len(current_message_batch) + len(part) > 4000:
-            await callback.message.answer(
-                current_message_batch, reply_markup=main_reply_kb()
-            )
+            await message.answer(current_message_batch, reply_markup=main_reply_kb())
             current_message_batch = part
         else:
             current_message_batch += part
 
     if current_message_batch:
-        if (callback.message.text or "").startswith("⏳"):
-            await callback.message.edit_text(current_message_batch)
+        if (message.text or "").startswith("⏳"):
+            await message.edit_text(current_message_batch)
         else:
-            await callback.message.answer(
-                current_message_batch, reply_markup=main_reply_kb()
-            )
+            await message.answer(current_message_batch, reply_markup=main_reply_kb())
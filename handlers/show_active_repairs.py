@@ -25,7 +25,7 @@ def register_handlers(dp):
 @router.callback_query(F.data.startswith("show_active_repair_details:"))
 async def show_specific_active_repair_details(callback: CallbackQuery):
     repair_id = int(callback.data.split(":")[1])
-    repair_data = storage.get_active_repair_data_by_id(int(repair_id))
+    repair_data = await storage.aget_active_repair_data_by_id(int(repair_id))
 
     if repair_data:
         await callback.message.edit_text(  # Используем edit_text, чтобы заменить сообщение со списком
@@ -5,11 +5,14 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 
 from aiogram.fsm.context import FSMContext
+import config
 import services.storage as storage
 from utils.keyboard import (
+    ACTIVE_ORDER_NAMES,
     main_reply_kb,
     source_filter_inline_kb,
     active_repairs_inline,
+    active_repairs_page_inline,
 )
 from fsm_states import RepairForm
 
@@ -94,21 +97,58 @@ async def show_report_source_filter(message: Message, state: FSMContext):
     )
 
 
+# Ремонтов на одной странице списка действующих ремонтов.
+DEFAULT_ACTIVE_PAGE_SIZE = 10
+
+
 @router.message(F.text == "Действующие ремонты")
 @router.message(Command("active_repairs"))
 async def show_active_repairs_list(message: Message, state: FSMContext):
     await state.set_state(state=None)
-    active_repairs = storage.get_active_repairs()
-    if not active_repairs:
-        # Если ремонтов нет, предлагаем создать новый сразу
-        await message.answer(
-            "На данный момент нет действующих ремонтов. Хотите создать новый?",
-            reply_markup=active_repairs_inline(),
-        )
-        return
+    await send_active_repairs_page(message, 0, "date")
 
-    # Отправляем клавиатуру со списком ФИО
-    await message.answer(
-        "Выберите клиента для просмотра деталей ремонта:",
-        reply_markup=active_repairs_inline(active_repairs),
+
+@router.callback_query(F.data.startswith("active_page:"))
+async def handle_active_repairs_page(callback: CallbackQuery):
+    _, order, page = callback.data.split(":")
+    if order not in ACTIVE_ORDER_NAMES:
+        order = "date"
+    await send_active_repairs_page(callback.message, int(page), order, is_edit=True)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "ignore")
+async def ignore_callback(callback: CallbackQuery):
+    """Кнопки-подписи (номер текущей страницы) ничего не делают."""
+    await callback.answer()
+
+
+async def send_active_repairs_page(
+    message: Message, page: int, order: str, is_edit: bool = False
+):
+    """
+    Показывает страницу списка действующих ремонтов. Из хранилища берётся
+    только срез страницы и общее число ремонтов, поэтому открытие списка
+    не зависит от того, сколько ремонтов сейчас в работе.
+    """
+    page_size = getattr(config, "ACTIVE_REPAIRS_PAGE_SIZE", DEFAULT_ACTIVE_PAGE_SIZE)
+    repairs, page, total = await storage.aget_active_repairs_page(
+        page, page_size, order
     )
+    if not total:
+        # Если ремонтов нет, предлагаем создать новый сразу
+        text = "На данный момент нет действующих ремонтов. Хотите создать новый?"
+        keyboard = active_repairs_inline()
+    else:
+        total_pages = -(-total // page_size)
+        text = (
+            f"🚲 Действующих ремонтов: <b>{total}</b>"
+            f" (сортировка {ACTIVE_ORDER_NAMES[order]}"
+            f", страница {page + 1}/{total_pages}).\n"
+            "Выберите клиента для просмотра деталей ремонта:"
+        )
+        keyboard = active_repairs_page_inline(repairs, page, total_pages, order)
+    if is_edit:
+        await message.edit_text(text, reply_markup=keyboard)
+    else:
+        await message.answer(text, reply_markup=keyboard)
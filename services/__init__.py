@@ -2,5 +2,5 @@ from .storage import *
 from .reports import get_weekly_totals, get_monthly_totals
 
 __all__ = [
-    get_weekly_totals, get_monthly_totals
+    "get_weekly_totals", "get_monthly_totals"
 ]
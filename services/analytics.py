@@ -0,0 +1,202 @@
+"""
+Производные структуры для отчётов поверх поддерживаемых итогов архива:
+DayPrefixSums (итоги произвольных периодов по накопленным суммам),
+DayCube (те же суммы по источникам и типам велосипеда) и
+histogram_quantiles (квантили по гистограмме) — записи архива ими не
+читаются. ColumnarArchive — колоночное представление самих записей в
+массивах NumPy для отчётов по большому архиву.
+
+NumPy — необязательная зависимость: без него HAS_NUMPY = False, и
+services.storage считает отчёты обычным путём.
+"""
+
+import math
+from datetime import date
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence
+
+from services.reports import archive_ordinal
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - зависит от окружения
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Размер архива, с которого отчёты считаются по колонкам: на маленьком
+# архиве построение массивов дороже самого отчёта.
+DEFAULT_THRESHOLD = 50_000
+
+
+class DayPrefixSums:
+    """
+    Накопленные по дням суммы дневных итогов архива (см.
+    StorageBackend.daily_totals): число ремонтов и сумма стоимости за
+    любой диапазон дат — разность двух элементов, O(1) после построения
+    за O(число дней архива).
+    """
+
+    def __init__(self, cells: Dict[tuple, list]):
+        days = [key[0] for key in cells]
+        self.first = min(days, default=0)
+        size = max(days, default=-1) - self.first + 1
+        counts = [0] * size
+        costs = [0] * size
+        for (day, _, _), (count, cost) in cells.items():
+            counts[day - self.first] += count
+            costs[day - self.first] += cost
+        self._counts = [0, *accumulate(counts)]
+        self._costs = [0, *accumulate(costs)]
+
+    def totals(self, start: date, end: date) -> tuple:
+        """(число ремонтов, сумма стоимости) за [start, end] включительно."""
+        last = len(self._counts) - 1
+        lo = min(max(start.toordinal() - self.first, 0), last)
+        hi = min(max(end.toordinal() - self.first + 1, 0), last)
+        if hi <= lo:
+            return 0, 0
+        return self._counts[hi] - self._counts[lo], self._costs[hi] - self._costs[lo]
+
+
+class DayCube:
+    """
+    Дневные итоги архива (StorageBackend.daily_totals), разложенные по
+    ячейкам (repair_type, isMechanics): у каждой ячейки свои накопленные
+    по дням суммы (DayPrefixSums). Итог любого диапазона дат с любым
+    сочетанием источника и типа велосипеда — не более 2 × число
+    источников разностей; записи архива при этом не читаются.
+    """
+
+    def __init__(self, cells: Dict[tuple, list]):
+        grouped: Dict[tuple, Dict[tuple, list]] = {}
+        for key, value in cells.items():
+            _, source, mechanics = key
+            grouped.setdefault((source, mechanics), {})[key] = value
+        self._prefixes = {cell: DayPrefixSums(days) for cell, days in grouped.items()}
+        self.sources = {source for source, _ in grouped}
+
+    def totals(self, start: date, end: date, sources=None, mechanics=None) -> tuple:
+        """
+        (число ремонтов, сумма cost) за [start, end] включительно по
+        источникам sources (None — все) и типу велосипеда mechanics
+        (None — оба).
+        """
+        count = cost = 0
+        for source in self.sources if sources is None else sources:
+            for kind in (True, False) if mechanics is None else (mechanics,):
+                prefix = self._prefixes.get((source, kind))
+                if prefix is not None:
+                    cell_count, cell_cost = prefix.totals(start, end)
+                    count += cell_count
+                    cost += cell_cost
+        return count, cost
+
+
+def histogram_quantiles(
+    histogram: Dict[int, int], quantiles: Sequence[float]
+) -> List[Optional[int]]:
+    """
+    Квантили по гистограмме {значение: число наблюдений}: для каждого q —
+    наименьшее значение, до которого включительно набирается не меньше
+    q·N наблюдений (nearest rank). Проход по различным значениям, а не по
+    наблюдениям; для пустой гистограммы — None.
+    """
+    total = sum(histogram.values())
+    if total <= 0:
+        return [None] * len(quantiles)
+    ranks = [max(1, math.ceil(q * total)) for q in quantiles]
+    result: List[Optional[int]] = [None] * len(quantiles)
+    pending = sorted(range(len(ranks)), key=ranks.__getitem__)
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        while pending and ranks[pending[0]] <= seen:
+            result[pending.pop(0)] = value
+        if not pending:
+            break
+    return result
+
+
+def _ordinal(value) -> int:
+    return value if isinstance(value, int) else -1
+
+
+class ColumnarArchive:
+    """
+    Архивные ремонты с корректной датой архивации в виде колонок NumPy:
+    номер даты создания, номер даты архивации, стоимость, код источника
+    и признак механики, упорядоченные по дате архивации.
+
+    Для каждого источника (и для всех сразу) хранятся номера его строк и
+    префиксные суммы стоимости, поэтому итог любого периода — два
+    бинарных поиска (np.searchsorted) и разность сумм, точная в целых.
+
+    exact — все стоимости записей целые, и итоги совпадают с подсчётом
+    по записям (services.reports.bucket_repairs) в точности. Иначе
+    (дробная или нечисловая стоимость) колонки для отчётов не годятся.
+    """
+
+    def __init__(self, records: Sequence[dict]):
+        # Колонки читаются в порядке records и сортируются уже массивами:
+        # ни промежуточных кортежей на каждую запись, ни обхода словарей
+        # вразнобой.
+        self.exact = all(isinstance(r.get("cost", 0), int) for r in records)
+        self.sources: List[Optional[str]] = sorted(
+            {r.get("repair_type") for r in records}, key=repr
+        )
+        codes = {source: code for code, source in enumerate(self.sources)}
+
+        def column(values, dtype):
+            return np.fromiter(values, dtype=dtype, count=len(records))
+
+        archive_ord = column((_ordinal(archive_ordinal(r)) for r in records), np.int64)
+        # Записи без корректной даты архивации в колонки не попадают.
+        dated = np.flatnonzero(archive_ord >= 0)
+        order = dated[np.argsort(archive_ord[dated], kind="stable")]
+
+        def sorted_column(values, dtype):
+            return column(values, dtype)[order]
+
+        self.archive_ord = archive_ord[order]
+        self.date_ord = sorted_column(
+            (_ordinal(r.get("date_ord")) for r in records), np.int64
+        )
+        self.cost = sorted_column(
+            (r.get("cost", 0) if self.exact else 0 for r in records), np.int64
+        )
+        self.source = sorted_column(
+            (codes[r.get("repair_type")] for r in records), np.int32
+        )
+        self.mechanics = sorted_column(
+            (bool(r.get("isMechanics")) for r in records), bool
+        )
+
+        # Ключ "all" — все источники (None — ремонты без источника).
+        self._rows: Dict[Optional[str], "np.ndarray"] = {"all": np.arange(len(order))}
+        for source, code in codes.items():
+            self._rows[source] = np.flatnonzero(self.source == code)
+        self._prefix = {
+            source: np.concatenate(([0], np.cumsum(self.cost[selected])))
+            for source, selected in self._rows.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.archive_ord)
+
+    def period_totals(
+        self, bounds: Sequence[tuple], source_filter: Optional[str] = "all"
+    ) -> tuple:
+        """
+        Для периодов [(начало, конец), ...] (даты включительно) возвращает
+        (числа ремонтов, суммы стоимости) — списки в порядке bounds.
+        source_filter — ключ источника (repair_type) или 'all'.
+        """
+        selected = self._rows.get(source_filter, self._rows["all"][:0])
+        prefix = self._prefix.get(source_filter, self._prefix["all"][:1])
+        days = self.archive_ord[selected]
+        starts = np.fromiter((s.toordinal() for s, _ in bounds), dtype=np.int64)
+        ends = np.fromiter((e.toordinal() for _, e in bounds), dtype=np.int64)
+        lo = np.searchsorted(days, starts, side="left")
+        hi = np.searchsorted(days, ends, side="right")
+        return (hi - lo).tolist(), (prefix[hi] - prefix[lo]).tolist()
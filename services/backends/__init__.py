@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import config
+
+from .base import StorageBackend
+from .json_backend import (
+    DEFAULT_COMPACT_BYTES,
+    DEFAULT_FLUSH_BATCH,
+    DEFAULT_FLUSH_INTERVAL,
+    DURABILITY_MODES,
+    JsonBackend,
+)
+from .sqlite_backend import SqliteBackend
+
+BACKENDS = ("json", "sqlite")
+
+
+def default_sqlite_path() -> Path:
+    """Путь к файлу SQLite: из config.SQLITE_PATH или рядом с JSON-файлами."""
+    return Path(
+        getattr(config, "SQLITE_PATH", None)
+        or Path(config.ACTIVE_PATH).parent / "repairs.sqlite3"
+    )
+
+
+def default_archive_dir() -> Path:
+    """Каталог партиций архива: из config.ARCHIVE_DIR или рядом с ARCHIVE_PATH."""
+    return Path(
+        getattr(config, "ARCHIVE_DIR", None)
+        or Path(config.ARCHIVE_PATH).parent / "archive"
+    )
+
+
+def create_backend(name: str = None) -> StorageBackend:
+    """
+    Создаёт бэкенд хранилища по имени ('json' или 'sqlite').
+    Если имя не передано, берётся config.STORAGE_BACKEND (по умолчанию 'json').
+    """
+    name = name or getattr(config, "STORAGE_BACKEND", "json")
+    durability = getattr(config, "STORAGE_DURABILITY", "immediate")
+    if name == "json":
+        return JsonBackend(
+            config.ACTIVE_PATH,
+            config.ARCHIVE_PATH,
+            journal_path=getattr(config, "JOURNAL_PATH", None),
+            compact_bytes=getattr(
+                config, "JOURNAL_COMPACT_BYTES", DEFAULT_COMPACT_BYTES
+            ),
+            sequence_path=getattr(config, "ID_SEQUENCE_PATH", None),
+            durability=durability,
+            flush_interval=getattr(
+                config, "JOURNAL_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL
+            ),
+            flush_batch=getattr(config, "JOURNAL_FLUSH_BATCH", DEFAULT_FLUSH_BATCH),
+            archive_dir=default_archive_dir(),
+        )
+    if name == "sqlite":
+        return SqliteBackend(default_sqlite_path(), durability=durability)
+    raise ValueError(
+        f"Неизвестный бэкенд хранилища {name!r} (допустимо: {', '.join(BACKENDS)})."
+    )
+
+
+__all__ = [
+    "DURABILITY_MODES",
+    "StorageBackend",
+    "JsonBackend",
+    "SqliteBackend",
+    "create_backend",
+    "default_archive_dir",
+    "default_sqlite_path",
+]
@@ -0,0 +1,479 @@
+import heapq
+import re
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+def parse_date(value) -> Optional[date]:
+    """
+    Разбирает дату формата 'ДД.ММ.ГГГГ'. Для пустых и некорректных
+    значений возвращает None.
+    """
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%d.%m.%Y").date()
+    except (TypeError, ValueError):
+        return None
+
+
+# Даты хранятся строками 'ДД.ММ.ГГГГ' для показа и дополнительно —
+# порядковым номером дня (date.toordinal()) для сравнений и сортировок,
+# чтобы не разбирать строку при каждом обращении.
+DATE_ORDINAL_FIELDS = {"date": "date_ord", "archive_date": "archive_date_ord"}
+
+
+def with_date_ordinals(record: dict) -> dict:
+    """
+    Возвращает копию записи с актуальными полями date_ord и
+    archive_date_ord. Для пустой или некорректной даты номер — None;
+    если самой даты в записи нет, нет и её номера.
+    """
+    record = dict(record)
+    for field, ordinal_field in DATE_ORDINAL_FIELDS.items():
+        if field in record:
+            day = parse_date(record[field])
+            record[ordinal_field] = day.toordinal() if day is not None else None
+        else:
+            record.pop(ordinal_field, None)
+    return record
+
+
+# Порядок списка активных ремонтов: по дате создания (сначала давние,
+# записи без даты — в конце) или по ID.
+ACTIVE_ORDERS = ("date", "id")
+
+
+def active_sort_key(order: str) -> Callable[[dict], tuple]:
+    """Ключ сортировки активных ремонтов для порядка из ACTIVE_ORDERS."""
+    if order == "id":
+        return lambda r: (r.get("id") is None, r.get("id") or 0)
+    return lambda r: (
+        r.get("date_ord") is None,
+        r.get("date_ord") or 0,
+        r.get("id") is None,
+        r.get("id") or 0,
+    )
+
+
+def totals_key(record: dict) -> Optional[tuple]:
+    """
+    Ключ ячейки дневных итогов архива: (номер дня архивации, repair_type,
+    isMechanics). None — для записи без корректной даты архивации.
+    """
+    ordinal = record.get("archive_date_ord")
+    if ordinal is None:
+        return None
+    return (ordinal, record.get("repair_type"), bool(record.get("isMechanics")))
+
+
+def totals_cost(record: dict):
+    """
+    Вклад записи в сумму дневных итогов. Нечисловая стоимость считается
+    нулевой, чтобы испорченная запись не ломала учёт при каждом изменении.
+    """
+    cost = record.get("cost")
+    return cost if isinstance(cost, (int, float)) else 0
+
+
+def compute_daily_totals(records: Iterable[dict]) -> Dict[tuple, List[int]]:
+    """
+    Считает дневные итоги архива с нуля: {ключ ячейки: [число, сумма cost]}
+    (см. totals_key). Эталон для проверки поддерживаемых итогов.
+    """
+    totals: Dict[tuple, List[int]] = {}
+    for record in records:
+        key = totals_key(record)
+        if key is not None:
+            cell = totals.setdefault(key, [0, 0])
+            cell[0] += 1
+            cell[1] += totals_cost(record)
+    return totals
+
+
+# Стоимость в конце пункта поломок: 'Замена цепи 1200' (тот же формат,
+# что разбирает utils.formatter.parse_breakdowns_with_cost).
+_BREAKDOWN_COST = re.compile(r"\s+(\d+)$")
+
+
+def breakdown_items(record: dict) -> List[list]:
+    """
+    Нормализованные пункты поломок записи: [[название, выручка], ...].
+
+    Название — текст пункта без стоимости в конце, с одинарными пробелами
+    и заглавной только первой буквой, чтобы 'замена  цепи 500' и
+    'Замена цепи' считались одной поломкой. Выручка пункта — указанная
+    в нём стоимость; остаток стоимости ремонта (cost) поровну делится
+    между пунктами без стоимости (например, из каталога поломок
+    электровелосипедов).
+    """
+    items = []
+    for raw in record.get("breakdowns") or ():
+        if not isinstance(raw, str):
+            continue
+        text = " ".join(raw.split())
+        match = _BREAKDOWN_COST.search(text)
+        name = text[: match.start()] if match else text
+        if not name:
+            continue
+        cost = int(match.group(1)) if match else None
+        items.append([name[:1].upper() + name[1:].lower(), cost])
+    unpriced = [item for item in items if item[1] is None]
+    if unpriced:
+        rest = int(totals_cost(record)) - sum(
+            item[1] for item in items if item[1] is not None
+        )
+        share, extra = divmod(max(rest, 0), len(unpriced))
+        for i, item in enumerate(unpriced):
+            item[1] = share + (1 if i < extra else 0)
+    return items
+
+
+def archive_month(record: dict) -> Optional[str]:
+    """'ГГГГ-ММ' даты архивации записи или None, если даты нет."""
+    ordinal = record.get("archive_date_ord")
+    if ordinal is None:
+        return None
+    day = date.fromordinal(ordinal)
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+def compute_breakdown_totals(records: Iterable[dict]) -> Dict[tuple, List[int]]:
+    """
+    Считает счётчики поломок архива с нуля: {('ГГГГ-ММ' месяца архивации,
+    repair_type, название): [число, выручка]} (см. breakdown_items).
+    Записи без корректной даты архивации не учитываются.
+    """
+    totals: Dict[tuple, List[int]] = {}
+    for record in records:
+        month = archive_month(record)
+        if month is None:
+            continue
+        for name, revenue in breakdown_items(record):
+            cell = totals.setdefault((month, record.get("repair_type"), name), [0, 0])
+            cell[0] += 1
+            cell[1] += revenue
+    return totals
+
+
+def turnaround_days(record: dict) -> Optional[int]:
+    """
+    Срок ремонта в днях: от даты создания (date) до даты архивации.
+    None — одной из дат нет или архивация раньше создания.
+    """
+    created, archived = record.get("date_ord"), record.get("archive_date_ord")
+    if created is None or archived is None or archived < created:
+        return None
+    return archived - created
+
+
+def compute_turnaround_totals(records: Iterable[dict]) -> Dict[tuple, List[int]]:
+    """
+    Считает гистограммы сроков ремонта с нуля: {('ГГГГ-ММ' месяца
+    архивации, repair_type, срок в днях): [число ремонтов, сумма сроков]}
+    (см. turnaround_days). Гистограммы месяцев и источников складываются
+    без потерь, поэтому квантили любого набора месяцев считаются по ним
+    точно, без сортировки самих сроков.
+    """
+    totals: Dict[tuple, List[int]] = {}
+    for record in records:
+        days = turnaround_days(record)
+        if days is None:
+            continue
+        cell = totals.setdefault(
+            (archive_month(record), record.get("repair_type"), days), [0, 0]
+        )
+        cell[0] += 1
+        cell[1] += days
+    return totals
+
+
+def describe_key(key: tuple) -> str:
+    return " / ".join(str(part) for part in key)
+
+
+def describe_daily_key(key: tuple) -> str:
+    return (
+        f"{date.fromordinal(key[0]):%d.%m.%Y} {key[1]} "
+        f"{'механика' if key[2] else 'электро'}"
+    )
+
+
+def diff_totals(
+    kept: Dict[tuple, list],
+    fresh: Dict[tuple, list],
+    describe: Callable[[tuple], str] = describe_key,
+) -> List[str]:
+    """
+    Описывает расхождения между поддерживаемыми и пересчитанными итогами
+    ({ключ: [число, сумма]}); describe — подпись ключа в сообщении.
+    """
+    problems = []
+    for key in sorted(kept.keys() | fresh.keys(), key=repr):
+        if list(kept.get(key, (0, 0))) != list(fresh.get(key, (0, 0))):
+            problems.append(
+                f"{describe(key)}: было {kept.get(key)}, по записям {fresh.get(key)}"
+            )
+    return problems
+
+
+def has_date_ordinals(record: dict) -> bool:
+    """Проставлены ли в записи номера дат (для уже нормализованных данных)."""
+    return all(
+        (ordinal_field in record) == (field in record)
+        for field, ordinal_field in DATE_ORDINAL_FIELDS.items()
+    )
+
+
+class StorageBackend(ABC):
+    """
+    Базовый интерфейс хранилища ремонтов.
+
+    Бэкенд отвечает только за примитивные операции над двумя наборами
+    записей — активными и архивными ремонтами. Бизнес-правила (проставление
+    даты архивации, фильтры, отчёты) живут в `services.storage`, который
+    вызывает методы бэкенда под своей блокировкой `storage.lock`, поэтому
+    сами бэкенды не обязаны быть потокобезопасными.
+
+    Записи — обычные словари того же формата, что и в JSON-файлах.
+    Методы get_* отдают копии записей, методы list_* — новые списки,
+    элементы которых менять на месте нельзя (они могут разделяться
+    с резидентными данными бэкенда).
+    """
+
+    @abstractmethod
+    def list_active(self) -> List[dict]:
+        """Возвращает все активные ремонты."""
+
+    @abstractmethod
+    def list_archive(self) -> List[dict]:
+        """Возвращает все архивные ремонты."""
+
+    @abstractmethod
+    def get_active(self, repair_id: int) -> Optional[dict]:
+        """Возвращает активный ремонт по ID или None."""
+
+    @abstractmethod
+    def get_archive(self, repair_id: int) -> Optional[dict]:
+        """Возвращает архивный ремонт по ID или None."""
+
+    @abstractmethod
+    def next_id(self) -> int:
+        """
+        Возвращает ID, который получит следующий ремонт, не резервируя его.
+        """
+
+    @abstractmethod
+    def allocate_id(self) -> int:
+        """
+        Резервирует и возвращает новый ID ремонта. ID монотонно растут
+        и никогда не выдаются повторно — даже если ремонт с ранее выданным
+        ID был удалён. Счётчик сохраняется до того, как ID будет выдан,
+        поэтому сбой может лишь оставить пропуск в нумерации.
+        """
+
+    @abstractmethod
+    def insert_active(self, record: dict) -> bool:
+        """Добавляет запись (с уже проставленным ID) в активные."""
+
+    @abstractmethod
+    def insert_archive(self, record: dict) -> bool:
+        """Добавляет запись (с уже проставленным ID) в архив."""
+
+    @abstractmethod
+    def update_active(self, repair_id: int, field_name: str, new_value) -> bool:
+        """Меняет одно поле активного ремонта. False, если ремонт не найден."""
+
+    @abstractmethod
+    def update_archive(self, repair_id: int, field_name: str, new_value) -> bool:
+        """Меняет одно поле архивного ремонта. False, если ремонт не найден."""
+
+    @abstractmethod
+    def move_to_archive(self, repair_id: int, archive_date: str) -> bool:
+        """
+        Переносит ремонт из активных в архив, проставляя `archive_date`.
+        False, если активного ремонта с таким ID нет.
+        """
+
+    @abstractmethod
+    def move_to_active(self, repair_id: int) -> bool:
+        """
+        Переносит ремонт из архива в активные, удаляя `archive_date`.
+        False, если архивного ремонта с таким ID нет.
+        """
+
+    @abstractmethod
+    def delete_archive(self, repair_id: int) -> bool:
+        """Безвозвратно удаляет архивный ремонт. False, если он не найден."""
+
+    @abstractmethod
+    def replace_active(self, records: List[dict]) -> bool:
+        """Полностью заменяет набор активных ремонтов."""
+
+    @abstractmethod
+    def replace_archive(self, records: List[dict]) -> bool:
+        """Полностью заменяет набор архивных ремонтов."""
+
+    def count_active(self) -> int:
+        """Число активных ремонтов."""
+        return len(self.list_active())
+
+    def list_active_page(
+        self, offset: int, limit: int, order: str = "date"
+    ) -> List[dict]:
+        """
+        Возвращает срез [offset, offset + limit) активных ремонтов в порядке
+        order (см. ACTIVE_ORDERS). По умолчанию выбирает первые
+        offset + limit записей без полной сортировки списка.
+        """
+        first = heapq.nsmallest(
+            offset + limit, self.list_active(), key=active_sort_key(order)
+        )
+        return first[offset:]
+
+    def count_archive(self) -> int:
+        """Число архивных ремонтов."""
+        return len(self.list_archive())
+
+    def list_archive_range(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Возвращает архивные ремонты с archive_date в диапазоне
+        [start, end] включительно, отсортированные по дате архивации
+        (при равной дате — по ID). Записи без даты или с некорректной
+        датой в выборку не попадают. source — только ремонты с этим
+        repair_type (None — все).
+
+        Реализация по умолчанию просматривает весь архив; бэкенды
+        переопределяют её индексами по дате и источнику: O(log n + k).
+        """
+        first, last = start.toordinal(), end.toordinal()
+        return sorted(
+            (
+                r
+                for r in self.list_archive()
+                if r.get("archive_date_ord") is not None
+                and first <= r["archive_date_ord"] <= last
+                and (source is None or r.get("repair_type") == source)
+            ),
+            key=lambda r: (r["archive_date_ord"], r.get("id") or 0),
+        )
+
+    def daily_totals(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> Dict[tuple, List[int]]:
+        """
+        Возвращает дневные итоги архива за [start, end]: {(номер дня,
+        repair_type, isMechanics): [число ремонтов, сумма cost]}.
+        source — только этот repair_type (None — все).
+
+        Реализация по умолчанию считает итоги по записям диапазона;
+        бэкенды переопределяют её материализованными итогами, которые
+        обновляются при каждом изменении архива.
+        """
+        return compute_daily_totals(self.list_archive_range(start, end, source))
+
+    def rebuild_daily_totals(self) -> List[str]:
+        """
+        Пересчитывает материализованные дневные итоги по всем записям
+        архива и заменяет ими поддерживаемые. Возвращает описания
+        найденных расхождений (пустой список — итоги были верны).
+        """
+        return []
+
+    def _months_range(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> List[dict]:
+        """Архивные записи целых месяцев, пересекающих [start, end]."""
+        first = start.replace(day=1)
+        last = date(end.year + end.month // 12, end.month % 12 + 1, 1)
+        return self.list_archive_range(first, last - timedelta(days=1), source)
+
+    def breakdown_totals(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> Dict[tuple, List[int]]:
+        """
+        Возвращает счётчики поломок по месяцам архивации, пересекающим
+        [start, end]: {('ГГГГ-ММ', repair_type, название): [число, выручка]}
+        (см. breakdown_items). source — только этот repair_type.
+
+        Реализация по умолчанию разбирает поломки записей этих месяцев;
+        бэкенды переопределяют её счётчиками, которые обновляются при
+        каждом изменении архива.
+        """
+        return compute_breakdown_totals(self._months_range(start, end, source))
+
+    def rebuild_breakdown_totals(self) -> List[str]:
+        """
+        Пересчитывает счётчики поломок по всем записям архива (как
+        rebuild_daily_totals). Возвращает описания найденных расхождений.
+        """
+        return []
+
+    def turnaround_totals(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> Dict[tuple, List[int]]:
+        """
+        Возвращает гистограммы сроков ремонта по месяцам архивации,
+        пересекающим [start, end]: {('ГГГГ-ММ', repair_type, срок в днях):
+        [число, сумма сроков]} (см. compute_turnaround_totals). source —
+        только этот repair_type. По умолчанию считаются по записям этих
+        месяцев, как breakdown_totals.
+        """
+        return compute_turnaround_totals(self._months_range(start, end, source))
+
+    def rebuild_turnaround_totals(self) -> List[str]:
+        """
+        Пересчитывает гистограммы сроков ремонта по всем записям архива (как
+        rebuild_daily_totals). Возвращает описания найденных расхождений.
+        """
+        return []
+
+    def rebuild_aggregates(self) -> List[str]:
+        """
+        Пересчитывает все материализованные итоги архива (дневные итоги,
+        счётчики поломок, гистограммы сроков). Возвращает расхождения.
+        """
+        return (
+            self.rebuild_daily_totals()
+            + self.rebuild_breakdown_totals()
+            + self.rebuild_turnaround_totals()
+        )
+
+    def delete_archive_before(self, cutoff: date) -> int:
+        """
+        Безвозвратно удаляет архивные ремонты с archive_date раньше
+        `cutoff`. Записи без даты или с некорректной датой сохраняются.
+        Возвращает число удалённых записей.
+        """
+        records = self.list_archive()
+        kept = [
+            r
+            for r in records
+            if r.get("archive_date_ord") is None
+            or r["archive_date_ord"] >= cutoff.toordinal()
+        ]
+        if len(kept) == len(records) or not self.replace_archive(kept):
+            return 0
+        return len(records) - len(kept)
+
+    def generation(self) -> int:
+        """
+        Поколение данных бэкенда: меняется, когда бэкенд видит изменения,
+        сделанные в обход него (другим процессом или правкой файлов), и
+        перечитывает данные. Свои изменения поколение не меняют — их
+        учитывает версия services.storage (см. storage.data_version).
+        """
+        return 0
+
+    def flush(self) -> bool:
+        """
+        Дописывает на диск изменения, отложенные бэкендом (если он их
+        откладывает). Возвращает False, если запись не удалась.
+        """
+        return True
+
+    def close(self) -> None:
+        """Освобождает ресурсы бэкенда (соединения, файлы)."""
@@ -0,0 +1,1522 @@
+import bisect
+import json
+import logging
+import os
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .base import (
+    ACTIVE_ORDERS,
+    DATE_ORDINAL_FIELDS,
+    StorageBackend,
+    active_sort_key,
+    compute_breakdown_totals,
+    compute_daily_totals,
+    compute_turnaround_totals,
+    describe_daily_key,
+    describe_key,
+    diff_totals,
+    has_date_ordinals,
+    with_date_ordinals,
+)
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = "active"
+ARCHIVE = "archive"
+
+# Партиция архива для записей без archive_date или с некорректной датой.
+UNDATED = "undated"
+MANIFEST_NAME = "manifest.json"
+
+# Размер журнала по умолчанию, после которого он сворачивается в снимки.
+DEFAULT_COMPACT_BYTES = 512 * 1024
+
+# Режимы надёжности записи журнала:
+#   immediate — каждая операция сразу дописывается в файл (по умолчанию);
+#   batched   — операции копятся в памяти и дописываются пачкой раз в
+#               flush_interval секунд или по достижении flush_batch операций;
+#   fsync     — каждая операция дописывается и сбрасывается на диск (fsync).
+DURABILITY_MODES = ("immediate", "batched", "fsync")
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_FLUSH_BATCH = 50
+
+
+def _file_signature(path: Path) -> Optional[tuple]:
+    """
+    Возвращает сигнатуру файла (mtime_ns, size) или None,
+    если файла нет или он недоступен.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _read_json(path: Path) -> list:
+    """
+    Читает и разбирает JSON файл по указанному пути.
+    Возвращает пустой список, если файл не существует, повреждён
+    или недоступен для чтения — чтобы бот не падал целиком из-за
+    проблем с одним файлом хранилища.
+    """
+    if not path.exists():
+        return []
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except json.JSONDecodeError:
+        logger.exception("Файл %s повреждён (невалидный JSON).", path)
+        return []
+    except OSError:
+        logger.exception("Не удалось прочитать файл %s.", path)
+        return []
+
+    if not isinstance(data, list):
+        logger.error(
+            "Файл %s содержит неожиданный формат данных (ожидался список).", path
+        )
+        return []
+    return data
+
+
+def _read_records(path: Path) -> list:
+    """
+    Читает список записей и проставляет номера дат тем записям, у которых
+    их ещё нет (файлы до миграции date-ordinals). Разбор строк с датами
+    происходит здесь один раз при загрузке, дальше используются номера.
+    """
+    return [
+        r if has_date_ordinals(r) else with_date_ordinals(r)
+        for r in _read_json(path)
+        if isinstance(r, dict)
+    ]
+
+
+def _write_json(path: Path, data, fsync: bool = False) -> bool:
+    """
+    Сохраняет данные в JSON файл по указанному пути.
+    Пишет во временный файл и атомарно переименовывает его в целевой,
+    чтобы при сбое посреди записи не повредить существующие данные.
+    С fsync=True временный файл сбрасывается на диск до переименования.
+    Возвращает True при успехе, False при ошибке записи.
+    """
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        tmp_path.replace(path)
+        return True
+    except OSError:
+        logger.exception("Не удалось сохранить файл %s.", path)
+        return False
+
+
+class _Table:
+    """
+    Набор записей (активные или архив) с хеш-индексом id -> позиция.
+
+    Порядок записей сохраняется как в файле. Удалённая запись оставляет
+    в списке «дырку» (None), поэтому удаление не сдвигает позиции
+    остальных записей; дырки вычищаются разом, когда их становится
+    больше половины списка. Так поиск, замена и удаление по ID стоят O(1)
+    (амортизированно) независимо от числа записей.
+
+    Если в файле встретились дубли ID, индекс указывает на первую запись
+    с этим ID — как и прежний линейный поиск.
+    """
+
+    __slots__ = ("_slots", "_pos", "_holes", "_dups")
+
+    def __init__(self, records: list = ()):
+        self._slots: list = list(records)
+        self._pos: Dict[int, int] = {}
+        self._holes = 0
+        self._dups: set = set()
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._slots = [r for r in self._slots if r is not None]
+        self._holes = 0
+        self._pos = {}
+        self._dups = set()
+        for i, record in enumerate(self._slots):
+            repair_id = record.get("id")
+            if repair_id is None:
+                continue
+            if repair_id in self._pos:
+                self._dups.add(repair_id)
+            else:
+                self._pos[repair_id] = i
+
+    def __len__(self) -> int:
+        return len(self._slots) - self._holes
+
+    def __contains__(self, repair_id) -> bool:
+        return repair_id in self._pos
+
+    def records(self) -> list:
+        """Возвращает записи в исходном порядке (новый список)."""
+        if not self._holes:
+            return list(self._slots)
+        return [r for r in self._slots if r is not None]
+
+    def get(self, repair_id) -> Optional[dict]:
+        i = self._pos.get(repair_id)
+        return self._slots[i] if i is not None else None
+
+    def upsert(self, record: dict) -> None:
+        """Заменяет запись с тем же ID или добавляет новую в конец."""
+        repair_id = record.get("id")
+        i = self._pos.get(repair_id)
+        if i is not None:
+            self._slots[i] = record
+            return
+        self._slots.append(record)
+        if repair_id is not None:
+            self._pos[repair_id] = len(self._slots) - 1
+
+    def remove(self, repair_id) -> Optional[dict]:
+        i = self._pos.pop(repair_id, None)
+        if i is None:
+            return None
+        record = self._slots[i]
+        self._slots[i] = None
+        self._holes += 1
+        if self._holes * 2 > len(self._slots):
+            self._reindex()
+        elif repair_id in self._dups:
+            # Дубль этого ID дальше по списку становится видимым.
+            self._dups.discard(repair_id)
+            for j in range(i + 1, len(self._slots)):
+                other = self._slots[j]
+                if other is not None and other.get("id") == repair_id:
+                    if repair_id in self._pos:
+                        self._dups.add(repair_id)
+                        break
+                    self._pos[repair_id] = j
+        return record
+
+    def check_consistency(self) -> List[str]:
+        """
+        Сверяет индекс со списком записей. Возвращает список найденных
+        расхождений (пустой — индекс корректен).
+        """
+        problems = []
+        expected: Dict[int, int] = {}
+        holes = 0
+        for i, record in enumerate(self._slots):
+            if record is None:
+                holes += 1
+                continue
+            repair_id = record.get("id")
+            if repair_id is not None:
+                expected.setdefault(repair_id, i)
+        if holes != self._holes:
+            problems.append(f"счётчик дырок {self._holes}, фактически {holes}")
+        for repair_id, i in expected.items():
+            if self._pos.get(repair_id) != i:
+                problems.append(
+                    f"ID {repair_id}: индекс -> {self._pos.get(repair_id)}, "
+                    f"в списке на позиции {i}"
+                )
+        for repair_id in self._pos.keys() - expected.keys():
+            problems.append(f"ID {repair_id} есть в индексе, но не в списке")
+        return problems
+
+
+class _ActiveTable(_Table):
+    """
+    Таблица активных ремонтов с отсортированными ключами для каждого
+    порядка из ACTIVE_ORDERS (ключ active_sort_key, последний элемент —
+    ID). Страница списка — срез ключей и чтение записей страницы по ID,
+    вставка и удаление — бинарный поиск. В ключах только видимые по ID
+    записи с целым ID; если есть другие (дубли, записи без ID), page()
+    возвращает None и страница выбирается по полному списку.
+    """
+
+    __slots__ = ("_orders",)
+
+    def __init__(self, records: list = ()):
+        super().__init__(records)
+        self._orders: Dict[str, list] = {
+            order: sorted(
+                filter(None, (self._entry(order, self.get(i)) for i in self._pos))
+            )
+            for order in ACTIVE_ORDERS
+        }
+
+    @staticmethod
+    def _entry(order: str, record: Optional[dict]) -> Optional[tuple]:
+        if record is None or not isinstance(record.get("id"), int):
+            return None
+        return active_sort_key(order)(record)
+
+    def _add(self, record: Optional[dict]) -> None:
+        for order, entries in self._orders.items():
+            entry = self._entry(order, record)
+            if entry is not None:
+                bisect.insort(entries, entry)
+
+    def _discard(self, record: Optional[dict]) -> None:
+        for order, entries in self._orders.items():
+            entry = self._entry(order, record)
+            if entry is None:
+                continue
+            i = bisect.bisect_left(entries, entry)
+            if i < len(entries) and entries[i] == entry:
+                del entries[i]
+
+    def upsert(self, record: dict) -> None:
+        self._discard(self.get(record.get("id")))
+        super().upsert(record)
+        self._add(self.get(record.get("id")))
+
+    def remove(self, repair_id) -> Optional[dict]:
+        record = super().remove(repair_id)
+        self._discard(record)
+        # Дубль удалённого ID дальше по списку становится видимым.
+        self._add(self.get(repair_id))
+        return record
+
+    def page(self, offset: int, limit: int, order: str) -> Optional[List[dict]]:
+        """
+        Записи [offset, offset + limit) в порядке order или None, если
+        ключи покрывают не все записи таблицы.
+        """
+        entries = self._orders["id" if order == "id" else "date"]
+        if len(entries) != len(self):
+            return None
+        return [self.get(entry[-1]) for entry in entries[offset : offset + limit]]
+
+    def check_consistency(self) -> List[str]:
+        problems = super().check_consistency()
+        if self._orders != _ActiveTable(self.records())._orders:
+            problems.append("ключи сортировки не совпадают с записями")
+        return problems
+
+
+class _DateIndex:
+    """
+    Отсортированный список пар (archive_date_ord, id) одной партиции.
+    Выборка по диапазону дат — два бинарных поиска и срез, вставка и
+    удаление — бинарный поиск и сдвиг списка внутри одного месяца.
+    Записи без даты или без целого ID в индекс не попадают.
+    """
+
+    __slots__ = ("_entries",)
+
+    def __init__(self, records: Iterable[dict] = ()):
+        self._entries = sorted(
+            e for e in map(self._entry, records) if e is not None
+        )
+
+    @staticmethod
+    def _entry(record: dict) -> Optional[tuple]:
+        ordinal, repair_id = record.get("archive_date_ord"), record.get("id")
+        if ordinal is None or not isinstance(repair_id, int):
+            return None
+        return (ordinal, repair_id)
+
+    def add(self, record: dict) -> None:
+        entry = self._entry(record)
+        if entry is not None:
+            bisect.insort(self._entries, entry)
+
+    def discard(self, record: Optional[dict]) -> None:
+        entry = self._entry(record) if record is not None else None
+        if entry is None:
+            return
+        i = bisect.bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def ids_between(self, first: int, last: int) -> List[int]:
+        """ID записей с номером даты в [first, last] по возрастанию даты."""
+        lo = bisect.bisect_left(self._entries, (first,))
+        hi = bisect.bisect_left(self._entries, (last + 1,))
+        return [repair_id for _, repair_id in self._entries[lo:hi]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, _DateIndex) and self._entries == other._entries
+
+
+# Итоги партиций, которые ведёт _PartitionIndex и хранит манифест:
+# атрибут индекса -> функция, считающая их по записям с нуля.
+AGGREGATES = {
+    "totals": compute_daily_totals,
+    "breakdowns": compute_breakdown_totals,
+    "turnaround": compute_turnaround_totals,
+}
+
+
+class _PartitionIndex:
+    """
+    Индексы дат одной партиции архива: общий и по корзине на каждый
+    источник (repair_type). Выборка с фильтром по источнику проходит
+    только по записям этого источника — небольшие источники не платят
+    за размер всего архива.
+
+    Итоги партиции (AGGREGATES) обновляются вместе с индексами:
+    totals — дневные итоги {(номер дня, repair_type, isMechanics): [число,
+    сумма cost]}, breakdowns — счётчики поломок {('ГГГГ-ММ', repair_type,
+    название): [число, выручка]}, turnaround — гистограмма сроков ремонта
+    {('ГГГГ-ММ', repair_type, дней): [число, сумма сроков]}.
+    """
+
+    __slots__ = ("all", "by_source", *AGGREGATES)
+
+    def __init__(self, records: Iterable[dict] = ()):
+        records = list(records)
+        self.all = _DateIndex(records)
+        grouped: Dict[Optional[str], List[dict]] = {}
+        for record in records:
+            grouped.setdefault(record.get("repair_type"), []).append(record)
+        self.by_source: Dict[Optional[str], _DateIndex] = {
+            source: _DateIndex(part) for source, part in grouped.items()
+        }
+        for field, compute in AGGREGATES.items():
+            setattr(self, field, compute(records))
+
+    @staticmethod
+    def _merge(cells: Dict[tuple, list], delta: Dict[tuple, list], sign: int) -> None:
+        for key, (count, amount) in delta.items():
+            cell = cells.setdefault(key, [0, 0])
+            cell[0] += sign * count
+            cell[1] += sign * amount
+            if cell[0] <= 0:
+                del cells[key]
+
+    def _merge_record(self, record: dict, sign: int) -> None:
+        for field, compute in AGGREGATES.items():
+            self._merge(getattr(self, field), compute((record,)), sign)
+
+    def add(self, record: dict) -> None:
+        self.all.add(record)
+        source = record.get("repair_type")
+        bucket = self.by_source.get(source)
+        if bucket is None:
+            bucket = self.by_source[source] = _DateIndex()
+        bucket.add(record)
+        self._merge_record(record, 1)
+
+    def discard(self, record: Optional[dict]) -> None:
+        if record is None:
+            return
+        self.all.discard(record)
+        bucket = self.by_source.get(record.get("repair_type"))
+        if bucket is not None:
+            bucket.discard(record)
+        self._merge_record(record, -1)
+
+    def ids_between(self, first: int, last: int, source=None) -> List[int]:
+        if source is None:
+            return self.all.ids_between(first, last)
+        bucket = self.by_source.get(source)
+        return bucket.ids_between(first, last) if bucket is not None else []
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, _PartitionIndex) or self.all != other.all:
+            return False
+        if any(getattr(self, f) != getattr(other, f) for f in AGGREGATES):
+            return False
+        # Пустые корзины (источник, из которого всё удалено) не в счёт.
+        mine = {s: b for s, b in self.by_source.items() if len(b)}
+        theirs = {s: b for s, b in other.by_source.items() if len(b)}
+        return mine == theirs
+
+
+def _month_key(day: date) -> str:
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+def _partition_key(record: dict) -> str:
+    """Ключ месячной партиции архива ('ГГГГ-ММ') по номеру даты архивации."""
+    ordinal = record.get("archive_date_ord")
+    return _month_key(date.fromordinal(ordinal)) if ordinal else UNDATED
+
+
+def _key_order(key: str) -> tuple:
+    # Записи без даты идут первыми, затем месяцы по возрастанию.
+    return (key != UNDATED, key)
+
+
+class _PartitionedTable:
+    """
+    Архив, разбитый на месячные партиции по archive_date: каталог
+    с файлами 'ГГГГ-ММ.json' (и 'undated.json') плюс манифест
+    с числом записей и диапазоном ID каждой партиции.
+
+    Интерфейс тот же, что у _Table, но партиции читаются с диска
+    лениво — только когда к ним обращаются: выборка за пару месяцев
+    открывает пару файлов, а поиск по ID — партиции, в диапазон ID
+    которых он попадает. Изменение помечает свою партицию «грязной»,
+    и при сворачивании журнала переписываются только такие партиции.
+
+    Партиция, которой нет в манифесте, считается пустой, даже если её
+    файл существует: её содержимое ещё не зафиксировано (или она
+    удалена) и полностью восстанавливается из журнала.
+
+    Для каждой загруженной партиции поддерживается _PartitionIndex, поэтому
+    выборка по диапазону дат (и, при необходимости, по источнику) стоит
+    O(число месяцев + log n + k) и сразу отсортирована по дате архивации.
+
+    Дневные итоги партиции сохраняются в манифест при сворачивании,
+    поэтому итоги за период читаются без загрузки самих партиций.
+    """
+
+    def __init__(self, directory: Path, legacy_path: Optional[Path] = None):
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / MANIFEST_NAME
+        self._parts: Dict[str, _Table] = {}
+        self._indexes: Dict[str, _PartitionIndex] = {}
+        self._meta: Dict[str, dict] = {}
+        self._where: Dict[int, str] = {}
+        self._signatures: Dict[Path, Optional[tuple]] = {}
+        self._dirty: set = set()
+        self._dropped: set = set()
+        # True, если манифеста не было и архив загружен из старого
+        # монолитного файла: его нужно сразу разложить по партициям.
+        self.needs_snapshot = False
+
+        manifest = self._read_manifest()
+        if manifest is not None:
+            self._meta = manifest
+        else:
+            if legacy_path is not None and legacy_path.exists():
+                logger.info(
+                    "Манифест %s не найден — архив загружается из %s "
+                    "и будет разложен по месячным партициям.",
+                    self.manifest_path,
+                    legacy_path,
+                )
+                self._install_all(_read_records(legacy_path))
+            else:
+                self._install_all(self._scan_partitions())
+            self.needs_snapshot = bool(self._parts)
+        self.remember_signatures()
+
+    # --- Чтение с диска ---
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _read_manifest(self) -> Optional[Dict[str, dict]]:
+        """
+        Читает манифест. None — если его нет или он повреждён (тогда
+        партиции собираются по файлам каталога).
+        """
+        try:
+            with self.manifest_path.open("r", encoding="utf-8") as f:
+                partitions = json.load(f)["partitions"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.exception("Манифест архива %s повреждён.", self.manifest_path)
+            return None
+        if not isinstance(partitions, dict):
+            logger.error("Манифест архива %s повреждён.", self.manifest_path)
+            return None
+        return partitions
+
+    def _scan_partitions(self) -> List[dict]:
+        """Читает все файлы партиций каталога (если манифест утерян)."""
+        records = []
+        if self.directory.is_dir():
+            for path in sorted(self.directory.glob("*.json")):
+                if path.name != MANIFEST_NAME:
+                    records.extend(_read_records(path))
+        return records
+
+    def _install(self, key: str, records: Iterable[dict]) -> _Table:
+        table = _Table(records)
+        self._parts[key] = table
+        self._indexes[key] = _PartitionIndex(table.records())
+        for record in table.records():
+            repair_id = record.get("id")
+            if repair_id is not None:
+                self._where.setdefault(repair_id, key)
+        return table
+
+    def _install_all(self, records: Iterable[dict]) -> None:
+        grouped: Dict[str, List[dict]] = {}
+        for record in records:
+            grouped.setdefault(_partition_key(record), []).append(record)
+        for key, part in grouped.items():
+            self._install(key, part)
+            self._dirty.add(key)
+
+    def _load(self, key: str) -> _Table:
+        table = self._parts.get(key)
+        if table is None:
+            path = self._path(key)
+            if key in self._meta:
+                self._signatures[path] = _file_signature(path)
+                table = self._install(key, _read_records(path))
+            else:
+                table = self._install(key, ())
+        return table
+
+    def changed_on_disk(self) -> bool:
+        """Изменились ли манифест или прочитанные партиции с момента чтения."""
+        return any(
+            signature != _file_signature(path)
+            for path, signature in self._signatures.items()
+        )
+
+    def remember_signatures(self) -> None:
+        self._signatures = {self.manifest_path: _file_signature(self.manifest_path)}
+        for key in self._parts:
+            if key in self._meta:
+                path = self._path(key)
+                self._signatures[path] = _file_signature(path)
+
+    # --- Поиск по ID ---
+
+    def _locate(self, repair_id) -> Optional[str]:
+        """
+        Возвращает ключ партиции с записью `repair_id`, подгружая
+        партиции, в диапазон ID которых он попадает.
+        """
+        key = self._where.get(repair_id)
+        if key is not None or not isinstance(repair_id, int):
+            return key
+        for key, meta in list(self._meta.items()):
+            if key in self._parts:
+                continue
+            low, high = meta.get("min_id"), meta.get("max_id")
+            if low is not None and high is not None and low <= repair_id <= high:
+                self._load(key)
+                if repair_id in self._where:
+                    return self._where[repair_id]
+        return None
+
+    # --- Интерфейс _Table ---
+
+    def __len__(self) -> int:
+        return sum(self.count(key) for key in self.keys())
+
+    def __contains__(self, repair_id) -> bool:
+        return self._locate(repair_id) is not None
+
+    def keys(self) -> List[str]:
+        return sorted(self._meta.keys() | self._parts.keys(), key=_key_order)
+
+    def count(self, key: str) -> int:
+        table = self._parts.get(key)
+        if table is not None:
+            return len(table)
+        return self._meta.get(key, {}).get("count", 0)
+
+    def records(self) -> list:
+        result = []
+        for key in self.keys():
+            result.extend(self._load(key).records())
+        return result
+
+    def records_between(self, first_key: str, last_key: str) -> list:
+        """Записи датированных партиций с ключами в [first_key, last_key]."""
+        result = []
+        for key in self.keys():
+            if key != UNDATED and first_key <= key <= last_key:
+                result.extend(self._load(key).records())
+        return result
+
+    def records_by_date(self, first: date, last: date, source=None) -> list:
+        """
+        Записи с датой архивации в [first, last] (и источником `source`,
+        если он задан), отсортированные по дате, при равной дате — по ID.
+        Читаются только партиции этих месяцев.
+        """
+        first_ord, last_ord = first.toordinal(), last.toordinal()
+        first_key, last_key = _month_key(first), _month_key(last)
+        result = []
+        for key in self.keys():
+            if key == UNDATED or not first_key <= key <= last_key:
+                continue
+            table = self._load(key)
+            result.extend(
+                table.get(repair_id)
+                for repair_id in self._indexes[key].ids_between(
+                    first_ord, last_ord, source
+                )
+            )
+        return result
+
+    def _partition_cells(self, key: str, field: str) -> Dict[tuple, list]:
+        """
+        Итоги партиции (field — AGGREGATES): из индекса загруженной
+        партиции, иначе из манифеста. Если в манифесте их нет (он записан
+        до их появления), партиция загружается.
+        """
+        if key not in self._parts:
+            stored = self._meta.get(key, {}).get(field)
+            if stored is not None:
+                return {tuple(row[:-2]): row[-2:] for row in stored}
+            self._load(key)
+        return getattr(self._indexes[key], field)
+
+    def daily_totals(self, first: date, last: date, source=None) -> Dict[tuple, list]:
+        """Ячейки дневных итогов с днём в [first, last] (и источником)."""
+        first_ord, last_ord = first.toordinal(), last.toordinal()
+        first_key, last_key = _month_key(first), _month_key(last)
+        result = {}
+        for key in self.keys():
+            if key == UNDATED or not first_key <= key <= last_key:
+                continue
+            for cell_key, (count, cost) in self._partition_cells(key, "totals").items():
+                day, cell_source = cell_key[0], cell_key[1]
+                if first_ord <= day <= last_ord and (
+                    source is None or cell_source == source
+                ):
+                    result[cell_key] = [count, cost]
+        return result
+
+    def month_cells(
+        self, field: str, first: date, last: date, source=None
+    ) -> Dict[tuple, list]:
+        """
+        Помесячные итоги `field` (breakdowns, turnaround) месяцев,
+        пересекающих [first, last].
+        """
+        first_key, last_key = _month_key(first), _month_key(last)
+        result = {}
+        for key in self.keys():
+            if key == UNDATED or not first_key <= key <= last_key:
+                continue
+            for cell_key, cell in self._partition_cells(key, field).items():
+                if source is None or cell_key[1] == source:
+                    result[cell_key] = list(cell)
+        return result
+
+    def rebuild_cells(self, field: str, compute) -> tuple:
+        """
+        Пересчитывает итоги `field` всех партиций по их записям функцией
+        compute. Возвращает (прежние итоги из манифеста и индексов,
+        пересчитанные) для сверки.
+        """
+        kept: Dict[tuple, list] = {}
+        for key in self.keys():
+            if key != UNDATED:
+                kept.update(self._partition_cells(key, field))
+        fresh: Dict[tuple, list] = {}
+        for key in self.keys():
+            cells = compute(self._load(key).records())
+            setattr(self._indexes[key], field, cells)
+            if key != UNDATED:
+                fresh.update(cells)
+        return kept, fresh
+
+    def get(self, repair_id) -> Optional[dict]:
+        key = self._locate(repair_id)
+        return self._parts[key].get(repair_id) if key is not None else None
+
+    def upsert(self, record: dict) -> None:
+        repair_id = record.get("id")
+        key = _partition_key(record)
+        current = self._locate(repair_id) if repair_id is not None else None
+        if current is not None and current != key:
+            # Сменилась дата архивации — запись переезжает в другую партицию.
+            self.remove(repair_id)
+        table = self._load(key)
+        index = self._indexes[key]
+        if repair_id is not None:
+            index.discard(table.get(repair_id))
+        table.upsert(record)
+        index.add(record)
+        if repair_id is not None:
+            self._where[repair_id] = key
+        self._dirty.add(key)
+
+    def remove(self, repair_id) -> Optional[dict]:
+        key = self._locate(repair_id)
+        if key is None:
+            return None
+        table = self._parts[key]
+        record = table.remove(repair_id)
+        self._indexes[key].discard(record)
+        if repair_id not in table:
+            del self._where[repair_id]
+        self._dirty.add(key)
+        return record
+
+    def drop(self, keys: Iterable[str]) -> None:
+        """Удаляет партиции целиком, не читая их файлы."""
+        for key in keys:
+            table = self._parts.pop(key, None)
+            self._indexes.pop(key, None)
+            if table is not None:
+                for record in table.records():
+                    if self._where.get(record.get("id")) == key:
+                        del self._where[record.get("id")]
+            self._meta.pop(key, None)
+            self._dirty.discard(key)
+            self._dropped.add(key)
+
+    def replace(self, records: Iterable[dict]) -> None:
+        self.drop(self.keys())
+        self._install_all(records)
+
+    def max_id(self) -> Optional[int]:
+        ids = [
+            meta.get("max_id")
+            for key, meta in self._meta.items()
+            if key not in self._parts and meta.get("max_id") is not None
+        ]
+        for table in self._parts.values():
+            ids.extend(
+                r["id"] for r in table.records() if isinstance(r.get("id"), int)
+            )
+        return max(ids, default=None)
+
+    # --- Сворачивание ---
+
+    def snapshot(self) -> tuple:
+        """
+        Готовит запись на диск: возвращает (грязные партиции {ключ: записи},
+        ключи партиций, чьи файлы нужно удалить, новый манифест).
+        """
+        parts: Dict[str, list] = {}
+        manifest: Dict[str, dict] = {}
+        obsolete = set(self._dropped)
+        for key in self.keys():
+            table = self._parts.get(key)
+            if table is None:
+                manifest[key] = self._meta[key]
+                continue
+            if not len(table):
+                obsolete.add(key)
+                continue
+            records = table.records()
+            ids = [r["id"] for r in records if isinstance(r.get("id"), int)]
+            manifest[key] = {
+                "count": len(records),
+                "min_id": min(ids, default=None),
+                "max_id": max(ids, default=None),
+            }
+            for field in AGGREGATES:
+                manifest[key][field] = [
+                    [*cell_key, count, amount]
+                    for cell_key, (count, amount) in sorted(
+                        getattr(self._indexes[key], field).items(), key=repr
+                    )
+                ]
+            if key in self._dirty:
+                parts[key] = records
+        self._meta = manifest
+        self._dirty = set()
+        self._dropped = set()
+        self.needs_snapshot = False
+        return parts, sorted(obsolete - manifest.keys()), manifest
+
+    def write_snapshot(self, snapshot: tuple, fsync: bool = False) -> bool:
+        """
+        Пишет партиции, затем манифест, затем удаляет устаревшие файлы.
+        Вызывается вне блокировки бэкенда.
+        """
+        parts, obsolete, manifest = snapshot
+        for key, records in parts.items():
+            if not _write_json(self._path(key), records, fsync=fsync):
+                return False
+        if not _write_json(
+            self.manifest_path, {"version": 1, "partitions": manifest}, fsync=fsync
+        ):
+            return False
+        for key in obsolete:
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Файл не в манифесте, поэтому читаться больше не будет.
+                logger.exception("Не удалось удалить партицию %s.", self._path(key))
+        return True
+
+    def check_consistency(self) -> List[str]:
+        problems = []
+        for key, table in self._parts.items():
+            problems.extend(f"{key}: {p}" for p in table.check_consistency())
+            if self._indexes[key] != _PartitionIndex(table.records()):
+                problems.append(f"{key}: индексы дат не совпадают с записями")
+            for record in table.records():
+                repair_id = record.get("id")
+                if repair_id is not None and repair_id not in self._where:
+                    problems.append(f"{key}: ID {repair_id} нет в карте партиций")
+        for repair_id, key in self._where.items():
+            table = self._parts.get(key)
+            if table is None or repair_id not in table:
+                problems.append(
+                    f"ID {repair_id}: карта партиций -> {key}, записи там нет"
+                )
+        return problems
+
+
+class JsonBackend(StorageBackend):
+    """
+    Хранилище на JSON-файлах: снимок активных ремонтов, архив,
+    разбитый на месячные партиции (см. _PartitionedTable), и журнал
+    изменений (JSONL) рядом с ними.
+
+    Каждое изменение дописывается в журнал одной строкой
+    (create/update/move/delete), поэтому стоимость записи не зависит
+    от размера архива. При загрузке к снимкам применяется журнал.
+    Когда журнал перерастает порог, фоновый поток сворачивает его
+    в свежие снимки (запись через временный файл и replace) и
+    обрезает журнал.
+
+    Операции журнала идемпотентны (create — это вставка-или-замена,
+    update — установка поля, delete/move — удаление, если запись есть),
+    поэтому повторное применение уже учтённых в снимке операций
+    безопасно: сбой в любой момент сворачивания не теряет данных.
+
+    Данные держатся в памяти: чтения обслуживаются из памяти, пока
+    сигнатуры (mtime, размер) файлов на диске совпадают с запомненными;
+    изменение файлов извне приводит к повторной загрузке.
+
+    Записи в памяти не меняются на месте — изменение заменяет словарь
+    новым. Благодаря этому снимок для сворачивания — это просто копии
+    списков, которые можно сериализовать вне блокировки.
+
+    Режим durability (см. DURABILITY_MODES) определяет, когда операция
+    попадает на диск. В режиме batched изменение сразу видно в памяти,
+    а строки журнала дописываются одной записью по таймеру или по
+    размеру пачки; при сбое процесса теряется не больше одной пачки.
+    flush() и close() принудительно дописывают накопленное.
+    """
+
+    def __init__(
+        self,
+        active_path: Path,
+        archive_path: Path,
+        journal_path: Path = None,
+        compact_bytes: int = DEFAULT_COMPACT_BYTES,
+        sequence_path: Path = None,
+        durability: str = "immediate",
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        flush_batch: int = DEFAULT_FLUSH_BATCH,
+        archive_dir: Path = None,
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"Неизвестный режим надёжности {durability!r} "
+                f"(допустимо: {', '.join(DURABILITY_MODES)})."
+            )
+        self.active_path = Path(active_path)
+        # archive_path — прежний монолитный файл архива: читается один раз,
+        # если каталога партиций ещё нет, и дальше не изменяется.
+        self.archive_path = Path(archive_path)
+        self.archive_dir = Path(archive_dir or self.archive_path.parent / "archive")
+        self.journal_path = Path(
+            journal_path or self.active_path.parent / "journal.jsonl"
+        )
+        self.compact_bytes = compact_bytes
+        self.sequence_path = Path(
+            sequence_path or self.active_path.parent / "id_sequence.json"
+        )
+        self._next_id: Optional[int] = None
+        self._tables: Optional[Dict[str, _Table]] = None
+        self._signatures: Dict[Path, Optional[tuple]] = {}
+        # Сколько раз таблицы загружались с диска (см. generation).
+        self._generation = 0
+        # Собственная блокировка бэкенда: внешние вызовы и так сериализованы
+        # storage.lock, но фоновое сворачивание журнала идёт из своего потока.
+        self._lock = threading.RLock()
+        self._compaction: Optional[threading.Thread] = None
+        self._compacting = False
+        # Сворачивания идут строго по одному: следующее ждёт, пока
+        # предыдущее обрежет журнал (см. _wait_for_compaction).
+        self._compaction_done = threading.Condition(self._lock)
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.flush_batch = max(1, flush_batch)
+        # Строки журнала, ещё не дописанные на диск (режим batched).
+        self._pending: List[str] = []
+        self._flush_timer: Optional[threading.Timer] = None
+
+    # --- Загрузка и журнал ---
+
+    def _paths(self) -> tuple:
+        # Манифест и партиции архива сверяет сам _PartitionedTable.
+        return (self.active_path, self.journal_path)
+
+    def _remember_signatures(self) -> None:
+        self._signatures = {p: _file_signature(p) for p in self._paths()}
+        if self._tables is not None:
+            self._tables[ARCHIVE].remember_signatures()
+
+    def _data(self) -> Dict[str, _Table]:
+        """
+        Возвращает таблицы в памяти, (пере)загружая их с диска
+        при первом обращении или если файлы изменились извне.
+        """
+        # Пока идёт сворачивание, снимки переписываем мы сами — сверяем
+        # только журнал, чтобы не принять свою же запись за внешнюю.
+        paths = (self.journal_path,) if self._compacting else self._paths()
+        if (
+            self._tables is not None
+            and all(self._signatures.get(p) == _file_signature(p) for p in paths)
+            and (self._compacting or not self._tables[ARCHIVE].changed_on_disk())
+        ):
+            return self._tables
+        if self._tables is not None:
+            logger.info("Файлы хранилища изменены извне — перечитываем их.")
+        # Накопленные операции дописываем до чтения журнала, иначе
+        # перечитанные с диска данные их бы не содержали.
+        self._flush_pending()
+        tables = {
+            ACTIVE: _ActiveTable(_read_records(self.active_path)),
+            ARCHIVE: _PartitionedTable(self.archive_dir, legacy_path=self.archive_path),
+        }
+        replayed = self._replay(tables)
+        if replayed:
+            logger.info(
+                "Из журнала %s применено %s операций.", self.journal_path, replayed
+            )
+        self._tables = tables
+        self._generation += 1
+        self._remember_signatures()
+        if tables[ARCHIVE].needs_snapshot and not self._compacting:
+            # Первый запуск после перехода на партиции: раскладываем архив
+            # по файлам сразу, а не при следующем сворачивании журнала.
+            self.compact()
+        return self._tables or tables
+
+    def generation(self) -> int:
+        """Число загрузок таблиц с диска: растёт при изменении файлов извне."""
+        with self._lock:
+            self._data()
+            return self._generation
+
+    def _replay(self, tables: Dict[str, _Table]) -> int:
+        """Применяет к таблицам все операции из журнала. Возвращает их число."""
+        try:
+            raw = self.journal_path.read_bytes()
+        except FileNotFoundError:
+            return 0
+        except OSError:
+            logger.exception("Не удалось прочитать журнал %s.", self.journal_path)
+            return 0
+
+        complete, _, partial = raw.rpartition(b"\n")
+        if partial:
+            # Строка, недописанная при сбое: отрезаем её, иначе следующая
+            # операция приклеилась бы к ней и тоже стала бы нечитаемой.
+            logger.warning(
+                "Журнал %s оканчивается недописанной строкой — она отброшена.",
+                self.journal_path,
+            )
+            try:
+                with self.journal_path.open("r+b") as f:
+                    f.truncate(len(raw) - len(partial))
+            except OSError:
+                logger.exception("Не удалось обрезать журнал %s.", self.journal_path)
+
+        applied = 0
+        for line_no, line in enumerate(complete.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                self._apply(tables, json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                logger.warning(
+                    "Повреждённая строка %s журнала %s пропущена.",
+                    line_no,
+                    self.journal_path,
+                )
+                continue
+            applied += 1
+        return applied
+
+    @staticmethod
+    def _apply(tables: Dict[str, _Table], op: dict) -> None:
+        """
+        Применяет одну операцию журнала к таблицам в памяти. Номера дат
+        пересчитываются здесь же: журналу не нужно их хранить, и старые
+        строки журнала без них применяются так же.
+        """
+        kind = op["op"]
+        if kind == "create":
+            tables[op["table"]].upsert(with_date_ordinals(op["record"]))
+        elif kind == "update":
+            table = tables[op["table"]]
+            record = table.get(op["id"])
+            if record is not None:
+                record = {**record, op["field"]: op["value"]}
+                if op["field"] in DATE_ORDINAL_FIELDS:
+                    record = with_date_ordinals(record)
+                table.upsert(record)
+        elif kind == "move":
+            record = with_date_ordinals(op["record"])
+            tables[op["from"]].remove(record.get("id"))
+            tables[op["to"]].upsert(record)
+        elif kind == "delete":
+            tables[op["table"]].remove(op["id"])
+        elif kind == "drop":
+            tables[op["table"]].drop(op["partitions"])
+        else:
+            raise ValueError(f"неизвестная операция {kind!r}")
+
+    def _append(self, lines: List[str]) -> bool:
+        """Дописывает строки в журнал одной записью (с fsync в режиме fsync)."""
+        try:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.journal_path.open("a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                if self.durability == "fsync":
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError:
+            logger.exception("Не удалось дописать журнал %s.", self.journal_path)
+            return False
+        self._signatures[self.journal_path] = _file_signature(self.journal_path)
+        return True
+
+    def _log(self, op: dict) -> bool:
+        """
+        Применяет операцию в памяти и дописывает её строкой в журнал
+        (в режиме batched — откладывает до ближайшего сброса пачки).
+        Возвращает False, если запись на диск не удалась (тогда состояние
+        в памяти сбрасывается и будет перечитано с диска).
+        """
+        self._apply(self._data(), op)
+        line = json.dumps(op, ensure_ascii=False) + "\n"
+        if self.durability == "batched":
+            self._pending.append(line)
+            if len(self._pending) >= self.flush_batch:
+                return self._flush_pending()
+            self._schedule_flush()
+            return True
+        if not self._append([line]):
+            self._tables = None
+            return False
+        self._maybe_compact()
+        return True
+
+    def _schedule_flush(self) -> None:
+        if self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+        self._flush_timer.name = "journal-flush"
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def _flush_pending(self) -> bool:
+        """
+        Дописывает накопленные операции в журнал. Вызывается под блокировкой.
+        При ошибке записи операции остаются в очереди до следующей попытки:
+        в памяти они уже применены, и терять их нельзя.
+        """
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._pending:
+            return True
+        if not self._append(self._pending):
+            self._schedule_flush()
+            return False
+        self._pending = []
+        self._maybe_compact()
+        return True
+
+    def flush(self) -> bool:
+        """
+        Дописывает на диск операции, накопленные в режиме batched.
+        Возвращает False, если запись не удалась.
+        """
+        with self._lock:
+            return self._flush_pending()
+
+    # --- Сворачивание журнала ---
+
+    def _maybe_compact(self) -> None:
+        size = (self._signatures.get(self.journal_path) or (0, 0))[1]
+        if size < self.compact_bytes:
+            return
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        self._compaction = threading.Thread(
+            target=self.compact, name="journal-compaction", daemon=True
+        )
+        self._compaction.start()
+
+    def _wait_for_compaction(self) -> None:
+        """
+        Дожидается окончания идущего сворачивания. Вызывается под
+        блокировкой: на время ожидания она отпускается целиком (и при
+        повторном захвате), иначе фоновое сворачивание не смогло бы
+        обрезать журнал.
+        """
+        while self._compacting:
+            self._compaction_done.wait()
+
+    def compact(self) -> bool:
+        """
+        Сворачивает журнал в свежие снимки и обрезает его.
+
+        0. Если уже идёт другое сворачивание, дожидается его: два
+           одновременных писали бы одни и те же файлы снимков, и каждое
+           обрезало бы журнал по своей отметке.
+        1. Под блокировкой фиксируются копии активных ремонтов и изменённых
+           партиций архива и текущая длина журнала.
+        2. Без блокировки снимки пишутся на диск (tmp + replace): активные,
+           партиции, затем манифест — в это время бот продолжает работать
+           и дописывать журнал.
+        3. Под блокировкой из журнала удаляется учтённая в снимках часть,
+           дописанный за время сворачивания хвост сохраняется.
+        """
+        with self._lock:
+            self._wait_for_compaction()
+            tables = self._data()
+            # Снимок учтёт все операции в памяти, поэтому и в журнал они
+            # должны попасть до отметки, по которую журнал будет обрезан.
+            self._flush_pending()
+            active = tables[ACTIVE].records()
+            archive = tables[ARCHIVE].snapshot()
+            offset = (self._signatures.get(self.journal_path) or (0, 0))[1]
+            self._compacting = True
+
+        fsync = self.durability == "fsync"
+        written = _write_json(
+            self.active_path, active, fsync=fsync
+        ) and tables[ARCHIVE].write_snapshot(archive, fsync=fsync)
+
+        with self._lock:
+            self._compacting = False
+            self._compaction_done.notify_all()
+            if not written:
+                # Журнал не трогаем: при следующей загрузке он будет применён
+                # к тем снимкам, что успели записаться.
+                self._tables = None
+                return False
+            try:
+                with self.journal_path.open("rb") as f:
+                    f.seek(offset)
+                    tail = f.read()
+                tmp_path = self.journal_path.with_suffix(
+                    self.journal_path.suffix + ".tmp"
+                )
+                tmp_path.write_bytes(tail)
+                tmp_path.replace(self.journal_path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Снимки уже свежие, а журнал остался целым — его повторное
+                # применение безопасно, просто перечитаем всё с диска.
+                logger.exception(
+                    "Не удалось обрезать журнал %s после сворачивания.",
+                    self.journal_path,
+                )
+                self._tables = None
+                return False
+            self._remember_signatures()
+        logger.info(
+            "Журнал %s свёрнут в снимки (%s байт).", self.journal_path, offset
+        )
+        return True
+
+    # --- Интерфейс StorageBackend ---
+
+    def list_active(self) -> List[dict]:
+        with self._lock:
+            return self._data()[ACTIVE].records()
+
+    def list_archive(self) -> List[dict]:
+        with self._lock:
+            return self._data()[ARCHIVE].records()
+
+    def _get(self, table: str, repair_id: int) -> Optional[dict]:
+        with self._lock:
+            record = self._data()[table].get(repair_id)
+            return dict(record) if record is not None else None
+
+    def get_active(self, repair_id: int) -> Optional[dict]:
+        return self._get(ACTIVE, repair_id)
+
+    def get_archive(self, repair_id: int) -> Optional[dict]:
+        return self._get(ARCHIVE, repair_id)
+
+    def _read_sequence(self) -> Optional[int]:
+        """
+        Читает сохранённый счётчик ID. None — если файла нет или он
+        повреждён (тогда счётчик засевается заново по данным).
+        """
+        try:
+            with self.sequence_path.open("r", encoding="utf-8") as f:
+                value = json.load(f).get("next_id")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, AttributeError):
+            logger.exception("Файл счётчика ID %s повреждён.", self.sequence_path)
+            return None
+        return value if isinstance(value, int) and value > 0 else None
+
+    def _sequence(self) -> int:
+        """
+        Возвращает следующий ID из счётчика. Единственный раз — если
+        счётчика ещё нет — вычисляет его как max(id) + 1 по всем данным.
+        """
+        if self._next_id is None:
+            self._next_id = self._read_sequence()
+        if self._next_id is None:
+            tables = self._data()
+            all_ids = [
+                r["id"]
+                for r in tables[ACTIVE].records()
+                if isinstance(r.get("id"), int)
+            ]
+            # Максимум по архиву берётся из манифеста, без чтения партиций.
+            archive_max = tables[ARCHIVE].max_id()
+            if archive_max is not None:
+                all_ids.append(archive_max)
+            self._next_id = max(all_ids) + 1 if all_ids else 1
+            logger.info(
+                "Счётчик ID %s засеян по данным: следующий ID %s.",
+                self.sequence_path,
+                self._next_id,
+            )
+        return self._next_id
+
+    def next_id(self) -> int:
+        with self._lock:
+            return self._sequence()
+
+    def allocate_id(self) -> int:
+        with self._lock:
+            new_id = self._sequence()
+            self._next_id = new_id + 1
+            # Счётчик пишется до выдачи ID: если процесс упадёт, не успев
+            # сохранить ремонт, этот ID просто останется неиспользованным.
+            if not _write_json(
+                self.sequence_path,
+                {"next_id": self._next_id},
+                fsync=self.durability == "fsync",
+            ):
+                logger.error(
+                    "Счётчик ID не сохранён; ID %s выдан только в памяти.", new_id
+                )
+            return new_id
+
+    def _reserve(self, record: dict) -> None:
+        """
+        Сдвигает счётчик за ID вставляемой записи, если он был взят
+        через next_id() без резервирования (add_repair()).
+        """
+        repair_id = record.get("id")
+        if isinstance(repair_id, int) and repair_id >= self._sequence():
+            self._next_id = repair_id + 1
+            _write_json(
+                self.sequence_path,
+                {"next_id": self._next_id},
+                fsync=self.durability == "fsync",
+            )
+
+    def insert_active(self, record: dict) -> bool:
+        with self._lock:
+            self._reserve(record)
+            return self._log(
+                {"op": "create", "table": ACTIVE, "record": dict(record)}
+            )
+
+    def insert_archive(self, record: dict) -> bool:
+        with self._lock:
+            self._reserve(record)
+            return self._log(
+                {"op": "create", "table": ARCHIVE, "record": dict(record)}
+            )
+
+    def _update(self, table: str, repair_id: int, field_name: str, new_value) -> bool:
+        with self._lock:
+            if repair_id not in self._data()[table]:
+                return False
+            return self._log(
+                {
+                    "op": "update",
+                    "table": table,
+                    "id": repair_id,
+                    "field": field_name,
+                    "value": new_value,
+                }
+            )
+
+    def update_active(self, repair_id: int, field_name: str, new_value) -> bool:
+        return self._update(ACTIVE, repair_id, field_name, new_value)
+
+    def update_archive(self, repair_id: int, field_name: str, new_value) -> bool:
+        if field_name != "archive_date":
+            return self._update(ARCHIVE, repair_id, field_name, new_value)
+        # Смена даты может перенести запись в другую партицию. Пишем это
+        # как перенос с полной записью: так повторное применение журнала
+        # не зависит от того, какие партиции успели перезаписаться.
+        with self._lock:
+            record = self._get(ARCHIVE, repair_id)
+            if record is None:
+                return False
+            record["archive_date"] = new_value
+            return self._log(
+                {"op": "move", "from": ARCHIVE, "to": ARCHIVE, "record": record}
+            )
+
+    def move_to_archive(self, repair_id: int, archive_date: str) -> bool:
+        with self._lock:
+            record = self._get(ACTIVE, repair_id)
+            if record is None:
+                return False
+            record["archive_date"] = archive_date
+            return self._log(
+                {"op": "move", "from": ACTIVE, "to": ARCHIVE, "record": record}
+            )
+
+    def move_to_active(self, repair_id: int) -> bool:
+        with self._lock:
+            record = self._get(ARCHIVE, repair_id)
+            if record is None:
+                return False
+            record.pop("archive_date", None)
+            return self._log(
+                {"op": "move", "from": ARCHIVE, "to": ACTIVE, "record": record}
+            )
+
+    def delete_archive(self, repair_id: int) -> bool:
+        with self._lock:
+            if repair_id not in self._data()[ARCHIVE]:
+                return False
+            return self._log({"op": "delete", "table": ARCHIVE, "id": repair_id})
+
+    def count_active(self) -> int:
+        with self._lock:
+            return len(self._data()[ACTIVE])
+
+    def list_active_page(
+        self, offset: int, limit: int, order: str = "date"
+    ) -> List[dict]:
+        with self._lock:
+            page = self._data()[ACTIVE].page(offset, limit, order)
+            if page is None:
+                return super().list_active_page(offset, limit, order)
+            return page
+
+    def count_archive(self) -> int:
+        # Непрочитанные партиции считаются по манифесту, без загрузки.
+        with self._lock:
+            return len(self._data()[ARCHIVE])
+
+    def list_archive_range(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> List[dict]:
+        with self._lock:
+            return self._data()[ARCHIVE].records_by_date(start, end, source)
+
+    def delete_archive_before(self, cutoff: date) -> int:
+        """
+        Партиции целиком старше месяца `cutoff` удаляются одной операцией
+        журнала без чтения их файлов; из пограничного месяца удаляются
+        отдельные записи.
+        """
+        with self._lock:
+            archive = self._data()[ARCHIVE]
+            cutoff_key = _month_key(cutoff)
+            old_keys = [k for k in archive.keys() if k != UNDATED and k < cutoff_key]
+            removed = sum(archive.count(k) for k in old_keys)
+            if old_keys and not self._log(
+                {"op": "drop", "table": ARCHIVE, "partitions": old_keys}
+            ):
+                return 0
+            for record in archive.records_between(cutoff_key, cutoff_key):
+                if record.get("id") is None:
+                    continue
+                if record["archive_date_ord"] < cutoff.toordinal() and self._log(
+                    {"op": "delete", "table": ARCHIVE, "id": record.get("id")}
+                ):
+                    removed += 1
+            if removed:
+                # Сразу сворачиваем журнал, чтобы файлы партиций удалились.
+                self.compact()
+            return removed
+
+    def daily_totals(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> Dict[tuple, List[int]]:
+        with self._lock:
+            return self._data()[ARCHIVE].daily_totals(start, end, source)
+
+    def breakdown_totals(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> Dict[tuple, List[int]]:
+        with self._lock:
+            return self._data()[ARCHIVE].month_cells("breakdowns", start, end, source)
+
+    def turnaround_totals(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> Dict[tuple, List[int]]:
+        with self._lock:
+            return self._data()[ARCHIVE].month_cells("turnaround", start, end, source)
+
+    def _rebuild(self, field: str, compute, describe=describe_key) -> List[str]:
+        with self._lock:
+            # Пересчёт меняет таблицы в памяти в обход журнала: фоновое
+            # сворачивание, упав, сбросило бы их и потеряло пересчёт.
+            self._wait_for_compaction()
+            kept, fresh = self._data()[ARCHIVE].rebuild_cells(field, compute)
+            # Сворачивание переписывает манифест с пересчитанными итогами.
+            self.compact()
+        return diff_totals(kept, fresh, describe)
+
+    def rebuild_daily_totals(self) -> List[str]:
+        return self._rebuild("totals", compute_daily_totals, describe_daily_key)
+
+    def rebuild_breakdown_totals(self) -> List[str]:
+        return self._rebuild("breakdowns", compute_breakdown_totals)
+
+    def rebuild_turnaround_totals(self) -> List[str]:
+        return self._rebuild("turnaround", compute_turnaround_totals)
+
+    def _replace(self, table: str, records: List[dict]) -> bool:
+        # Полная замена таблицы не выражается операциями журнала, поэтому
+        # сразу сворачиваем журнал: иначе при повторном применении старые
+        # create вернули бы удалённые записи.
+        with self._lock:
+            self._wait_for_compaction()
+            records = [with_date_ordinals(r) for r in records]
+            if table == ARCHIVE:
+                self._data()[ARCHIVE].replace(records)
+            else:
+                self._data()[ACTIVE] = _ActiveTable(records)
+            return self.compact()
+
+    def replace_active(self, records: List[dict]) -> bool:
+        return self._replace(ACTIVE, records)
+
+    def replace_archive(self, records: List[dict]) -> bool:
+        return self._replace(ARCHIVE, records)
+
+    def check_index_consistency(self) -> List[str]:
+        """
+        Проверяет хеш-индексы обеих таблиц относительно списков записей.
+        Возвращает описания расхождений (пустой список — всё согласовано).
+        """
+        with self._lock:
+            return [
+                f"{name}: {problem}"
+                for name, table in self._data().items()
+                for problem in table.check_consistency()
+            ]
+
+    def close(self) -> None:
+        if not self.flush():
+            logger.error(
+                "При закрытии не удалось дописать %s операций в журнал %s.",
+                len(self._pending),
+                self.journal_path,
+            )
+        if self._compaction is not None:
+            self._compaction.join()
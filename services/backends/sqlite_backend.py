@@ -0,0 +1,690 @@
+import json
+import logging
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .base import (
+    StorageBackend,
+    compute_breakdown_totals,
+    describe_daily_key,
+    diff_totals,
+    has_date_ordinals,
+    with_date_ordinals,
+)
+
+logger = logging.getLogger(__name__)
+
+# Обе таблицы (активные и архив) — одна таблица `repairs` с флагом
+# is_archived: архивация ремонта превращается в обновление одной строки,
+# а не в перезапись двух файлов. Полная запись лежит в `data` (JSON),
+# а поля, по которым нужен поиск, продублированы в отдельные колонки.
+# archive_date хранится в ISO-формате (ГГГГ-ММ-ДД), чтобы индекс по нему
+# годился для выборок по диапазону дат; составной индекс (источник, дата)
+# обслуживает те же выборки с фильтром по источнику.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS repairs (
+    id           INTEGER PRIMARY KEY,
+    is_archived  INTEGER NOT NULL DEFAULT 0,
+    repair_type  TEXT,
+    archive_date TEXT,
+    data         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_repairs_archive_date
+    ON repairs (is_archived, archive_date);
+CREATE INDEX IF NOT EXISTS idx_repairs_repair_type
+    ON repairs (repair_type);
+CREATE INDEX IF NOT EXISTS idx_repairs_source_date
+    ON repairs (is_archived, repair_type, archive_date);
+-- Страница списка активных ремонтов (выражения — как в _ACTIVE_BY_DATE;
+-- list_active_page ссылается на индексы по имени через INDEXED BY).
+CREATE INDEX IF NOT EXISTS idx_repairs_active_date
+    ON repairs (
+        json_extract(data, '$.date_ord') IS NULL,
+        json_extract(data, '$.date_ord'),
+        id
+    ) WHERE is_archived = 0;
+CREATE INDEX IF NOT EXISTS idx_repairs_active_id
+    ON repairs (id) WHERE is_archived = 0;
+CREATE TABLE IF NOT EXISTS sequences (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    archive_date TEXT NOT NULL,
+    repair_type  TEXT NOT NULL,
+    is_mechanics INTEGER NOT NULL,
+    count        INTEGER NOT NULL,
+    cost         NUMERIC NOT NULL,
+    PRIMARY KEY (archive_date, repair_type, is_mechanics)
+);
+CREATE TABLE IF NOT EXISTS breakdown_totals (
+    month        TEXT NOT NULL,
+    repair_type  TEXT NOT NULL,
+    name         TEXT NOT NULL,
+    count        INTEGER NOT NULL,
+    revenue      NUMERIC NOT NULL,
+    PRIMARY KEY (month, repair_type, name)
+);
+CREATE TABLE IF NOT EXISTS turnaround_totals (
+    month        TEXT NOT NULL,
+    repair_type  TEXT NOT NULL,
+    days         INTEGER NOT NULL,
+    count        INTEGER NOT NULL,
+    total_days   INTEGER NOT NULL,
+    PRIMARY KEY (month, repair_type, days)
+);
+"""
+
+# Дневные итоги архива (см. StorageBackend.daily_totals) обновляются
+# триггерами в той же транзакции, что и сама строка. Ремонт без источника
+# учитывается под repair_type = '' (NULL в первичном ключе не сравнивается).
+_TOTALS_CELL = {
+    "date": "{row}.archive_date",
+    "source": "IFNULL({row}.repair_type, '')",
+    "mechanics": "CASE WHEN json_extract({row}.data, '$.isMechanics') "
+    "THEN 1 ELSE 0 END",
+    "cost": "IFNULL(json_extract({row}.data, '$.cost'), 0)",
+}
+
+
+def _totals_sql(row: str, sign: str) -> str:
+    cell = {name: expr.format(row=row) for name, expr in _TOTALS_CELL.items()}
+    if sign == "+":
+        return (
+            "INSERT INTO daily_totals "
+            "(archive_date, repair_type, is_mechanics, count, cost) "
+            f"VALUES ({cell['date']}, {cell['source']}, {cell['mechanics']}, "
+            f"1, {cell['cost']}) "
+            "ON CONFLICT (archive_date, repair_type, is_mechanics) DO UPDATE "
+            "SET count = count + 1, cost = cost + excluded.cost;"
+        )
+    where = (
+        f"WHERE archive_date = {cell['date']} AND repair_type = {cell['source']} "
+        f"AND is_mechanics = {cell['mechanics']}"
+    )
+    return (
+        f"UPDATE daily_totals SET count = count - 1, cost = cost - {cell['cost']} "
+        f"{where}; DELETE FROM daily_totals {where} AND count <= 0;"
+    )
+
+
+def _totals_trigger(name: str, event: str, row: str, sign: str) -> str:
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON repairs "
+        f"WHEN {row}.is_archived = 1 AND {row}.archive_date IS NOT NULL "
+        f"BEGIN {_totals_sql(row, sign)} END;"
+    )
+
+
+_TOTALS_TRIGGERS = "\n".join(
+    (
+        _totals_trigger("trg_totals_insert", "INSERT", "NEW", "+"),
+        _totals_trigger("trg_totals_delete", "DELETE", "OLD", "-"),
+        _totals_trigger("trg_totals_update_old", "UPDATE", "OLD", "-"),
+        _totals_trigger("trg_totals_update_new", "UPDATE", "NEW", "+"),
+    )
+)
+
+# Итоги с нуля по строкам архива — для заполнения и пересчёта.
+_TOTALS_FROM_REPAIRS = (
+    "SELECT {date}, {source}, {mechanics}, COUNT(*), SUM({cost}) "
+    "FROM repairs AS r WHERE r.is_archived = 1 AND r.archive_date IS NOT NULL "
+    "GROUP BY 1, 2, 3"
+).format(**{name: expr.format(row="r") for name, expr in _TOTALS_CELL.items()})
+
+
+# Счётчики поломок (см. StorageBackend.breakdown_totals) ведёт сам бэкенд
+# в той же транзакции, что и изменение строк (_count_breakdowns): разбор
+# пунктов поломок (base.breakdown_items) — код на Python, и триггер,
+# вызывающий его как функцию соединения, ломал запись в архив из любого
+# другого соединения (консоль sqlite3, резервное копирование). Изменения
+# в обход бэкенда эти счётчики не обновляют — их пересчитывает
+# rebuild_breakdown_totals (python -m services.migrations rebuild-aggregates).
+_BREAKDOWN_UPSERT = (
+    "INSERT INTO breakdown_totals (month, repair_type, name, count, revenue) "
+    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (month, repair_type, name) DO UPDATE "
+    "SET count = count + excluded.count, revenue = revenue + excluded.revenue"
+)
+
+# Триггеры счётчиков поломок из прежних версий схемы.
+_OLD_BREAKDOWN_TRIGGERS = "\n".join(
+    f"DROP TRIGGER IF EXISTS trg_breakdowns_{event};"
+    for event in ("insert", "delete", "update_old", "update_new")
+)
+
+
+# Гистограммы сроков ремонта (см. StorageBackend.turnaround_totals)
+# считаются по номерам дат в JSON записи (date_ord, archive_date_ord);
+# строки, записанные до миграции date-ordinals, в них не попадают.
+_TURNAROUND_DAYS = (
+    "json_extract({row}.data, '$.archive_date_ord') "
+    "- json_extract({row}.data, '$.date_ord')"
+)
+
+
+def _turnaround_sql(row: str, sign: str) -> str:
+    month = f"substr({row}.archive_date, 1, 7)"
+    source = f"IFNULL({row}.repair_type, '')"
+    days = _TURNAROUND_DAYS.format(row=row)
+    if sign == "+":
+        return (
+            "INSERT INTO turnaround_totals "
+            "(month, repair_type, days, count, total_days) "
+            f"SELECT {month}, {source}, d.days, 1, d.days FROM (SELECT {days} AS days) "
+            "AS d WHERE d.days >= 0 ON CONFLICT (month, repair_type, days) DO UPDATE "
+            "SET count = count + 1, total_days = total_days + excluded.total_days;"
+        )
+    where = f"month = {month} AND repair_type = {source} AND days = {days}"
+    return (
+        "UPDATE turnaround_totals SET count = count - 1, "
+        f"total_days = total_days - days WHERE {where}; "
+        f"DELETE FROM turnaround_totals WHERE {where} AND count <= 0;"
+    )
+
+
+def _turnaround_trigger(name: str, event: str, row: str, sign: str) -> str:
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON repairs "
+        f"WHEN {row}.is_archived = 1 AND {row}.archive_date IS NOT NULL "
+        f"BEGIN {_turnaround_sql(row, sign)} END;"
+    )
+
+
+_TURNAROUND_TRIGGERS = "\n".join(
+    (
+        _turnaround_trigger("trg_turnaround_insert", "INSERT", "NEW", "+"),
+        _turnaround_trigger("trg_turnaround_delete", "DELETE", "OLD", "-"),
+        _turnaround_trigger("trg_turnaround_update_old", "UPDATE", "OLD", "-"),
+        _turnaround_trigger("trg_turnaround_update_new", "UPDATE", "NEW", "+"),
+    )
+)
+
+_TURNAROUND_FROM_REPAIRS = (
+    "SELECT substr(r.archive_date, 1, 7), IFNULL(r.repair_type, ''), {days}, "
+    "COUNT(*), SUM({days}) FROM repairs AS r "
+    "WHERE r.is_archived = 1 AND r.archive_date IS NOT NULL AND {days} >= 0 "
+    "GROUP BY 1, 2, 3"
+).format(days=_TURNAROUND_DAYS.format(row="r"))
+
+
+# Порядок активных ремонтов «по дате создания» (см. base.active_sort_key);
+# его обслуживает индекс idx_repairs_active_date.
+_ACTIVE_BY_DATE = (
+    "json_extract(data, '$.date_ord') IS NULL, json_extract(data, '$.date_ord'), id"
+)
+
+
+def _iso_date(ordinal: Optional[int]) -> Optional[str]:
+    """
+    Переводит номер дня (date.toordinal()) в 'ГГГГ-ММ-ДД' для индексируемой
+    колонки. Для отсутствующей или некорректной даты возвращает None.
+    """
+    return date.fromordinal(ordinal).isoformat() if ordinal else None
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Хранилище в локальном файле SQLite в режиме WAL.
+
+    Каждая операция — одна короткая транзакция над строками с нужными ID,
+    без чтения и перезаписи всего набора данных.
+    """
+
+    def __init__(self, path: Path, durability: str = "immediate"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Доступ к соединению сериализуется снаружи (storage.lock),
+        # поэтому его можно использовать из разных потоков.
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Каждая транзакция и так короткая, поэтому отдельного режима
+        # batched здесь нет; fsync включает полную синхронизацию WAL.
+        self._conn.execute(
+            "PRAGMA synchronous=FULL"
+            if durability == "fsync"
+            else "PRAGMA synchronous=NORMAL"
+        )
+        # INSERT OR REPLACE удаляет прежнюю строку; чтобы её вклад вычелся
+        # из дневных итогов, триггеры на удаление должны срабатывать и тут.
+        self._conn.execute("PRAGMA recursive_triggers=ON")
+        self._conn.executescript(_SCHEMA)
+        self._conn.executescript(_OLD_BREAKDOWN_TRIGGERS)
+        self._conn.executescript(_TOTALS_TRIGGERS)
+        self._conn.executescript(_TURNAROUND_TRIGGERS)
+        for table, fill in (
+            ("daily_totals", _TOTALS_FROM_REPAIRS),
+            ("turnaround_totals", _TURNAROUND_FROM_REPAIRS),
+        ):
+            if self._is_empty(table):
+                # База создана до появления итогов (или архив пуст) — заполняем.
+                with self._conn:
+                    self._conn.execute(f"INSERT INTO {table} {fill}")
+        if self._is_empty("breakdown_totals"):
+            with self._conn:
+                self._count_breakdowns(self._select(is_archived=True), 1)
+
+    # --- Вспомогательные методы ---
+
+    def _is_empty(self, table: str) -> bool:
+        return self._conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None
+
+    @staticmethod
+    def _load(data: str) -> dict:
+        record = json.loads(data)
+        # Строки, записанные до миграции date-ordinals, дополняем на лету.
+        return record if has_date_ordinals(record) else with_date_ordinals(record)
+
+    @staticmethod
+    def _row_values(record: dict, is_archived: bool) -> tuple:
+        record = with_date_ordinals(record)
+        return (
+            record.get("id"),
+            1 if is_archived else 0,
+            record.get("repair_type"),
+            _iso_date(record.get("archive_date_ord")) if is_archived else None,
+            json.dumps(record, ensure_ascii=False),
+        )
+
+    def _select(self, is_archived: bool) -> List[dict]:
+        rows = self._conn.execute(
+            "SELECT data FROM repairs WHERE is_archived = ? ORDER BY id",
+            (1 if is_archived else 0,),
+        )
+        return [self._load(data) for (data,) in rows]
+
+    def _get(self, repair_id: int, is_archived: bool) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT data FROM repairs WHERE id = ? AND is_archived = ?",
+            (repair_id, 1 if is_archived else 0),
+        ).fetchone()
+        return self._load(row[0]) if row else None
+
+    def _archived(self, where: str, params=()) -> List[dict]:
+        """Архивные записи с датой архивации, подходящие под условие `where`."""
+        rows = self._conn.execute(
+            "SELECT data FROM repairs WHERE is_archived = 1 "
+            f"AND archive_date IS NOT NULL AND {where}",
+            params,
+        )
+        return [self._load(data) for (data,) in rows]
+
+    def _count_breakdowns(self, records: List[dict], sign: int) -> None:
+        """
+        Прибавляет (sign = 1) или вычитает (sign = -1) вклад архивных
+        записей в счётчики поломок. Вызывается внутри транзакции записи.
+        """
+        cells = compute_breakdown_totals(records)
+        rows = [
+            (month, source or "", name, sign * count, sign * revenue)
+            for (month, source, name), (count, revenue) in cells.items()
+        ]
+        self._conn.executemany(_BREAKDOWN_UPSERT, rows)
+        if sign < 0:
+            self._conn.executemany(
+                "DELETE FROM breakdown_totals WHERE month = ? AND repair_type = ? "
+                "AND name = ? AND count <= 0",
+                [row[:3] for row in rows],
+            )
+
+    def _write(self, sql: str, params=(), old: Optional[tuple] = None) -> Optional[int]:
+        """
+        Выполняет одну изменяющую команду в отдельной транзакции.
+        old — условие (where, параметры) на архивные строки, которые команда
+        изменит или удалит: их вклад вычитается из счётчиков поломок.
+        Возвращает число затронутых строк или None при ошибке.
+        """
+        try:
+            with self._conn:
+                removed = self._archived(*old) if old is not None else []
+                rowcount = self._conn.execute(sql, params).rowcount
+                self._count_breakdowns(removed, -1)
+                return rowcount
+        except sqlite3.Error:
+            logger.exception("Ошибка записи в SQLite (%s).", self.path)
+            return None
+
+    def _put(self, sql: str, record: dict, is_archived: bool, params: tuple) -> bool:
+        """
+        Записывает одну строку (вставка или обновление по ID) и переносит
+        её вклад в счётчиках поломок с прежней версии строки на новую.
+        """
+        try:
+            with self._conn:
+                removed = self._archived("id = ?", (record.get("id"),))
+                written = self._conn.execute(sql, params).rowcount
+                if written:
+                    self._count_breakdowns(removed, -1)
+                    if is_archived:
+                        self._count_breakdowns([with_date_ordinals(record)], 1)
+                return bool(written)
+        except sqlite3.Error:
+            logger.exception("Ошибка записи в SQLite (%s).", self.path)
+            return False
+
+    def _insert(self, record: dict, is_archived: bool) -> bool:
+        inserted = self._put(
+            "INSERT OR REPLACE INTO repairs "
+            "(id, is_archived, repair_type, archive_date, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            record,
+            is_archived,
+            self._row_values(record, is_archived),
+        )
+        if inserted and isinstance(record.get("id"), int):
+            # ID мог быть взят через next_id() без резервирования.
+            self.ensure_next_id(record["id"] + 1)
+        return inserted
+
+    def _store(self, record: dict, is_archived: bool) -> bool:
+        """Перезаписывает одну строку после изменения записи."""
+        return self._put(
+            "UPDATE repairs SET is_archived = ?, repair_type = ?, "
+            "archive_date = ?, data = ? WHERE id = ?",
+            record,
+            is_archived,
+            self._row_values(record, is_archived)[1:] + (record.get("id"),),
+        )
+
+    def _replace(self, records: List[dict], is_archived: bool) -> bool:
+        rows = [self._row_values(r, is_archived) for r in records]
+        try:
+            with self._conn:
+                if is_archived:
+                    # Весь архив заменяется — счётчики считаются заново.
+                    self._conn.execute("DELETE FROM breakdown_totals")
+                else:
+                    # Активные записи могут заменить архивные с теми же ID.
+                    ids = json.dumps([row[0] for row in rows])
+                    replaced = self._archived(
+                        "id IN (SELECT value FROM json_each(?))", (ids,)
+                    )
+                    self._count_breakdowns(replaced, -1)
+                self._conn.execute(
+                    "DELETE FROM repairs WHERE is_archived = ?",
+                    (1 if is_archived else 0,),
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO repairs "
+                    "(id, is_archived, repair_type, archive_date, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                if is_archived:
+                    self._count_breakdowns(
+                        [with_date_ordinals(r) for r in records], 1
+                    )
+            return True
+        except sqlite3.Error:
+            logger.exception("Ошибка записи в SQLite (%s).", self.path)
+            return False
+
+    # --- Интерфейс StorageBackend ---
+
+    def list_active(self) -> List[dict]:
+        return self._select(is_archived=False)
+
+    def list_archive(self) -> List[dict]:
+        return self._select(is_archived=True)
+
+    def get_active(self, repair_id: int) -> Optional[dict]:
+        return self._get(repair_id, is_archived=False)
+
+    def get_archive(self, repair_id: int) -> Optional[dict]:
+        return self._get(repair_id, is_archived=True)
+
+    def generation(self) -> int:
+        # PRAGMA data_version меняется, когда базу изменило другое соединение.
+        (value,) = self._conn.execute("PRAGMA data_version").fetchone()
+        return value
+
+    def _ensure_sequence(self) -> None:
+        """Засевает счётчик ID по max(id) + 1, если его ещё нет."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sequences (name, value) "
+                "SELECT 'repair_id', COALESCE(MAX(id), 0) + 1 FROM repairs"
+            )
+
+    def next_id(self) -> int:
+        self._ensure_sequence()
+        (value,) = self._conn.execute(
+            "SELECT value FROM sequences WHERE name = 'repair_id'"
+        ).fetchone()
+        return value
+
+    def allocate_id(self) -> int:
+        self._ensure_sequence()
+        with self._conn:
+            self._conn.execute(
+                "UPDATE sequences SET value = value + 1 WHERE name = 'repair_id'"
+            )
+            (value,) = self._conn.execute(
+                "SELECT value - 1 FROM sequences WHERE name = 'repair_id'"
+            ).fetchone()
+        return value
+
+    def ensure_next_id(self, value: int) -> None:
+        """Поднимает счётчик ID до `value`, если он меньше (для миграций)."""
+        self._ensure_sequence()
+        with self._conn:
+            self._conn.execute(
+                "UPDATE sequences SET value = MAX(value, ?) WHERE name = 'repair_id'",
+                (value,),
+            )
+
+    def insert_active(self, record: dict) -> bool:
+        return self._insert(record, is_archived=False)
+
+    def insert_archive(self, record: dict) -> bool:
+        return self._insert(record, is_archived=True)
+
+    def update_active(self, repair_id: int, field_name: str, new_value) -> bool:
+        record = self.get_active(repair_id)
+        if record is None:
+            return False
+        record[field_name] = new_value
+        return self._store(record, is_archived=False)
+
+    def update_archive(self, repair_id: int, field_name: str, new_value) -> bool:
+        record = self.get_archive(repair_id)
+        if record is None:
+            return False
+        record[field_name] = new_value
+        return self._store(record, is_archived=True)
+
+    def move_to_archive(self, repair_id: int, archive_date: str) -> bool:
+        record = self.get_active(repair_id)
+        if record is None:
+            return False
+        record["archive_date"] = archive_date
+        return self._store(record, is_archived=True)
+
+    def move_to_active(self, repair_id: int) -> bool:
+        record = self.get_archive(repair_id)
+        if record is None:
+            return False
+        record.pop("archive_date", None)
+        return self._store(record, is_archived=False)
+
+    def delete_archive(self, repair_id: int) -> bool:
+        return bool(
+            self._write(
+                "DELETE FROM repairs WHERE id = ? AND is_archived = 1",
+                (repair_id,),
+                old=("id = ?", (repair_id,)),
+            )
+        )
+
+    def count_active(self) -> int:
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM repairs WHERE is_archived = 0"
+        ).fetchone()
+        return count
+
+    def list_active_page(
+        self, offset: int, limit: int, order: str = "date"
+    ) -> List[dict]:
+        # Без статистики ANALYZE планировщик берёт индекс по is_archived и
+        # сортирует всю выборку; INDEXED BY закрепляет частичный индекс,
+        # и страница читается обходом индекса до OFFSET + LIMIT.
+        if order == "id":
+            index, order_by = "idx_repairs_active_id", "id"
+        else:
+            index, order_by = "idx_repairs_active_date", _ACTIVE_BY_DATE
+        rows = self._conn.execute(
+            f"SELECT data FROM repairs INDEXED BY {index} "
+            f"WHERE is_archived = 0 ORDER BY {order_by} LIMIT ? OFFSET ?",
+            (limit, offset),
+        )
+        return [self._load(data) for (data,) in rows]
+
+    def count_archive(self) -> int:
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM repairs WHERE is_archived = 1"
+        ).fetchone()
+        return count
+
+    def list_archive_range(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> List[dict]:
+        sql = (
+            "SELECT data FROM repairs WHERE is_archived = 1 "
+            "AND archive_date BETWEEN ? AND ?"
+        )
+        params = [start.isoformat(), end.isoformat()]
+        if source is not None:
+            sql += " AND repair_type = ?"
+            params.append(source)
+        rows = self._conn.execute(sql + " ORDER BY archive_date, id", params)
+        return [self._load(data) for (data,) in rows]
+
+    @staticmethod
+    def _totals_cells(rows) -> Dict[tuple, List[int]]:
+        cells = {}
+        for day, source, mechanics, count, cost in rows:
+            key = (date.fromisoformat(day).toordinal(), source or None, bool(mechanics))
+            cells[key] = [count, cost]
+        return cells
+
+    def daily_totals(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> Dict[tuple, List[int]]:
+        sql = (
+            "SELECT archive_date, repair_type, is_mechanics, count, cost "
+            "FROM daily_totals WHERE archive_date BETWEEN ? AND ?"
+        )
+        params = [start.isoformat(), end.isoformat()]
+        if source is not None:
+            sql += " AND repair_type = ?"
+            params.append(source)
+        return self._totals_cells(self._conn.execute(sql, params))
+
+    def rebuild_daily_totals(self) -> List[str]:
+        with self._conn:
+            kept = self._totals_cells(
+                self._conn.execute(
+                    "SELECT archive_date, repair_type, is_mechanics, count, cost "
+                    "FROM daily_totals"
+                )
+            )
+            fresh = self._totals_cells(self._conn.execute(_TOTALS_FROM_REPAIRS))
+            self._conn.execute("DELETE FROM daily_totals")
+            self._conn.execute(f"INSERT INTO daily_totals {_TOTALS_FROM_REPAIRS}")
+        return diff_totals(kept, fresh, describe_daily_key)
+
+    @staticmethod
+    def _breakdown_cells(rows) -> Dict[tuple, List[int]]:
+        return {
+            (month, source or None, name): [count, revenue]
+            for month, source, name, count, revenue in rows
+        }
+
+    def breakdown_totals(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> Dict[tuple, List[int]]:
+        sql = (
+            "SELECT month, repair_type, name, count, revenue "
+            "FROM breakdown_totals WHERE month BETWEEN ? AND ?"
+        )
+        params = [start.isoformat()[:7], end.isoformat()[:7]]
+        if source is not None:
+            sql += " AND repair_type = ?"
+            params.append(source)
+        return self._breakdown_cells(self._conn.execute(sql, params))
+
+    def rebuild_breakdown_totals(self) -> List[str]:
+        with self._conn:
+            kept = self._breakdown_cells(
+                self._conn.execute(
+                    "SELECT month, repair_type, name, count, revenue "
+                    "FROM breakdown_totals"
+                )
+            )
+            self._conn.execute("DELETE FROM breakdown_totals")
+            self._count_breakdowns(self._select(is_archived=True), 1)
+            fresh = self._breakdown_cells(
+                self._conn.execute(
+                    "SELECT month, repair_type, name, count, revenue "
+                    "FROM breakdown_totals"
+                )
+            )
+        return diff_totals(kept, fresh)
+
+    @staticmethod
+    def _turnaround_cells(rows) -> Dict[tuple, List[int]]:
+        return {
+            (month, source or None, days): [count, total_days]
+            for month, source, days, count, total_days in rows
+        }
+
+    def turnaround_totals(
+        self, start: date, end: date, source: Optional[str] = None
+    ) -> Dict[tuple, List[int]]:
+        sql = (
+            "SELECT month, repair_type, days, count, total_days "
+            "FROM turnaround_totals WHERE month BETWEEN ? AND ?"
+        )
+        params = [start.isoformat()[:7], end.isoformat()[:7]]
+        if source is not None:
+            sql += " AND repair_type = ?"
+            params.append(source)
+        return self._turnaround_cells(self._conn.execute(sql, params))
+
+    def rebuild_turnaround_totals(self) -> List[str]:
+        with self._conn:
+            kept = self._turnaround_cells(
+                self._conn.execute(
+                    "SELECT month, repair_type, days, count, total_days "
+                    "FROM turnaround_totals"
+                )
+            )
+            fresh = self._turnaround_cells(
+                self._conn.execute(_TURNAROUND_FROM_REPAIRS)
+            )
+            self._conn.execute("DELETE FROM turnaround_totals")
+            self._conn.execute(
+                f"INSERT INTO turnaround_totals {_TURNAROUND_FROM_REPAIRS}"
+            )
+        return diff_totals(kept, fresh)
+
+    def delete_archive_before(self, cutoff: date) -> int:
+        # Строки с некорректной датой хранят NULL и под условие не попадают.
+        return (
+            self._write(
+                "DELETE FROM repairs WHERE is_archived = 1 AND archive_date < ?",
+                (cutoff.isoformat(),),
+                old=("archive_date < ?", (cutoff.isoformat(),)),
+            )
+            or 0
+        )
+
+    def replace_active(self, records: List[dict]) -> bool:
+        return self._replace(records, is_archived=False)
+
+    def replace_archive(self, records: List[dict]) -> bool:
+        return self._replace(records, is_archived=True)
+
+    def close(self) -> None:
+        self._conn.close()
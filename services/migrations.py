@@ -0,0 +1,154 @@
+"""
+Разовые миграции хранилища ремонтов.
+
+Запуск из корня проекта:
+
+    python -m services.migrations json-to-sqlite
+    python -m services.migrations date-ordinals
+    python -m services.migrations rebuild-aggregates
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+from typing import List
+
+import config
+from services.backends import (
+    JsonBackend,
+    SqliteBackend,
+    create_backend,
+    default_archive_dir,
+    default_sqlite_path,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_json_to_sqlite(
+    active_path: Path = None, archive_path: Path = None, sqlite_path: Path = None
+) -> tuple[int, int]:
+    """
+    Переносит активные и архивные ремонты из JSON-файлов в базу SQLite.
+    Миграция разовая: если в базе уже есть записи, она ничего не делает
+    и бросает RuntimeError, чтобы случайно не смешать два набора данных.
+    JSON-данные не удаляются и остаются резервной копией.
+    Возвращает (число активных, число архивных) перенесённых записей.
+    """
+    source = JsonBackend(
+        active_path or config.ACTIVE_PATH,
+        archive_path or config.ARCHIVE_PATH,
+        archive_dir=None if archive_path else default_archive_dir(),
+    )
+    target = SqliteBackend(sqlite_path or default_sqlite_path())
+    try:
+        if target.list_active() or target.list_archive():
+            raise RuntimeError(
+                f"База {target.path} уже содержит данные — миграция отменена."
+            )
+        active = source.list_active()
+        archive = source.list_archive()
+        if not (target.replace_active(active) and target.replace_archive(archive)):
+            raise RuntimeError(f"Не удалось записать данные в {target.path}.")
+        # Продолжаем нумерацию JSON-хранилища: ID, освобождённые удалениями
+        # до миграции, не должны выдаваться повторно.
+        target.ensure_next_id(source.next_id())
+    finally:
+        target.close()
+        source.close()
+
+    logger.info(
+        "Миграция JSON -> SQLite завершена: %s активных, %s архивных ремонтов.",
+        len(active),
+        len(archive),
+    )
+    return len(active), len(archive)
+
+
+def add_date_ordinals(backend_name: str = None) -> tuple[int, int]:
+    """
+    Проставляет всем записям номера дат (date_ord, archive_date_ord) и
+    сохраняет их в хранилище (по умолчанию — в бэкенде из config).
+    После этого при загрузке даты больше не разбираются из строк.
+    Повторный запуск безопасен: номера пересчитываются по строкам дат.
+    Возвращает (число активных, число архивных) записей.
+    """
+    backend = create_backend(backend_name)
+    try:
+        active = backend.list_active()
+        archive = backend.list_archive()
+        # replace_* пересчитывает номера дат и переписывает все записи.
+        if not (backend.replace_active(active) and backend.replace_archive(archive)):
+            raise RuntimeError("Не удалось сохранить записи с номерами дат.")
+    finally:
+        backend.close()
+
+    logger.info(
+        "Номера дат проставлены: %s активных, %s архивных ремонтов.",
+        len(active),
+        len(archive),
+    )
+    return len(active), len(archive)
+
+
+def rebuild_aggregates(backend_name: str = None) -> List[str]:
+    """
+    Пересчитывает с нуля дневные итоги, счётчики поломок и гистограммы
+    сроков ремонта, по которым строятся отчёты, и заменяет ими
+    поддерживаемые хранилищем. Служит проверкой:
+    возвращает найденные расхождения (пустой список — итоги были верны).
+    """
+    backend = create_backend(backend_name)
+    try:
+        problems = backend.rebuild_aggregates()
+    finally:
+        backend.close()
+
+    for problem in problems:
+        logger.warning("Расхождение итогов архива: %s", problem)
+    logger.info("Итоги архива пересчитаны, расхождений: %s.", len(problems))
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Миграции хранилища BikeManager.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "json-to-sqlite",
+        help="перенести данные из JSON-файлов в SQLite (config.SQLITE_PATH)",
+    )
+    commands.add_parser(
+        "date-ordinals",
+        help="сохранить у всех записей номера дат для сравнений и сортировок",
+    )
+    commands.add_parser(
+        "rebuild-aggregates",
+        help="пересчитать с нуля итоги архива и счётчики поломок и сверить их",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        if args.command == "json-to-sqlite":
+            active_count, archive_count = migrate_json_to_sqlite()
+            print(
+                f"Перенесено: {active_count} активных, {archive_count} архивных. "
+                "Установите STORAGE_BACKEND = \"sqlite\" в config.py."
+            )
+        elif args.command == "date-ordinals":
+            active_count, archive_count = add_date_ordinals()
+            print(
+                f"Обновлено: {active_count} активных, {archive_count} архивных."
+            )
+        elif args.command == "rebuild-aggregates":
+            problems = rebuild_aggregates()
+            print(f"Итоги пересчитаны, расхождений: {len(problems)}.")
+    except RuntimeError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
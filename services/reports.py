@@ -1,39 +1,173 @@
-from datetime import datetime, timedelta
-from calendar import monthrange
-
-def get_weekly_totals(archive_list: list):
-    result = []
-    today = datetime.now()
-    for i in range(4):
-        end = today - timedelta(days=7*i)
-        start = end - timedelta(days=6)
-        week_sum = 0
-        for r in archive_list:
-            closed = datetime.fromisoformat(r["date_closed"])
-            if start.date() <= closed.date() <= end.date():
-                week_sum += r["cost"]
-        result.append(((start.date(), end.date()), week_sum))
-    return result[::-1]
-
-
-def get_monthly_totals(archive_list: list):
-    result = []
-    today = datetime.now()
-    year = today.year
-    month = today.month
-    for i in range(12):
-        y = year
-        m = month - i
-        if m <= 0:
-            m += 12
-            y -= 1
-        start = datetime(y, m, 1)
-        last_day = monthrange(y, m)[1]
-        end = datetime(y, m, last_day, 23, 59, 59)
-        month_sum = 0
-        for r in archive_list:
-            closed = datetime.fromisoformat(r["date_closed"])
-            if start <= closed <= end:
-                month_sum += r["cost"]
-        result.append(((y, m), month_sum))
-    return result[::-1]
+"""
+Общее ядро агрегации архива по периодам отчётов.
+
+Периоды (день, неделя, месяц, квартал, год) отсчитываются от «текущей»
+даты, а ремонты раскладываются по ним за один проход по дате архивации
+(archive_date / archive_date_ord): индекс периода для дня вычисляется
+арифметикой или бинарным поиском, без сравнения с границами каждого
+периода. Ядром пользуются services.storage (отчёты бота) и
+get_weekly_totals / get_monthly_totals.
+"""
+
+import bisect
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from services.backends.base import parse_date
+
+PERIOD_TYPES = ("day", "week", "month", "quarter", "year")
+
+
+def month_title(year: int, month: int) -> str:
+    """Название месяца отчёта: 'Март 2025' (по текущей локали)."""
+    return f"{calendar.month_name[month].capitalize()} {year}"
+
+
+def report_periods(period_type: str, num_periods: int, today: date) -> list:
+    """
+    Возвращает границы периодов отчёта [(начало, конец, название), ...]
+    от текущего периода (индекс 0) к более старым. Для неизвестного
+    period_type — пустой список.
+    """
+    periods = []
+    if period_type == "week":
+        # Find the Sunday of the current week
+        current_sunday = today + timedelta(days=6 - today.weekday())
+        for i in range(num_periods):
+            week_end = current_sunday - timedelta(weeks=i)
+            week_start = week_end - timedelta(days=6)
+            periods.append(
+                (
+                    week_start,
+                    week_end,
+                    f"с {week_start.day:02d}.{week_start.month:02d} "
+                    f"по {week_end.day:02d}.{week_end.month:02d}",
+                )
+            )
+    elif period_type == "month":
+        current_month = today.year * 12 + today.month - 1
+        for i in range(num_periods):
+            target_year, target_month = divmod(current_month - i, 12)
+            target_month += 1
+            month_start = date(target_year, target_month, 1)
+            month_end = date(
+                target_year,
+                target_month,
+                calendar.monthrange(target_year, target_month)[1],
+            )
+            periods.append(
+                (month_start, month_end, month_title(target_year, target_month))
+            )
+    elif period_type == "day":
+        for i in range(num_periods):
+            day = today - timedelta(days=i)
+            periods.append((day, day, day.strftime("%d.%m.%Y")))
+    elif period_type == "quarter":
+        current_quarter = today.year * 4 + (today.month - 1) // 3
+        for i in range(num_periods):
+            year, quarter = divmod(current_quarter - i, 4)
+            last_month = quarter * 3 + 3
+            periods.append(
+                (
+                    date(year, quarter * 3 + 1, 1),
+                    date(year, last_month, calendar.monthrange(year, last_month)[1]),
+                    f"{quarter + 1} квартал {year}",
+                )
+            )
+    elif period_type == "year":
+        for i in range(num_periods):
+            year = today.year - i
+            periods.append((date(year, 1, 1), date(year, 12, 31), f"{year} год"))
+    return periods
+
+
+def period_index(period_type: str, periods: list, today: date) -> Callable:
+    """
+    Возвращает функцию «номер дня -> индекс периода в списке
+    report_periods» для дней внутри окна отчёта: номер недели или месяца
+    вычисляется арифметикой, для остальных типов — бинарным поиском по
+    началам периодов.
+    """
+    if period_type == "week":
+        last_sunday = periods[0][1].toordinal()
+        return lambda ordinal: (last_sunday - ordinal) // 7
+    if period_type != "month":
+        starts = [start.toordinal() for start, _, _ in reversed(periods)]
+        return lambda ordinal: len(starts) - bisect.bisect_right(starts, ordinal)
+    current_month = today.year * 12 + today.month - 1
+
+    def month_index(ordinal: int) -> int:
+        day = date.fromordinal(ordinal)
+        return current_month - (day.year * 12 + day.month - 1)
+
+    return month_index
+
+
+def archive_ordinal(record: dict) -> Optional[int]:
+    """
+    Номер дня архивации записи: готовый archive_date_ord из хранилища или
+    разобранная строка archive_date. None — даты нет или она некорректна.
+    """
+    if "archive_date_ord" in record:
+        return record["archive_date_ord"]
+    day = parse_date(record.get("archive_date"))
+    return day.toordinal() if day is not None else None
+
+
+def bucket_repairs(
+    records: Iterable[dict], period_type: str, periods: list, today: date
+) -> Tuple[List[list], list]:
+    """
+    Раскладывает ремонты по периодам report_periods за один проход:
+    возвращает (списки ремонтов, суммы стоимости) в порядке periods.
+    Ремонты вне окна отчёта и без даты архивации пропускаются; порядок
+    ремонтов внутри периода — порядок records.
+    """
+    buckets: List[list] = [[] for _ in periods]
+    totals = [0] * len(periods)
+    if not periods:
+        return buckets, totals
+    first = periods[-1][0].toordinal()
+    last = periods[0][1].toordinal()
+    index = period_index(period_type, periods, today)
+    for repair in records:
+        ordinal = archive_ordinal(repair)
+        if ordinal is None or not first <= ordinal <= last:
+            continue
+        i = index(ordinal)
+        buckets[i].append(repair)
+        totals[i] += repair.get("cost", 0)
+    return buckets, totals
+
+
+def _period_totals(
+    archive_list: Iterable[dict], period_type: str, num_periods: int, today
+) -> List[tuple]:
+    today = today or datetime.now().date()
+    periods = report_periods(period_type, num_periods, today)
+    _, totals = bucket_repairs(archive_list, period_type, periods, today)
+    return list(zip(periods, totals))[::-1]
+
+
+def get_weekly_totals(archive_list: list, today: Optional[date] = None) -> list:
+    """
+    Суммы стоимости архива за 4 календарные недели (пн–вс, последняя —
+    текущая) по дате архивации: [((начало, конец), сумма), ...] от старых
+    к новым — те же недели, что в отчётах бота.
+    """
+    return [
+        ((start, end), total)
+        for (start, end, _), total in _period_totals(archive_list, "week", 4, today)
+    ]
+
+
+def get_monthly_totals(archive_list: list, today: Optional[date] = None) -> list:
+    """
+    Суммы стоимости архива за 12 календарных месяцев (последний — текущий)
+    по дате архивации: [((год, месяц), сумма), ...] от старых к новым.
+    """
+    return [
+        ((start.year, start.month), total)
+        for (start, _, _), total in _period_totals(archive_list, "month", 12, today)
+    ]
@@ -0,0 +1,245 @@
+"""
+Снимок готовых отчётов по умолчанию.
+
+Отчёты за 4 недели и 12 месяцев по всем источникам считаются заранее
+фоновой задачей (run_refresher, запускается из bot.main): после полуночи
+и после изменений архива — когда версия архива (storage.archive_version:
+изменения архива через storage и перечитывание бэкендом данных,
+изменённых извне) перестаёт меняться на время REPORT_SNAPSHOT_DEBOUNCE.
+Правки активных ремонтов снимок не трогают: отчёты зависят только от
+архива. Хендлер отчётов берёт готовый отчёт из снимка (aget_report), а
+если снимок устарел — считает его обычным путём.
+
+Снимок сохраняется на диск вместе с отпечатком дневных итогов архива:
+после перезапуска он снова используется, если дата и отпечаток совпадают.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import config
+import services.storage as storage
+
+logger = logging.getLogger(__name__)
+
+# Отчёты, которые держатся в снимке: (тип периода, число периодов).
+SNAPSHOT_REPORTS = (("week", 4), ("month", 12))
+
+# Сколько секунд версия архива должна не меняться, прежде чем снимок
+# пересчитывается (серия правок архива — один пересчёт).
+DEFAULT_DEBOUNCE = 30.0
+
+SNAPSHOT_FIELDS = {"date", "fingerprint", "reports"}
+
+# (версия архива, снимок) — заменяется целиком, чтобы читатели не видели
+# версию от одного снимка и отчёты от другого.
+_current: Optional[tuple] = None
+
+
+def snapshot_path() -> Path:
+    """Файл снимка: config.REPORT_SNAPSHOT_PATH или рядом с ACTIVE_PATH."""
+    return Path(
+        getattr(config, "REPORT_SNAPSHOT_PATH", None)
+        or Path(config.ACTIVE_PATH).parent / "report_snapshot.json"
+    )
+
+
+def _report_key(period_type: str, num_periods: int, source_filter: str) -> str:
+    return f"{period_type}:{num_periods}:{source_filter}"
+
+
+def _sources() -> List[str]:
+    return ["all", *storage.get_repair_sources()]
+
+
+def data_fingerprint() -> str:
+    """
+    Отпечаток дневных итогов архива: совпадает, только если совпадают
+    все данные, из которых считаются отчёты снимка.
+    """
+    with storage.lock:
+        cells = storage.get_backend().daily_totals(date.min, date.max, None)
+    rows = sorted(([*key, *value] for key, value in cells.items()), key=repr)
+    return hashlib.sha1(repr(rows).encode("utf-8")).hexdigest()
+
+
+def build_snapshot(today: Optional[date] = None) -> tuple:
+    """
+    Считает все отчёты снимка на дату today (по умолчанию сегодня).
+    Возвращает (версия архива, снимок) — данные не меняются, пока отчёты
+    считаются под блокировкой хранилища.
+    """
+    today = today or datetime.now().date()
+    with storage.lock:
+        version = storage.archive_version()
+        reports = {
+            _report_key(period_type, num_periods, source): (
+                storage.compute_report_totals(
+                    period_type, num_periods, source, today=today
+                )
+            )
+            for period_type, num_periods in SNAPSHOT_REPORTS
+            for source in _sources()
+        }
+        snapshot = {
+            "date": today.isoformat(),
+            "fingerprint": data_fingerprint(),
+            "reports": reports,
+        }
+    return version, snapshot
+
+
+def get_report(
+    period_type: str,
+    num_periods: int,
+    source_filter: str = "all",
+    today: Optional[date] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Готовый отчёт из снимка (в виде storage.get_report_totals) или None,
+    если такого отчёта в снимке нет или снимок устарел: снят в другой
+    день или до последнего изменения архива.
+    """
+    current = _current
+    if current is None:
+        return None
+    version, snapshot = current
+    today = today or datetime.now().date()
+    if version != storage.archive_version() or snapshot["date"] != today.isoformat():
+        return None
+    reports = snapshot["reports"].get(
+        _report_key(period_type, num_periods, source_filter)
+    )
+    if reports is None:
+        return None
+    return [dict(report) for report in reports]
+
+
+async def aget_report(
+    period_type: str, num_periods: int, source_filter: str = "all"
+) -> Optional[List[Dict[str, Any]]]:
+    # Версия архива сверяется с бэкендом под блокировкой хранилища —
+    # не в потоке event loop.
+    return await storage.arun_read(
+        get_report, period_type, num_periods, source_filter
+    )
+
+
+def is_fresh(today: Optional[date] = None) -> bool:
+    """Снимок снят сегодня и после последнего изменения архива."""
+    current = _current
+    today = today or datetime.now().date()
+    return (
+        current is not None
+        and current[0] == storage.archive_version()
+        and current[1]["date"] == today.isoformat()
+    )
+
+
+def load_snapshot(path: Path) -> Optional[dict]:
+    """Читает снимок с диска. None — файла нет или он повреждён."""
+    if not path.exists():
+        return None
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        logger.exception("Не удалось прочитать снимок отчётов %s.", path)
+        return None
+    if not isinstance(snapshot, dict) or not SNAPSHOT_FIELDS <= snapshot.keys():
+        logger.error("Снимок отчётов %s в неожиданном формате.", path)
+        return None
+    return snapshot
+
+
+def save_snapshot(path: Path, snapshot: dict) -> bool:
+    """
+    Сохраняет снимок через временный файл и атомарное переименование.
+    Возвращает True при успехе.
+    """
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        tmp_path.replace(path)
+        return True
+    except OSError:
+        logger.exception("Не удалось сохранить снимок отчётов %s.", path)
+        return False
+
+
+def restore(today: Optional[date] = None) -> bool:
+    """
+    Подхватывает снимок с диска, если он снят сегодня и его отпечаток
+    совпадает с текущими данными. Возвращает True, если снимок подхвачен.
+    """
+    global _current
+    today = today or datetime.now().date()
+    snapshot = load_snapshot(snapshot_path())
+    if snapshot is None or snapshot["date"] != today.isoformat():
+        return False
+    with storage.lock:
+        version = storage.archive_version()
+        if snapshot["fingerprint"] != data_fingerprint():
+            return False
+    _current = (version, snapshot)
+    logger.info("Снимок отчётов за %s загружен с диска.", snapshot["date"])
+    return True
+
+
+def refresh(today: Optional[date] = None) -> bool:
+    """
+    Пересчитывает и сохраняет снимок, если он устарел. Возвращает True,
+    если снимок был пересчитан.
+    """
+    global _current
+    if is_fresh(today):
+        return False
+    _current = build_snapshot(today)
+    save_snapshot(snapshot_path(), _current[1])
+    logger.info(
+        "Снимок отчётов пересчитан (%s, версия архива %s).",
+        _current[1]["date"],
+        _current[0],
+    )
+    return True
+
+
+def _seconds_until_midnight() -> float:
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+async def run_refresher(debounce: Optional[float] = None) -> None:
+    """
+    Фоновая задача: держит снимок свежим, пока не будет отменена.
+    Снимок пересчитывается, когда он устарел, а версия архива не менялась
+    последние debounce секунд (config.REPORT_SNAPSHOT_DEBOUNCE), и сразу
+    после полуночи. Всё блокирующее выполняется в пуле потоков хранилища:
+    storage.shutdown() дожидается идущего пересчёта, прежде чем закрыть
+    бэкенд.
+    """
+    if debounce is None:
+        debounce = getattr(config, "REPORT_SNAPSHOT_DEBOUNCE", DEFAULT_DEBOUNCE)
+    try:
+        await storage.arun_read(restore)
+    except Exception:
+        logger.exception("Ошибка при загрузке снимка отчётов.")
+    seen = await storage.aarchive_version()
+    while True:
+        version = await storage.aarchive_version()
+        if version == seen and not await storage.arun_read(is_fresh):
+            try:
+                await storage.arun_read(refresh)
+            except Exception:
+                logger.exception("Ошибка при пересчёте снимка отчётов.")
+        seen = version
+        # Просыпаемся и сразу после полуночи, чтобы к утру снимок был готов.
+        await asyncio.sleep(min(debounce, _seconds_until_midnight() + 1))
@@ -1,12 +1,19 @@
-import json
+import asyncio
+import calendar
+import functools
 import logging
 import threading
-from pathlib import Path
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
 import config
-import calendar
 import locale
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import analytics
+from services.backends import StorageBackend, create_backend
+from services.reports import bucket_repairs, month_title, report_periods
 
 logger = logging.getLogger(__name__)
 
@@ -34,57 +41,111 @@ else:
 lock = threading.RLock()
 
 
-def _load(path: Path) -> list:
+_backend: Optional[StorageBackend] = None
+
+
+def get_backend() -> StorageBackend:
     """
-    Загружает данные из JSON файла по указанному пути.
-    Возвращает пустой список, если файл не существует, повреждён
-    или недоступен для чтения — чтобы бот не падал целиком из-за
-    проблем с одним файлом хранилища.
+    Возвращает текущий бэкенд хранилища, создавая его при первом
+    обращении по настройке config.STORAGE_BACKEND ('json' по умолчанию).
     """
-    if not path.exists():
-        return []
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-    except json.JSONDecodeError:
-        logger.exception("Файл %s повреждён (невалидный JSON).", path)
-        return []
-    except OSError:
-        logger.exception("Не удалось прочитать файл %s.", path)
-        return []
+    global _backend
+    with lock:
+        if _backend is None:
+            _backend = create_backend()
+            logger.info(
+                "Хранилище ремонтов: бэкенд %s.", type(_backend).__name__
+            )
+        return _backend
+
+
+def set_backend(backend: Optional[StorageBackend]) -> None:
+    """
+    Подменяет бэкенд хранилища (например, на SQLite после миграции
+    или на временный при проверках). None — пересоздать по config.
+    """
+    global _backend
+    with lock:
+        if _backend is not None and _backend is not backend:
+            _backend.close()
+        _backend = backend
+        _archive_changed()
 
-    if not isinstance(data, list):
-        logger.error(
-            "Файл %s содержит неожиданный формат данных (ожидался список).", path
-        )
-        return []
-    return data
 
+# Счётчик изменений: растёт при каждом изменении через этот модуль и при
+# смене бэкенда. Изменения в обход services.storage учитывает поколение
+# бэкенда (StorageBackend.generation) — вместе они дают data_version().
+_data_version = 0
 
-def _save(path: Path, data) -> bool:
+
+def data_version() -> tuple:
     """
-    Сохраняет данные в JSON файл по указанному пути.
-    Пишет во временный файл и атомарно переименовывает его в целевой,
-    чтобы при сбое посреди записи не повредить существующие данные.
-    Возвращает True при успехе, False при ошибке записи.
+    Текущая версия данных хранилища: (счётчик изменений этого модуля,
+    поколение бэкенда). Меняется и при изменениях через services.storage
+    (см. _data_changed), и когда бэкенд перечитал данные, изменённые
+    извне. По ней кэши производных данных понимают, что их пора
+    пересобрать.
     """
-    tmp_path = path.with_suffix(path.suffix + ".tmp")
-    try:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with tmp_path.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        tmp_path.replace(path)
-        return True
-    except OSError:
-        logger.exception("Не удалось сохранить файл %s.", path)
-        return False
+    with lock:
+        return (_data_version, get_backend().generation())
+
+
+def _data_changed() -> None:
+    """Отмечает изменение данных. Вызывается под `lock`."""
+    global _data_version
+    _data_version += 1
+
+
+# Версия архива для кэшей, которые переживают процесс (список ID архива в
+# данных FSM): счётчик растёт только при изменениях архива, а токен
+# процесса отличает счётчики разных запусков бота — после перезапуска
+# счётчик начинается заново и без токена совпал бы со старым.
+_archive_version = 0
+_PROCESS_TOKEN = uuid.uuid4().hex
+
+
+def archive_version() -> str:
+    """
+    Текущая версия архива: токен процесса, счётчик изменений архива через
+    этот модуль и поколение бэкенда. В отличие от data_version(), не
+    меняется при правке активных ремонтов и сохраняется в JSON без потерь.
+    """
+    with lock:
+        return f"{_PROCESS_TOKEN}:{_archive_version}:{get_backend().generation()}"
+
+
+def _archive_changed() -> None:
+    """Отмечает изменение архива (и данных в целом). Вызывается под `lock`."""
+    global _archive_version
+    _archive_version += 1
+    _data_changed()
 
 
 def get_active_repairs() -> list:
     """
     Возвращает список всех активных ремонтов.
     """
-    return _load(config.ACTIVE_PATH)
+    with lock:
+        return get_backend().list_active()
+
+
+def get_active_repairs_page(
+    page: int, page_size: int, order: str = "date"
+) -> Tuple[list, int, int]:
+    """
+    Возвращает страницу активных ремонтов: (ремонты страницы, номер
+    страницы, всего ремонтов). Из хранилища читается только срез страницы
+    в порядке order ('date' — по дате создания, 'id' — по ID). Номер
+    страницы за пределами списка (например, после закрытия ремонтов)
+    сдвигается на последнюю страницу.
+    """
+    with lock:
+        backend = get_backend()
+        total = backend.count_active()
+        last_page = max(total - 1, 0) // page_size
+        page = min(max(page, 0), last_page)
+        repairs = backend.list_active_page(page * page_size, page_size, order)
+        return repairs, page, total
 
 
 def update_active_repairs(all_repairs: list):
@@ -92,14 +153,16 @@ def update_active_repairs(all_repairs: list):
     Полностью перезаписывает файл активных ремонтов.
     """
     with lock:
-        _save(config.ACTIVE_PATH, all_repairs)
+        _data_changed()
+        get_backend().replace_active(all_repairs)
 
 
 def get_archive_repairs() -> list:
     """
     Возвращает список всех архивных ремонтов.
     """
-    return _load(config.ARCHIVE_PATH)
+    with lock:
+        return get_backend().list_archive()
 
 
 def update_archive_repairs(all_repairs: list):
@@ -107,35 +170,31 @@ def update_archive_repairs(all_repairs: list):
     Полностью перезаписывает файл архивных ремонтов.
     """
     with lock:
-        _save(config.ARCHIVE_PATH, all_repairs)
+        _archive_changed()
+        get_backend().replace_archive(all_repairs)
 
 
-def _get_next_repair_id_unlocked() -> int:
+def _allocate_repair_id_unlocked() -> int:
     """
-    Внутренний хелпер: вычисляет следующий ID БЕЗ захвата блокировки.
+    Внутренний хелпер: резервирует новый ID БЕЗ захвата блокировки.
     Вызывающий код обязан сам держать `lock`.
+    ID берутся из сохраняемого счётчика бэкенда: выдача не читает данные
+    ремонтов, и ID удалённых ремонтов никогда не выдаются повторно.
     """
-    active_repairs = _load(config.ACTIVE_PATH)
-    archive_repairs = _load(config.ARCHIVE_PATH)
-    all_ids = [
-        r.get("id", 0)
-        for r in active_repairs + archive_repairs
-        if isinstance(r.get("id"), int)
-    ]
-    return max(all_ids) + 1 if all_ids else 1
+    return get_backend().allocate_id()
 
 
 def get_next_repair_id() -> int:
     """
-    Генерирует следующий доступный ID для нового ремонта.
-    Ищет максимальный ID среди активных и архивных ремонтов.
+    Возвращает ID, который получит следующий созданный ремонт
+    (значение счётчика ID, без его резервирования).
 
     ВНИМАНИЕ: если между вызовом этой функции и последующим add_repair()
     может произойти конкурентная запись — используйте create_repair(),
     которая делает обе операции атомарно под одной блокировкой.
     """
     with lock:
-        return _get_next_repair_id_unlocked()
+        return get_backend().next_id()
 
 
 def add_repair(repair_dict: dict) -> bool:
@@ -144,9 +203,8 @@ def add_repair(repair_dict: dict) -> bool:
     Возвращает True при успешном сохранении.
     """
     with lock:
-        data = _load(config.ACTIVE_PATH)
-        data.append(repair_dict)
-        return _save(config.ACTIVE_PATH, data)
+        _data_changed()
+        return get_backend().insert_active(repair_dict)
 
 
 def create_repair(repair_dict: dict) -> int:
@@ -158,11 +216,10 @@ def create_repair(repair_dict: dict) -> int:
     Возвращает присвоенный ID.
     """
     with lock:
-        new_id = _get_next_repair_id_unlocked()
+        new_id = _allocate_repair_id_unlocked()
         repair_dict["id"] = new_id
-        data = _load(config.ACTIVE_PATH)
-        data.append(repair_dict)
-        _save(config.ACTIVE_PATH, data)
+        _data_changed()
+        get_backend().insert_active(repair_dict)
         return new_id
 
 
@@ -175,12 +232,11 @@ def create_archived_repair(repair_dict: dict) -> int:
     Возвращает присвоенный ID.
     """
     with lock:
-        new_id = _get_next_repair_id_unlocked()
+        new_id = _allocate_repair_id_unlocked()
         repair_dict["id"] = new_id
         repair_dict.setdefault("archive_date", datetime.now().strftime("%d.%m.%Y"))
-        data = _load(config.ARCHIVE_PATH)
-        data.append(repair_dict)
-        _save(config.ARCHIVE_PATH, data)
+        _archive_changed()
+        get_backend().insert_archive(repair_dict)
         return new_id
 
 
@@ -190,26 +246,10 @@ def archive_repair_by_id(rid: int) -> bool:
     Возвращает True, если ремонт найден и перемещен, False в противном случае.
     """
     with lock:
-        active = _load(config.ACTIVE_PATH)
-        archive = _load(config.ARCHIVE_PATH)
-
-        to_move = None
-        active_filtered = []
-        for r in active:
-            if r.get("id") == rid:
-                to_move = r
-            else:
-                active_filtered.append(r)
-
-        if not to_move:
-            return False
-
-        to_move["archive_date"] = datetime.now().strftime("%d.%m.%Y")
-        archive.append(to_move)
-
-        _save(config.ACTIVE_PATH, active_filtered)
-        _save(config.ARCHIVE_PATH, archive)
-        return True
+        _archive_changed()
+        return get_backend().move_to_archive(
+            rid, datetime.now().strftime("%d.%m.%Y")
+        )
 
 
 def get_active_repair_data_by_id(repair_id: int) -> Optional[dict]:
@@ -217,11 +257,8 @@ def get_active_repair_data_by_id(repair_id: int) -> Optional[dict]:
     Возвращает данные активного ремонта по его ID.
     Возвращает None, если ремонт не найден.
     """
-    active_repairs = get_active_repairs()
-    for repair in active_repairs:
-        if repair.get("id") == repair_id:
-            return repair
-    return None
+    with lock:
+        return get_backend().get_active(repair_id)
 
 
 def update_repair_field(repair_id: int, field_name: str, new_value) -> bool:
@@ -230,48 +267,92 @@ def update_repair_field(repair_id: int, field_name: str, new_value) -> bool:
     Работает только для активных ремонтов.
     """
     with lock:
-        active_repairs = _load(config.ACTIVE_PATH)
-        updated = False
-        for repair in active_repairs:
-            if repair.get("id") == repair_id:
-                repair[field_name] = new_value
-                updated = True
-                break
-        if updated:
-            return _save(config.ACTIVE_PATH, active_repairs)
-        return False
+        _data_changed()
+        return get_backend().update_active(repair_id, field_name, new_value)
 
 
-def get_archived_repairs_last_two_months(source_filter: str = "all") -> list:
+def get_archive_range(start: date, end: date, source: Optional[str] = None) -> list:
     """
-    Возвращает список архивированных ремонтов за последние 2 месяца.
-    Добавлена фильтрация по источнику (repair_type).
+    Возвращает архивные ремонты с датой архивации в [start, end]
+    (включительно), отсортированные по дате архивации по возрастанию.
+    source — ключ источника (repair_type); None или 'all' — все источники.
+    Выборка идёт по индексам бэкенда (дата и источник): O(log n + k),
+    где k — число ремонтов выбранного источника в диапазоне.
     """
-    all_archive_repairs = _load(config.ARCHIVE_PATH)
+    if source == "all":
+        source = None
+    with lock:
+        return get_backend().list_archive_range(start, end, source)
+
+
+def recent_archive_since() -> date:
+    """Первый день окна «последние 2 месяца» для просмотра архива."""
     two_months_ago = datetime.now() - timedelta(days=60)
-    recent_repairs = []
-    for repair in all_archive_repairs:
-        archive_date_str = repair.get("archive_date")
-        if archive_date_str:
-            try:
-                archive_date = datetime.strptime(archive_date_str, "%d.%m.%Y")
-            except ValueError:
-                logger.warning(
-                    "Некорректная дата архивации %r у ремонта ID:%s — запись пропущена.",
-                    archive_date_str,
-                    repair.get("id"),
-                )
-                continue
-            if archive_date >= two_months_ago:
-                # Применяем фильтр, если он не 'all'
-                if (
-                    source_filter == "all"
-                    or repair.get("repair_type") == source_filter
-                ):
-                    recent_repairs.append(repair)
+    # Ремонт за день D попадает в выборку, если полночь D не раньше
+    # two_months_ago, то есть начиная со следующего за ним дня.
+    return two_months_ago.date() + timedelta(days=1)
+
+
+def get_archived_repairs_last_two_months(source_filter: str = "all") -> list:
+    """
+    Возвращает список архивированных ремонтов за последние 2 месяца,
+    от новых к старым. Добавлена фильтрация по источнику (repair_type).
+    """
+    recent_repairs = get_archive_range(recent_archive_since(), date.max, source_filter)
+    recent_repairs.reverse()
     return recent_repairs
 
 
+def get_archived_repair_ids_range(
+    start: date, end: date, source_filter: str = "all"
+) -> List[int]:
+    """
+    ID архивных ремонтов с датой архивации в [start, end] от новых к
+    старым — для постраничного просмотра архива, где сами записи
+    читаются по ID (get_archive_repairs_by_ids). Выборка идёт по индексу
+    дат (get_archive_range): открытие старого месяца читает только его.
+    """
+    repairs = get_archive_range(start, end, source_filter)
+    return [r["id"] for r in reversed(repairs) if r.get("id") is not None]
+
+
+def get_archive_months(source_filter: str = "all") -> List[Tuple[int, int, int]]:
+    """
+    Месяцы, в которых есть архивные ремонты: [(год, месяц, число
+    ремонтов), ...] от новых к старым. Считается по дневным итогам
+    архива, без чтения записей.
+    """
+    source = None if source_filter == "all" else source_filter
+    counts: Dict[Tuple[int, int], int] = {}
+    with lock:
+        cells = get_backend().daily_totals(date.min, date.max, source)
+    for (ordinal, _, _), (count, _) in cells.items():
+        day = date.fromordinal(ordinal)
+        counts[day.year, day.month] = counts.get((day.year, day.month), 0) + count
+    return [
+        (year, month, count)
+        for (year, month), count in sorted(counts.items(), reverse=True)
+        if count
+    ]
+
+
+def get_archive_repair_by_id(repair_id: int) -> Optional[dict]:
+    """Возвращает архивный ремонт по ID или None."""
+    with lock:
+        return get_backend().get_archive(repair_id)
+
+
+def get_archive_repairs_by_ids(repair_ids: List[int]) -> List[dict]:
+    """
+    Архивные ремонты по списку ID в том же порядке; отсутствующие в
+    архиве ID пропускаются. Читаются только эти записи.
+    """
+    with lock:
+        backend = get_backend()
+        repairs = (backend.get_archive(repair_id) for repair_id in repair_ids)
+        return [repair for repair in repairs if repair is not None]
+
+
 def restore_repair_by_id(repair_id: int) -> bool:
     """
     Перемещает ремонт из архива в активные по ID.
@@ -279,159 +360,540 @@ def restore_repair_by_id(repair_id: int) -> bool:
     Возвращает True, если ремонт найден и перемещен, False в противном случае.
     """
     with lock:
-        active = _load(config.ACTIVE_PATH)
-        archive = _load(config.ARCHIVE_PATH)
+        _archive_changed()
+        return get_backend().move_to_active(repair_id)
 
-        to_move = None
-        archive_filtered = []
-        for r in archive:
-            if r.get("id") == repair_id:
-                to_move = r
-            else:
-                archive_filtered.append(r)
 
-        if not to_move:
-            return False  # Ремонт не найден в архиве
+def get_repair_sources():
+    """Возвращает словарь источников ремонтов"""
+    return config.REPAIR_SOURCES
 
-        # Удаляем поле 'archive_date'
-        if "archive_date" in to_move:
-            del to_move["archive_date"]
 
-        active.append(to_move)
+def compute_reports_data(
+    period_type: str,
+    num_periods: int,
+    source_filter: str = "all",
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Собирает данные для отчетов с учетом фильтрации по источнику
+    (без кэша — см. get_reports_data).
 
-        _save(config.ACTIVE_PATH, active)
-        _save(config.ARCHIVE_PATH, archive_filtered)
-        return True
+    Ремонты всего окна отчёта берутся одной выборкой по индексу дат и
+    раскладываются по периодам за один проход (services.reports).
+    Периоды возвращаются от старых к новым.
+    today — «текущая» дата отчёта (по умолчанию сегодня).
+    """
+    today = today or datetime.now().date()
+    periods = report_periods(period_type, num_periods, today)
+    if not periods:
+        return []
 
+    window = get_archive_range(periods[-1][0], periods[0][1], source_filter)
+    buckets, totals = bucket_repairs(window, period_type, periods, today)
+
+    reports = [
+        {
+            "period_name": period_name,
+            "start_date": start.strftime("%d.%m.%Y"),
+            "end_date": end.strftime("%d.%m.%Y"),
+            "bike_count": len(period_repairs),
+            "total_cost": total_cost,
+            "repairs": period_repairs,
+        }
+        for (start, end, period_name), period_repairs, total_cost in zip(
+            periods, buckets, totals
+        )
+    ]
+    reports.reverse()
+    return reports
 
-def get_repair_sources():
-    """Возвращает словарь источников ремонтов"""
-    return config.REPAIR_SOURCES
+
+def compute_report_totals(
+    period_type: str,
+    num_periods: int,
+    source_filter: str = "all",
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    То же, что compute_reports_data, но без списка ремонтов ("repairs"):
+    число и сумма каждого периода берутся из накопленных сумм дневных
+    итогов архива (см. _day_prefix) — O(1) на период, сколько бы ремонтов
+    в него ни попало. period_type: 'day', 'week', 'month', 'quarter', 'year'.
+    """
+    today = today or datetime.now().date()
+    periods = report_periods(period_type, num_periods, today)
+    if not periods:
+        return []
+
+    prefix = _day_prefix(None if source_filter == "all" else source_filter)
+    reports = [
+        _totals_report(period_name, start, end, prefix)
+        for start, end, period_name in periods
+    ]
+    reports.reverse()
+    return reports
+
+
+def get_range_totals(
+    start: date, end: date, source_filter: str = "all"
+) -> Dict[str, Any]:
+    """
+    Итоги архива за произвольный диапазон дат [start, end] (включительно)
+    в том же виде, что и период get_report_totals.
+    """
+    prefix = _day_prefix(None if source_filter == "all" else source_filter)
+    return _totals_report(
+        f"с {start:%d.%m.%Y} по {end:%d.%m.%Y}", start, end, prefix
+    )
+
+
+def _totals_report(
+    period_name: str, start: date, end: date, prefix: "analytics.DayPrefixSums"
+) -> Dict[str, Any]:
+    bike_count, total_cost = prefix.totals(start, end)
+    return {
+        "period_name": period_name,
+        "start_date": start.strftime("%d.%m.%Y"),
+        "end_date": end.strftime("%d.%m.%Y"),
+        "bike_count": bike_count,
+        "total_cost": total_cost,
+    }
+
+
+# Колоночное представление архива (services.analytics) и версия архива,
+# по которой оно построено.
+_columnar: Optional["analytics.ColumnarArchive"] = None
+_columnar_version: Optional[str] = None
+
+
+def _columnar_archive() -> Optional["analytics.ColumnarArchive"]:
+    """
+    Колоночное представление архива для отчётов или None, если NumPy не
+    установлен, архив не больше config.REPORTS_NUMPY_THRESHOLD записей или
+    в нём есть нецелые стоимости. Строится один раз на версию архива
+    (archive_version): записи читаются под блокировкой, а массивы
+    строятся уже без неё, не задерживая запись в хранилище.
+    """
+    global _columnar, _columnar_version
+    if not analytics.HAS_NUMPY:
+        return None
+    threshold = getattr(config, "REPORTS_NUMPY_THRESHOLD", analytics.DEFAULT_THRESHOLD)
+    with lock:
+        backend = get_backend()
+        if backend.count_archive() <= threshold:
+            return None
+        version = archive_version()
+        columns = _columnar if _columnar_version == version else None
+        if columns is None:
+            records = backend.list_archive_range(date.min, date.max)
+    if columns is None:
+        columns = analytics.ColumnarArchive(records)
+        with lock:
+            if archive_version() == version:
+                _columnar, _columnar_version = columns, version
+    return columns if columns.exact else None
+
+
+def get_columnar_report(
+    period_type: str,
+    num_periods: int,
+    source_filter: str = "all",
+    today: Optional[date] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Итоги отчёта в том же виде, что у compute_report_totals, по колоночному
+    представлению архива (см. _columnar_archive): число и сумма каждого
+    периода совпадают с compute_reports_data. None — колоночный путь
+    неприменим, и отчёт считается обычным путём.
+    """
+    columns = _columnar_archive()
+    if columns is None:
+        return None
+    today = today or datetime.now().date()
+    periods = report_periods(period_type, num_periods, today)
+    counts, costs = columns.period_totals(
+        [(start, end) for start, end, _ in periods], source_filter
+    )
+    reports = [
+        {
+            "period_name": period_name,
+            "start_date": start.strftime("%d.%m.%Y"),
+            "end_date": end.strftime("%d.%m.%Y"),
+            "bike_count": bike_count,
+            "total_cost": total_cost,
+        }
+        for (start, end, period_name), bike_count, total_cost in zip(
+            periods, counts, costs
+        )
+    ]
+    reports.reverse()
+    return reports
+
+
+# Накопленные суммы дневных итогов по источникам (None — все источники);
+# строятся один раз на версию данных.
+_day_prefixes: Dict[Optional[str], "analytics.DayPrefixSums"] = {}
+_day_prefixes_version: Optional[tuple] = None
+
+
+def _day_prefix(source: Optional[str]) -> "analytics.DayPrefixSums":
+    global _day_prefixes_version
+    with lock:
+        version = data_version()
+        if _day_prefixes_version != version:
+            _day_prefixes.clear()
+            _day_prefixes_version = version
+        prefix = _day_prefixes.get(source)
+        if prefix is None:
+            cells = get_backend().daily_totals(date.min, date.max, source)
+            prefix = _day_prefixes[source] = analytics.DayPrefixSums(cells)
+        return prefix
+
+
+_day_cube: Optional["analytics.DayCube"] = None
+_day_cube_version: Optional[tuple] = None
+
+
+def _cube() -> "analytics.DayCube":
+    """
+    Куб дневных итогов архива по источникам и типам велосипеда
+    (analytics.DayCube): строится из дневных итогов, которые хранилище
+    ведёт при каждом изменении архива, один раз на версию данных.
+    """
+    global _day_cube, _day_cube_version
+    with lock:
+        version = data_version()
+        if _day_cube_version != version:
+            cells = get_backend().daily_totals(date.min, date.max, None)
+            _day_cube = analytics.DayCube(cells)
+            _day_cube_version = version
+        return _day_cube
+
+
+def _same_days(year: int, month: int, day: int) -> Tuple[date, date]:
+    """Дни с 1-го по day-е число месяца (не дальше конца месяца)."""
+    last_day = min(day, calendar.monthrange(year, month)[1])
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def compute_month_comparison(
+    source_filter: str = "all", today: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Сравнение текущего месяца (с 1-го числа по today) с теми же днями
+    прошлого месяца (MoM) и того же месяца прошлого года (YoY) по кубу
+    дневных итогов (см. _cube) — без чтения записей архива. Если в
+    сравниваемом месяце меньше дней, берётся месяц целиком.
+
+    Возвращает {"current_name", "previous_name", "last_year_name", "rows"}.
+    Строка — {"repair_type": источник или "all", "isMechanics": тип
+    велосипеда или None (оба), "current"/"previous"/"last_year": (число
+    ремонтов, сумма cost)}: по источникам и типам велосипеда, при
+    source_filter == "all" — ещё итоги по типам, последняя строка — итог.
+    """
+    today = today or datetime.now().date()
+    current = today.year * 12 + today.month - 1
+    months = {"current": current, "previous": current - 1, "last_year": current - 12}
+    ranges = {
+        name: _same_days(month // 12, month % 12 + 1, today.day)
+        for name, month in months.items()
+    }
+    cube = _cube()
+
+    def row(repair_type, sources, mechanics) -> Dict[str, Any]:
+        values = {
+            name: cube.totals(start, end, sources, mechanics)
+            for name, (start, end) in ranges.items()
+        }
+        return {"repair_type": repair_type, "isMechanics": mechanics, **values}
+
+    if source_filter == "all":
+        selected = sorted(cube.sources, key=repr)
+        rows = [
+            row(source, [source], mechanics)
+            for source in selected
+            for mechanics in (True, False)
+        ]
+        rows += [row("all", None, mechanics) for mechanics in (True, False)]
+        rows.append(row("all", None, None))
+    else:
+        rows = [row(source_filter, [source_filter], m) for m in (True, False)]
+        rows.append(row(source_filter, [source_filter], None))
+    # Строки без ремонтов за все три периода не показываем (итог — всегда).
+    *rows, total = rows
+    rows = [r for r in rows if any(r[name][0] for name in ranges)]
+    names = {
+        f"{name}_name": f"{month_title(start.year, start.month)} (1–{end.day})"
+        for name, (start, end) in ranges.items()
+    }
+    return {**names, "rows": rows + [total]}
+
+
+# Кэш готовых отчётов: ключ — (функция, параметры отчёта, дата «сегодня»).
+# Кэш целиком сбрасывается, когда меняется версия данных (data_version),
+# поэтому повторный отчёт без изменений в архиве отдаётся без пересчёта.
+REPORT_CACHE_SIZE = 32
+_report_cache: "OrderedDict[tuple, list]" = OrderedDict()
+_report_cache_version: Optional[tuple] = None
+_report_cache_hits = 0
+_report_cache_misses = 0
+
+
+def _cached_report(
+    compute, period_type: str, num_periods: int, source_filter: str, today
+) -> List[Dict[str, Any]]:
+    global _report_cache_version, _report_cache_hits, _report_cache_misses
+    today = today or datetime.now().date()
+    key = (compute.__name__, period_type, num_periods, source_filter, today)
+    # Отчёт считается под блокировкой: между проверкой версии и подсчётом
+    # данные не изменятся.
+    with lock:
+        version = data_version()
+        if _report_cache_version != version:
+            _report_cache.clear()
+            _report_cache_version = version
+        reports = _report_cache.get(key)
+        if reports is not None:
+            _report_cache_hits += 1
+            _report_cache.move_to_end(key)
+        else:
+            _report_cache_misses += 1
+            reports = compute(period_type, num_periods, source_filter, today)
+            _report_cache[key] = reports
+            if len(_report_cache) > REPORT_CACHE_SIZE:
+                _report_cache.popitem(last=False)
+    # Копии периодов — чтобы изменения у вызывающего не попали в кэш.
+    return [dict(report) for report in reports]
 
 
 def get_reports_data(
-    period_type: str, num_periods: int, source_filter: str = "all"
+    period_type: str,
+    num_periods: int,
+    source_filter: str = "all",
+    today: Optional[date] = None,
 ) -> List[Dict[str, Any]]:
     """
-    Собирает данные для отчетов с учетом фильтрации по источнику.
-    """
-    all_archive_repairs = _load(config.ARCHIVE_PATH)
-
-    # --- НОВЫЙ БЛОК ФИЛЬТРАЦИИ ---
-    if source_filter != "all":
-        filtered_list = []
-        for r in all_archive_repairs:
-            if r.get("repair_type") == source_filter:
-                filtered_list.append(r)
-        all_archive_repairs = filtered_list
-    # --- КОНЕЦ БЛОКА ---
-
-    reports = []
-    today = datetime.now().date()
-
-    if period_type == "week":
-        for i in range(num_periods):
-            # Find the Sunday of the current week
-            current_sunday = today + timedelta(days=6 - today.weekday())
-
-            # For each iteration, subtract 'i' weeks from this current_sunday
-            week_end = current_sunday - timedelta(weeks=i)
-            week_start = week_end - timedelta(days=6)
-
-            period_repairs = []
-            total_cost = 0
-            bike_count = 0
-
-            for repair in all_archive_repairs:
-                archive_date_str = repair.get("archive_date")
-                if archive_date_str:
-                    try:
-                        arch_date = datetime.strptime(
-                            archive_date_str, "%d.%m.%Y"
-                        ).date()
-                    except ValueError:
-                        logger.warning(
-                            "Некорректная дата архивации %r у ремонта ID:%s "
-                            "при формировании недельного отчёта — запись пропущена.",
-                            archive_date_str,
-                            repair.get("id"),
-                        )
-                        continue
-                    if week_start <= arch_date <= week_end:
-                        period_repairs.append(repair)
-                        total_cost += repair.get("cost", 0)
-                        bike_count += 1
-
-            reports.append(
-                {
-                    "period_name": f"с {week_start.day:02d}.{week_start.month:02d} по {week_end.day:02d}.{week_end.month:02d}",
-                    "start_date": week_start.strftime("%d.%m.%Y"),
-                    "end_date": week_end.strftime("%d.%m.%Y"),
-                    "bike_count": bike_count,
-                    "total_cost": total_cost,
-                    "repairs": period_repairs,
-                }
-            )
+    Данные для отчетов (см. compute_reports_data) из кэша: повторный
+    запрос с теми же параметрами в тот же день пересчитывается, только
+    если данные хранилища с тех пор изменились.
+    """
+    return _cached_report(
+        compute_reports_data, period_type, num_periods, source_filter, today
+    )
 
-        reports.reverse()
-
-    elif period_type == "month":
-        for i in range(num_periods):
-            # Calculate the target month and year
-            target_month = today.month - i
-            target_year = today.year
-
-            while target_month <= 0:  # Adjust year if month goes below 1
-                target_month += 12
-                target_year -= 1
-
-            # Get the first day of the target month
-            month_start = date(target_year, target_month, 1)
-            # Get the last day of the target month
-            month_end = date(
-                target_year,
-                target_month,
-                calendar.monthrange(target_year, target_month)[1],
-            )
 
-            period_repairs = []
-            total_cost = 0
-            bike_count = 0
-
-            for repair in all_archive_repairs:
-                archive_date_str = repair.get("archive_date")
-                if archive_date_str:
-                    try:
-                        arch_date = datetime.strptime(
-                            archive_date_str, "%d.%m.%Y"
-                        ).date()
-                    except ValueError:
-                        logger.warning(
-                            "Некорректная дата архивации %r у ремонта ID:%s "
-                            "при формировании месячного отчёта — запись пропущена.",
-                            archive_date_str,
-                            repair.get("id"),
-                        )
-                        continue
-                    if month_start <= arch_date <= month_end:
-                        period_repairs.append(repair)
-                        total_cost += repair.get("cost", 0)
-                        bike_count += 1
-
-            reports.append(
-                {
-                    "period_name": f"{calendar.month_name[target_month].capitalize()} {target_year}",
-                    "start_date": month_start.strftime("%d.%m.%Y"),
-                    "end_date": month_end.strftime("%d.%m.%Y"),
-                    "bike_count": bike_count,
-                    "total_cost": total_cost,
-                    "repairs": period_repairs,
-                }
+def get_report_totals(
+    period_type: str,
+    num_periods: int,
+    source_filter: str = "all",
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """Итоги отчётов (см. compute_report_totals) из того же кэша."""
+    return _cached_report(
+        compute_report_totals, period_type, num_periods, source_filter, today
+    )
+
+
+def report_cache_stats() -> Dict[str, int]:
+    """
+    Счётчики кэша отчётов: попадания, промахи, число отчётов в кэше.
+    Читаются без `lock`: функцию вызывают прямо из хендлеров, а
+    блокировку на время подсчёта отчёта держит поток хранилища — ожидание
+    остановило бы event loop. Чтение целых чисел атомарно, а согласованный
+    между собой набор счётчиков для журнала не нужен.
+    """
+    return {
+        "hits": _report_cache_hits,
+        "misses": _report_cache_misses,
+        "size": len(_report_cache),
+    }
+
+
+# Отчёты по помесячным итогам хранилища (поломки, сроки ремонта).
+MONTHLY_PERIOD_TYPES = ("month", "quarter", "year")
+
+
+def _month_periods(periods: list) -> Dict[str, int]:
+    """'ГГГГ-ММ' каждого месяца периодов отчёта -> индекс периода."""
+    month_period: Dict[str, int] = {}
+    for i, (start, end, _) in enumerate(periods):
+        for month in range(
+            start.year * 12 + start.month - 1, end.year * 12 + end.month
+        ):
+            month_period[f"{month // 12:04d}-{month % 12 + 1:02d}"] = i
+    return month_period
+
+
+def compute_breakdown_stats(
+    period_type: str,
+    num_periods: int,
+    source_filter: str = "all",
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    «Топ поломок» за периоды отчёта (без кэша — см. get_breakdown_stats).
+
+    Считается по счётчикам поломок, которые хранилище ведёт по месяцам
+    архивации, поэтому period_type — 'month', 'quarter' или 'year'.
+    Возвращает поломки по убыванию частоты:
+    {"name", "count", "revenue", "by_period": [(название периода, число),
+    ... от старых к новым], "by_source": {repair_type: число}}.
+    """
+    today = today or datetime.now().date()
+    if period_type not in MONTHLY_PERIOD_TYPES:
+        return []
+    periods = report_periods(period_type, num_periods, today)
+    if not periods:
+        return []
+
+    month_period = _month_periods(periods)
+    source = None if source_filter == "all" else source_filter
+    with lock:
+        cells = get_backend().breakdown_totals(periods[-1][0], periods[0][1], source)
+
+    stats: Dict[str, Dict[str, Any]] = {}
+    for (month, cell_source, name), (count, revenue) in cells.items():
+        i = month_period.get(month)
+        if i is None:
+            continue
+        item = stats.get(name)
+        if item is None:
+            item = stats[name] = {
+                "name": name,
+                "count": 0,
+                "revenue": 0,
+                "by_period": [0] * len(periods),
+                "by_source": {},
+            }
+        item["count"] += count
+        item["revenue"] += revenue
+        item["by_period"][i] += count
+        item["by_source"][cell_source] = item["by_source"].get(cell_source, 0) + count
+
+    items = sorted(
+        stats.values(),
+        key=lambda item: (-item["count"], -item["revenue"], item["name"]),
+    )
+    for item in items:
+        item["by_period"] = [
+            (period_name, count)
+            for (_, _, period_name), count in reversed(
+                list(zip(periods, item["by_period"]))
             )
+        ]
+    return items
 
-        reports.reverse()
 
-    return reports
+def get_breakdown_stats(
+    period_type: str,
+    num_periods: int,
+    source_filter: str = "all",
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """«Топ поломок» (см. compute_breakdown_stats) из кэша отчётов."""
+    return _cached_report(
+        compute_breakdown_stats, period_type, num_periods, source_filter, today
+    )
+
+
+# Квантили сроков ремонта в отчёте: медиана, p90, p99.
+TURNAROUND_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _turnaround_summary(histogram: Dict[int, int], total_days: int) -> Dict[str, Any]:
+    count = sum(histogram.values())
+    median, p90, p99 = analytics.histogram_quantiles(histogram, TURNAROUND_QUANTILES)
+    return {
+        "count": count,
+        "mean": round(total_days / count, 1) if count else None,
+        "median": median,
+        "p90": p90,
+        "p99": p99,
+    }
+
+
+def compute_turnaround_stats(
+    period_type: str,
+    num_periods: int,
+    source_filter: str = "all",
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Сроки ремонта (дней от создания до архивации) за периоды отчёта
+    (без кэша — см. get_turnaround_stats).
+
+    Считается по гистограммам сроков, которые хранилище ведёт по месяцам
+    архивации и источникам: гистограммы периода складываются, и квантили
+    берутся по сумме, без сортировки самих сроков. period_type — 'month',
+    'quarter' или 'year'. Периоды возвращаются от старых к новым:
+    {"period_name", "start_date", "end_date", "count", "mean", "median",
+    "p90", "p99", "by_source": {repair_type: то же без дат и названия}}.
+    """
+    today = today or datetime.now().date()
+    if period_type not in MONTHLY_PERIOD_TYPES:
+        return []
+    periods = report_periods(period_type, num_periods, today)
+    if not periods:
+        return []
+
+    month_period = _month_periods(periods)
+    source = None if source_filter == "all" else source_filter
+    with lock:
+        cells = get_backend().turnaround_totals(periods[-1][0], periods[0][1], source)
+
+    # По периоду: гистограмма {дней: число} и сумма сроков — всего и по
+    # источникам.
+    histograms = [{} for _ in periods]
+    sums = [{} for _ in periods]
+    for (month, cell_source, days), (count, total_days) in cells.items():
+        i = month_period.get(month)
+        if i is None:
+            continue
+        for key in (None, cell_source):
+            histogram = histograms[i].setdefault(key, {})
+            histogram[days] = histogram.get(days, 0) + count
+            sums[i][key] = sums[i].get(key, 0) + total_days
+
+    stats = []
+    for (start, end, period_name), histogram, total in zip(periods, histograms, sums):
+        stats.append(
+            {
+                "period_name": period_name,
+                "start_date": start.strftime("%d.%m.%Y"),
+                "end_date": end.strftime("%d.%m.%Y"),
+                **_turnaround_summary(histogram.get(None, {}), total.get(None, 0)),
+                "by_source": {
+                    key: _turnaround_summary(histogram[key], total[key])
+                    for key in sorted(histogram, key=repr)
+                    if key is not None
+                },
+            }
+        )
+    stats.reverse()
+    return stats
+
+
+def get_turnaround_stats(
+    period_type: str,
+    num_periods: int,
+    source_filter: str = "all",
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """Сроки ремонта (см. compute_turnaround_stats) из кэша отчётов."""
+    return _cached_report(
+        compute_turnaround_stats, period_type, num_periods, source_filter, today
+    )
+
+
+def rebuild_report_totals() -> List[str]:
+    """
+    Пересчитывает с нуля дневные итоги, счётчики поломок и гистограммы
+    сроков ремонта архива и возвращает найденные расхождения с
+    поддерживаемыми (пустой список — всё было верно).
+    """
+    with lock:
+        return get_backend().rebuild_aggregates()
 
 
 def update_archive_repair_field(repair_id: int, field_name: str, new_value) -> bool:
@@ -439,16 +901,20 @@ def update_archive_repair_field(repair_id: int, field_name: str, new_value) -> b
     Обновляет указанное поле у ремонта в АРХИВЕ.
     """
     with lock:
-        archive_repairs = _load(config.ARCHIVE_PATH)
-        updated = False
-        for repair in archive_repairs:
-            if repair.get("id") == repair_id:
-                repair[field_name] = new_value
-                updated = True
-                break
-        if updated:
-            return _save(config.ARCHIVE_PATH, archive_repairs)
-        return False
+        _archive_changed()
+        return get_backend().update_archive(repair_id, field_name, new_value)
+
+
+def delete_archive_older_than(days: int) -> int:
+    """
+    Безвозвратно удаляет из архива ремонты, заархивированные более
+    `days` дней назад. Ремонты без даты архивации или с некорректной
+    датой не трогаются. Возвращает число удалённых записей.
+    """
+    cutoff = (datetime.now() - timedelta(days=days)).date() + timedelta(days=1)
+    with lock:
+        _archive_changed()
+        return get_backend().delete_archive_before(cutoff)
 
 
 def delete_repair_from_archive_by_id(repair_id: int) -> bool:
@@ -457,11 +923,227 @@ def delete_repair_from_archive_by_id(repair_id: int) -> bool:
     Возвращает True, если ремонт найден и удален.
     """
     with lock:
-        archive = _load(config.ARCHIVE_PATH)
-        original_length = len(archive)
+        _archive_changed()
+        return get_backend().delete_archive(repair_id)
+
+
+# --- Асинхронный фасад для хендлеров aiogram ---
+#
+# Синхронные функции выше делают блокирующий файловый ввод-вывод под
+# threading.RLock. Вызванные прямо из хендлера, они останавливают весь
+# event loop: пока один пользователь закрывает ремонт, остальные ждут.
+# Асинхронные обёртки выполняют их в ограниченном пуле потоков, а
+# изменяющие операции дополнительно выстраиваются в очередь на
+# asyncio.Lock — так ожидающие записи не занимают потоки пула и не
+# мешают чтениям.
+
+_executor: Optional[ThreadPoolExecutor] = None
+# Очередь изменяющих операций создаётся при первой записи в работающем
+# event loop: asyncio.Lock, созданный при импорте модуля, оказался бы
+# привязан к другому циклу, если модуль используется из нового
+# (тесты, повторный asyncio.run).
+_write_lock: Optional[asyncio.Lock] = None
+_write_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_write_lock() -> asyncio.Lock:
+    global _write_lock, _write_lock_loop
+    loop = asyncio.get_running_loop()
+    if _write_lock is None or _write_lock_loop is not loop:
+        _write_lock, _write_lock_loop = asyncio.Lock(), loop
+    return _write_lock
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(config, "STORAGE_WORKERS", 4),
+                thread_name_prefix="storage",
+            )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    """Дожидается завершения операций в пуле хранилища и закрывает его."""
+    global _executor
+    with lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def flush() -> bool:
+    """
+    Дописывает на диск изменения, отложенные бэкендом (режим
+    STORAGE_DURABILITY = "batched"). Возвращает False при ошибке записи.
+    """
+    with lock:
+        return get_backend().flush()
+
+
+def shutdown() -> None:
+    """
+    Штатно останавливает хранилище: дожидается операций в пуле,
+    дописывает отложенные изменения и закрывает бэкенд.
+    """
+    shutdown_executor()
+    set_backend(None)
+
+
+async def _run_read(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args))
+
+
+async def arun_read(func, *args):
+    """
+    Выполняет блокирующую функцию, читающую хранилище, в пуле потоков
+    хранилища — для модулей поверх services.storage (services.snapshots).
+    shutdown() дожидается её завершения, прежде чем закрыть бэкенд.
+    """
+    return await _run_read(func, *args)
+
+
+async def _run_write(func, *args):
+    async with _get_write_lock():
+        return await _run_read(func, *args)
+
+
+async def aget_active_repairs() -> list:
+    return await _run_read(get_active_repairs)
+
+
+async def aget_active_repairs_page(
+    page: int, page_size: int, order: str = "date"
+) -> Tuple[list, int, int]:
+    return await _run_read(get_active_repairs_page, page, page_size, order)
+
+
+async def aarchive_version() -> str:
+    return await _run_read(archive_version)
+
+
+async def aget_archive_repairs() -> list:
+    return await _run_read(get_archive_repairs)
+
+
+async def aupdate_archive_repairs(all_repairs: list):
+    return await _run_write(update_archive_repairs, all_repairs)
+
+
+async def aget_active_repair_data_by_id(repair_id: int) -> Optional[dict]:
+    return await _run_read(get_active_repair_data_by_id, repair_id)
+
+
+async def acreate_repair(repair_dict: dict) -> int:
+    return await _run_write(create_repair, repair_dict)
+
+
+async def acreate_archived_repair(repair_dict: dict) -> int:
+    return await _run_write(create_archived_repair, repair_dict)
+
+
+async def aarchive_repair_by_id(rid: int) -> bool:
+    return await _run_write(archive_repair_by_id, rid)
+
+
+async def aupdate_repair_field(repair_id: int, field_name: str, new_value) -> bool:
+    return await _run_write(update_repair_field, repair_id, field_name, new_value)
+
+
+async def aget_archive_range(
+    start: date, end: date, source: Optional[str] = None
+) -> list:
+    return await _run_read(get_archive_range, start, end, source)
+
+
+async def aget_archived_repairs_last_two_months(source_filter: str = "all") -> list:
+    return await _run_read(get_archived_repairs_last_two_months, source_filter)
+
+
+async def aget_archived_repair_ids_range(
+    start: date, end: date, source_filter: str = "all"
+) -> List[int]:
+    return await _run_read(get_archived_repair_ids_range, start, end, source_filter)
+
+
+async def aget_archive_months(
+    source_filter: str = "all",
+) -> List[Tuple[int, int, int]]:
+    return await _run_read(get_archive_months, source_filter)
+
+
+async def aget_archive_repair_by_id(repair_id: int) -> Optional[dict]:
+    return await _run_read(get_archive_repair_by_id, repair_id)
+
+
+async def aget_archive_repairs_by_ids(repair_ids: List[int]) -> List[dict]:
+    return await _run_read(get_archive_repairs_by_ids, repair_ids)
+
+
+async def arestore_repair_by_id(repair_id: int) -> bool:
+    return await _run_write(restore_repair_by_id, repair_id)
+
+
+async def aget_reports_data(
+    period_type: str, num_periods: int, source_filter: str = "all"
+) -> List[Dict[str, Any]]:
+    return await _run_read(get_reports_data, period_type, num_periods, source_filter)
+
+
+async def aget_columnar_report(
+    period_type: str, num_periods: int, source_filter: str = "all"
+) -> Optional[List[Dict[str, Any]]]:
+    return await _run_read(
+        get_columnar_report, period_type, num_periods, source_filter
+    )
+
+
+async def aget_report_totals(
+    period_type: str, num_periods: int, source_filter: str = "all"
+) -> List[Dict[str, Any]]:
+    return await _run_read(get_report_totals, period_type, num_periods, source_filter)
+
+
+async def aget_range_totals(
+    start: date, end: date, source_filter: str = "all"
+) -> Dict[str, Any]:
+    return await _run_read(get_range_totals, start, end, source_filter)
+
+
+async def aget_breakdown_stats(
+    period_type: str, num_periods: int, source_filter: str = "all"
+) -> List[Dict[str, Any]]:
+    return await _run_read(
+        get_breakdown_stats, period_type, num_periods, source_filter
+    )
+
+
+async def aget_turnaround_stats(
+    period_type: str, num_periods: int, source_filter: str = "all"
+) -> List[Dict[str, Any]]:
+    return await _run_read(
+        get_turnaround_stats, period_type, num_periods, source_filter
+    )
+
+
+async def aget_month_comparison(source_filter: str = "all") -> Dict[str, Any]:
+    return await _run_read(compute_month_comparison, source_filter)
+
+
+async def aupdate_archive_repair_field(
+    repair_id: int, field_name: str, new_value
+) -> bool:
+    return await _run_write(
+        update_archive_repair_field, repair_id, field_name, new_value
+    )
+
+
+async def adelete_repair_from_archive_by_id(repair_id: int) -> bool:
+    return await _run_write(delete_repair_from_archive_by_id, repair_id)
 
-        archive_filtered = [r for r in archive if r.get("id") != repair_id]
 
-        if len(archive_filtered) < original_length:
-            return _save(config.ARCHIVE_PATH, archive_filtered)
-        return False
+async def adelete_archive_older_than(days: int) -> int:
+    return await _run_write(delete_archive_older_than, days)
@@ -0,0 +1,37 @@
+"""
+Общие настройки тестов: корень проекта в sys.path и модуль config.
+
+config.py не хранится в репозитории; если его нет, тесты используют
+config.example.py — пути к данным в нём тестами не затрагиваются
+(хранилище в тестах создаётся во временном каталоге).
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+try:
+    import config  # noqa: F401
+except ImportError:
+    spec = importlib.util.spec_from_file_location("config", ROOT / "config.example.py")
+    config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(config)
+    sys.modules["config"] = config
+
+
+@pytest.fixture
+def json_storage(tmp_path):
+    """services.storage поверх JSON-хранилища во временном каталоге."""
+    import services.storage as storage
+    from services.backends.json_backend import JsonBackend
+
+    storage.set_backend(
+        JsonBackend(tmp_path / "active_repairs.json", tmp_path / "archive_repairs.json")
+    )
+    yield storage
+    storage.shutdown()
@@ -0,0 +1,187 @@
+"""
+Индексы JSON-хранилища (хеш-индексы ID, индексы дат партиций архива,
+порядки активных ремонтов) остаются согласованными с записями после
+случайных последовательностей create/archive/restore/delete/update и после
+повторной загрузки с диска.
+"""
+
+import random
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from services.backends.base import ACTIVE_ORDERS, active_sort_key
+from services.backends import json_backend
+from services.backends.json_backend import JsonBackend
+
+SOURCES = ("familiar", "avito", "scooter", None)
+
+
+def make_backend(tmp_path, **kwargs) -> JsonBackend:
+    return JsonBackend(
+        tmp_path / "active_repairs.json",
+        tmp_path / "archive_repairs.json",
+        **kwargs,
+    )
+
+
+def random_date(rng: random.Random) -> str:
+    day = date(2025, 1, 1) + timedelta(days=rng.randint(0, 540))
+    if rng.random() < 0.05:
+        return rng.choice(["", "31.02.2025", "не дата"])
+    return day.strftime("%d.%m.%Y")
+
+
+def random_repair(rng: random.Random, repair_id: int) -> dict:
+    return {
+        "id": repair_id,
+        "FIO": f"Клиент {repair_id}",
+        "repair_type": rng.choice(SOURCES),
+        "isMechanics": rng.random() < 0.5,
+        "breakdowns": rng.sample(["Цепь 500", "Колесо 800", "Тормоза"], 2),
+        "cost": rng.randint(0, 5000),
+        "date": random_date(rng),
+    }
+
+
+def run_operations(backend: JsonBackend, rng: random.Random, count: int) -> None:
+    active, archive = [], []
+    for _ in range(count):
+        op = rng.random()
+        if op < 0.3 or not (active or archive):
+            repair = random_repair(rng, backend.allocate_id())
+            if rng.random() < 0.2:
+                repair["archive_date"] = random_date(rng)
+                assert backend.insert_archive(repair)
+                archive.append(repair["id"])
+            else:
+                assert backend.insert_active(repair)
+                active.append(repair["id"])
+        elif op < 0.5 and active:
+            repair_id = active.pop(rng.randrange(len(active)))
+            assert backend.move_to_archive(repair_id, random_date(rng))
+            archive.append(repair_id)
+        elif op < 0.6 and archive:
+            repair_id = archive.pop(rng.randrange(len(archive)))
+            assert backend.move_to_active(repair_id)
+            active.append(repair_id)
+        elif op < 0.7 and archive:
+            repair_id = archive.pop(rng.randrange(len(archive)))
+            assert backend.delete_archive(repair_id)
+        elif op < 0.85 and active:
+            repair_id = rng.choice(active)
+            field, value = rng.choice(
+                [
+                    ("cost", rng.randint(0, 5000)),
+                    ("date", random_date(rng)),
+                    ("repair_type", rng.choice(SOURCES)),
+                ]
+            )
+            assert backend.update_active(repair_id, field, value)
+        elif archive:
+            repair_id = rng.choice(archive)
+            field, value = rng.choice(
+                [
+                    ("archive_date", random_date(rng)),
+                    ("cost", rng.randint(0, 5000)),
+                    ("repair_type", rng.choice(SOURCES)),
+                ]
+            )
+            assert backend.update_archive(repair_id, field, value)
+
+
+def snapshot(backend: JsonBackend) -> tuple:
+    by_id = lambda records: sorted(records, key=lambda r: r["id"])  # noqa: E731
+    return by_id(backend.list_active()), by_id(backend.list_archive())
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("compact_bytes", [512 * 1024, 2048])
+def test_indexes_consistent_after_random_operations(tmp_path, seed, compact_bytes):
+    rng = random.Random(seed)
+    backend = make_backend(tmp_path, compact_bytes=compact_bytes)
+    run_operations(backend, rng, 300)
+    assert backend.check_index_consistency() == []
+    expected = snapshot(backend)
+    backend.close()
+
+    reloaded = make_backend(tmp_path, compact_bytes=compact_bytes)
+    assert reloaded.check_index_consistency() == []
+    assert snapshot(reloaded) == expected
+    reloaded.close()
+
+
+def test_indexes_consistent_after_compaction(tmp_path):
+    rng = random.Random(42)
+    backend = make_backend(tmp_path)
+    run_operations(backend, rng, 200)
+    assert backend.compact()
+    assert backend.check_index_consistency() == []
+    run_operations(backend, rng, 100)
+    assert backend.check_index_consistency() == []
+    expected = snapshot(backend)
+    backend.close()
+
+    reloaded = make_backend(tmp_path)
+    assert reloaded.check_index_consistency() == []
+    assert snapshot(reloaded) == expected
+    reloaded.close()
+
+
+def assert_pages_sorted(backend: JsonBackend) -> None:
+    for order in ACTIVE_ORDERS:
+        expected = sorted(backend.list_active(), key=active_sort_key(order))
+        for offset, limit in [(0, 10), (7, 5), (len(expected) - 3, 10)]:
+            page = backend.list_active_page(max(offset, 0), limit, order)
+            assert page == expected[max(offset, 0) : max(offset, 0) + limit]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_active_pages_follow_sort_key(tmp_path, seed):
+    backend = make_backend(tmp_path)
+    run_operations(backend, random.Random(seed), 300)
+    assert_pages_sorted(backend)
+    backend.close()
+
+    reloaded = make_backend(tmp_path)
+    assert_pages_sorted(reloaded)
+    reloaded.close()
+
+
+def test_sync_compaction_waits_for_background(tmp_path, monkeypatch):
+    rng = random.Random(7)
+    backend = make_backend(tmp_path)
+    repairs = [random_repair(rng, repair_id) for repair_id in range(1, 21)]
+    for repair in repairs:
+        assert backend.insert_active(repair)
+
+    # Фоновое сворачивание задерживается на записи снимков, а в это время
+    # идёт синхронное (полная замена активных).
+    started, release = threading.Event(), threading.Event()
+    write_json = json_backend._write_json
+
+    def slow_write_json(path, data, fsync=False):
+        if threading.current_thread().name == "journal-compaction":
+            started.set()
+            release.wait(5)
+        return write_json(path, data, fsync=fsync)
+
+    monkeypatch.setattr(json_backend, "_write_json", slow_write_json)
+    backend.compact_bytes = 0
+    backend._maybe_compact()
+    assert started.wait(5)
+    backend.compact_bytes = json_backend.DEFAULT_COMPACT_BYTES
+    threading.Timer(0.2, release.set).start()
+
+    assert backend.replace_active(repairs[:10])
+    for repair_id in range(100, 105):
+        assert backend.insert_active(random_repair(rng, repair_id))
+    expected = snapshot(backend)
+    backend.close()
+
+    reloaded = make_backend(tmp_path)
+    assert snapshot(reloaded) == expected
+    assert len(expected[0]) == 15
+    assert reloaded.check_index_consistency() == []
+    reloaded.close()
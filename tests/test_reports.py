@@ -0,0 +1,143 @@
+"""
+Ядро агрегации отчётов (services.reports) на случайных данных: раскладка
+ремонтов по периодам за один проход сверяется с наивной реализацией
+(отдельный проход по всему архиву для каждого периода) для всех типов
+периодов, случайных дат «сегодня» и архивов с пустыми, некорректными и
+выходящими за окно отчёта датами. Так же сверяются итоги колоночного
+представления архива (services.analytics, если установлен NumPy).
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from services import analytics
+from services.reports import (
+    PERIOD_TYPES,
+    bucket_repairs,
+    get_monthly_totals,
+    get_weekly_totals,
+    report_periods,
+)
+
+ARCHIVE_DATES = ("", None, "31.02.2024", "не дата")
+SOURCES = ("familiar", "avito", "scooter", None)
+SEEDS = range(20)
+# Колоночные итоги сверяются по всем источникам — хватает меньшего числа seed.
+COLUMNAR_SEEDS = range(5)
+CASES_PER_SEED = 50
+
+
+def naive_buckets(records, periods):
+    """Эталон: полный проход по архиву для каждого периода."""
+    days = []
+    for repair in records:
+        try:
+            days.append(datetime.strptime(repair["archive_date"], "%d.%m.%Y").date())
+        except (KeyError, TypeError, ValueError):
+            days.append(None)
+    buckets, totals = [], []
+    for start, end, _ in periods:
+        bucket = [
+            repair
+            for repair, day in zip(records, days)
+            if day is not None and start <= day <= end
+        ]
+        buckets.append(bucket)
+        totals.append(sum(r.get("cost", 0) for r in bucket))
+    return buckets, totals
+
+
+def random_archive(rng: random.Random, today: date) -> list:
+    records = []
+    for i in range(rng.randint(0, 200)):
+        repair = {"id": i, "cost": rng.randint(0, 5000)}
+        if rng.random() < 0.1:
+            archive_date = rng.choice(ARCHIVE_DATES)
+            if archive_date is not None:
+                repair["archive_date"] = archive_date
+        else:
+            day = today + timedelta(days=rng.randint(-1500, 30))
+            repair["archive_date"] = day.strftime("%d.%m.%Y")
+            if rng.random() < 0.5:
+                # Как записи из хранилища — с готовым номером дня.
+                repair["archive_date_ord"] = day.toordinal()
+        records.append(repair)
+    return records
+
+
+def random_cases(seed: int):
+    rng = random.Random(seed)
+    for _ in range(CASES_PER_SEED):
+        today = date(2020, 1, 1) + timedelta(days=rng.randint(0, 3650))
+        yield rng, today, random_archive(rng, today)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_bucket_repairs_matches_naive(seed):
+    for rng, today, records in random_cases(seed):
+        period_type = rng.choice(PERIOD_TYPES)
+        periods = report_periods(period_type, rng.randint(1, 40), today)
+        actual = bucket_repairs(records, period_type, periods, today)
+        assert actual == naive_buckets(records, periods), (period_type, today)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_weekly_and_monthly_totals_match_naive(seed):
+    for _, today, records in random_cases(seed):
+        weeks = report_periods("week", 4, today)
+        expected_weekly = [
+            ((start, end), total)
+            for (start, end, _), total in zip(weeks, naive_buckets(records, weeks)[1])
+        ][::-1]
+        assert get_weekly_totals(records, today) == expected_weekly, today
+
+        months = report_periods("month", 12, today)
+        expected_monthly = [
+            ((start.year, start.month), total)
+            for (start, _, _), total in zip(months, naive_buckets(records, months)[1])
+        ][::-1]
+        assert get_monthly_totals(records, today) == expected_monthly, today
+
+
+def test_unknown_period_type_has_no_periods():
+    assert report_periods("decade", 3, date(2025, 3, 1)) == []
+    assert bucket_repairs([{"archive_date": "01.03.2025"}], "decade", [], None) == (
+        [],
+        [],
+    )
+
+
+@pytest.mark.parametrize("seed", COLUMNAR_SEEDS)
+def test_columnar_totals_match_naive(seed):
+    pytest.importorskip("numpy")
+    for rng, today, records in random_cases(seed):
+        for repair in records:
+            repair["repair_type"] = rng.choice(SOURCES)
+        columns = analytics.ColumnarArchive(records)
+        assert columns.exact
+        period_type = rng.choice(PERIOD_TYPES)
+        periods = report_periods(period_type, rng.randint(1, 40), today)
+        bounds = [(start, end) for start, end, _ in periods]
+        for source in ("all", *SOURCES, "нет такого"):
+            selected = [
+                r for r in records if source == "all" or r["repair_type"] == source
+            ]
+            buckets, totals = naive_buckets(selected, periods)
+            expected = ([len(bucket) for bucket in buckets], totals)
+            assert columns.period_totals(bounds, source) == expected, (
+                period_type,
+                today,
+                source,
+            )
+
+
+def test_columnar_is_inexact_with_fractional_costs():
+    pytest.importorskip("numpy")
+    records = [
+        {"id": 1, "archive_date": "01.03.2025", "cost": 100},
+        {"id": 2, "archive_date": "02.03.2025", "cost": 99.5},
+    ]
+    assert not analytics.ColumnarArchive(records).exact
+    assert analytics.ColumnarArchive(records[:1]).exact
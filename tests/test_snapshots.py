@@ -0,0 +1,107 @@
+"""
+Снимок отчётов по умолчанию устаревает при изменениях архива (в том числе
+извне), но не при правках активных ремонтов; остановка хранилища
+дожидается идущего пересчёта.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import date
+
+import pytest
+
+import config
+from services import snapshots
+from test_storage import append_to_journal, external_archived_repair, new_repair
+
+TODAY = date(2025, 3, 20)
+
+
+@pytest.fixture
+def snapshot_storage(json_storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        config, "REPORT_SNAPSHOT_PATH", tmp_path / "report_snapshot.json", raising=False
+    )
+    monkeypatch.setattr(snapshots, "_current", None)
+    return json_storage
+
+
+def march_total() -> int:
+    reports = snapshots.get_report("month", 12, "all", today=TODAY)
+    return reports[-1]["total_cost"] if reports is not None else None
+
+
+def test_snapshot_goes_stale_after_external_edit(snapshot_storage):
+    snapshot_storage.create_archived_repair(new_repair(archive_date="10.03.2025"))
+    assert snapshots.refresh(TODAY)
+    assert snapshots.is_fresh(TODAY)
+    assert march_total() == 500
+
+    append_to_journal(
+        snapshot_storage, external_archived_repair(1000, "12.03.2025", 700)
+    )
+
+    assert not snapshots.is_fresh(TODAY)
+    assert march_total() is None
+    assert snapshots.refresh(TODAY)
+    assert march_total() == 1200
+
+
+def test_snapshot_restored_only_for_same_data(snapshot_storage):
+    snapshot_storage.create_archived_repair(new_repair(archive_date="10.03.2025"))
+    assert snapshots.refresh(TODAY)
+    snapshots._current = None
+    assert snapshots.restore(TODAY)
+    assert march_total() == 500
+
+    snapshots._current = None
+    append_to_journal(
+        snapshot_storage, external_archived_repair(1000, "12.03.2025", 700)
+    )
+    assert not snapshots.restore(TODAY)
+
+
+def test_snapshot_survives_active_edits(snapshot_storage):
+    snapshot_storage.create_archived_repair(new_repair(archive_date="10.03.2025"))
+    repair_id = snapshot_storage.create_repair(new_repair())
+    assert snapshots.refresh(TODAY)
+
+    snapshot_storage.update_repair_field(repair_id, "notes", "позвонить")
+    snapshot_storage.create_repair(new_repair())
+    assert snapshots.is_fresh(TODAY)
+    assert march_total() == 500
+
+    snapshot_storage.archive_repair_by_id(repair_id)
+    assert not snapshots.is_fresh(TODAY)
+
+
+def test_shutdown_waits_for_running_refresh(snapshot_storage, monkeypatch):
+    started, finished, created = threading.Event(), [], []
+    build_snapshot = snapshots.build_snapshot
+
+    def slow_build(today=None):
+        started.set()
+        time.sleep(0.3)
+        result = build_snapshot(TODAY)
+        finished.append(True)
+        return result
+
+    monkeypatch.setattr(snapshots, "build_snapshot", slow_build)
+    # Пересчёт после закрытия хранилища создал бы бэкенд заново.
+    monkeypatch.setattr(
+        snapshot_storage, "create_backend", lambda: created.append(True)
+    )
+
+    async def start_and_cancel():
+        task = asyncio.create_task(snapshots.run_refresher(debounce=0))
+        assert await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(start_and_cancel())
+    snapshot_storage.shutdown()
+    assert finished and not created
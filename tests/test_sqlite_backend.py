@@ -0,0 +1,61 @@
+"""
+Итоги SQLite-хранилища (дневные итоги, счётчики поломок, гистограммы
+сроков) совпадают с пересчётом по записям после случайных операций, а
+архив можно менять из другого соединения.
+"""
+
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from services.backends.sqlite_backend import SqliteBackend
+from test_json_backend import random_repair, run_operations
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SqliteBackend(tmp_path / "repairs.db")
+    yield backend
+    backend.close()
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_aggregates_match_records_after_random_operations(backend, seed):
+    rng = random.Random(seed)
+    run_operations(backend, rng, 300)
+    cutoff = date(2025, 1, 1) + timedelta(days=rng.randint(100, 400))
+    assert backend.delete_archive_before(cutoff) > 0
+    run_operations(backend, rng, 100)
+    assert backend.rebuild_aggregates() == []
+
+
+def test_aggregates_match_records_after_replace(backend):
+    rng = random.Random(11)
+    run_operations(backend, rng, 200)
+    archive = backend.list_archive()
+    active = backend.list_active()
+    # Активные записи с ID архивных замещают их строки.
+    assert backend.replace_active(active + archive[:5])
+    assert backend.rebuild_aggregates() == []
+    assert backend.replace_archive(archive[5:] + [random_repair(rng, 10_000)])
+    assert backend.rebuild_aggregates() == []
+
+
+def test_archive_writable_from_another_connection(backend, tmp_path):
+    rng = random.Random(5)
+    repair = random_repair(rng, 1)
+    repair.update(archive_date="10.03.2025", breakdowns=["Цепь 500"])
+    assert backend.insert_archive(repair)
+
+    other = sqlite3.connect(str(tmp_path / "repairs.db"))
+    with other:
+        other.execute("UPDATE repairs SET repair_type = 'avito' WHERE id = 1")
+        other.execute("DELETE FROM repairs WHERE id = 1")
+    other.close()
+
+    assert backend.get_archive(1) is None
+    # Счётчики поломок ведёт бэкенд: после правки извне их пересчитывают.
+    assert backend.rebuild_breakdown_totals()
+    assert backend.rebuild_aggregates() == []
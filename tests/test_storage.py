@@ -0,0 +1,197 @@
+"""Публичное API services.storage поверх временного JSON-хранилища."""
+
+import asyncio
+import json
+import random
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+
+def new_repair(**fields) -> dict:
+    repair = {
+        "FIO": "Иванов Иван",
+        "repair_type": "avito",
+        "isMechanics": True,
+        "breakdowns": ["Цепь 500"],
+        "cost": 500,
+        "date": "01.03.2025",
+    }
+    repair.update(fields)
+    return repair
+
+
+def test_async_writes_from_several_event_loops(json_storage):
+    async def create_many():
+        return await asyncio.gather(
+            *(json_storage.acreate_repair(new_repair()) for _ in range(5))
+        )
+
+    # Каждый asyncio.run — новый event loop; очередь записей не должна
+    # остаться привязанной к первому из них.
+    first = asyncio.run(create_many())
+    second = asyncio.run(create_many())
+    assert len(set(first + second)) == 10
+    assert len(json_storage.get_active_repairs()) == 10
+
+
+def append_to_journal(storage, op: dict) -> None:
+    """Дописывает операцию в журнал JSON-хранилища в обход storage."""
+    with storage.get_backend().journal_path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(op, ensure_ascii=False) + "\n")
+
+
+def external_archived_repair(repair_id: int, archive_date: str, cost: int) -> dict:
+    return {
+        "op": "create",
+        "table": "archive",
+        "record": new_repair(id=repair_id, archive_date=archive_date, cost=cost),
+    }
+
+
+def test_report_cache_sees_external_edit(json_storage):
+    today = date(2025, 3, 20)
+    json_storage.create_archived_repair(new_repair(archive_date="10.03.2025"))
+    before = json_storage.data_version()
+    [march] = json_storage.get_reports_data("month", 1, today=today)
+    assert march["total_cost"] == 500
+
+    append_to_journal(json_storage, external_archived_repair(1000, "12.03.2025", 700))
+
+    assert json_storage.data_version() != before
+    [march] = json_storage.get_reports_data("month", 1, today=today)
+    assert (march["bike_count"], march["total_cost"]) == (2, 1200)
+
+
+def test_day_totals_see_external_edit(json_storage):
+    today = date(2025, 3, 20)
+    json_storage.create_archived_repair(new_repair(archive_date="10.03.2025"))
+    [march] = json_storage.get_report_totals("month", 1, today=today)
+    assert march["total_cost"] == 500
+    week = json_storage.get_range_totals(date(2025, 3, 9), date(2025, 3, 15))
+    assert week["total_cost"] == 500
+
+    append_to_journal(json_storage, external_archived_repair(1000, "12.03.2025", 700))
+
+    [march] = json_storage.get_report_totals("month", 1, today=today)
+    assert (march["bike_count"], march["total_cost"]) == (2, 1200)
+    [day] = json_storage.compute_report_totals("day", 1, today=date(2025, 3, 12))
+    assert day["total_cost"] == 700
+    week = json_storage.get_range_totals(date(2025, 3, 9), date(2025, 3, 15))
+    assert week["total_cost"] == 1200
+
+
+def test_month_comparison_uses_same_day_range(json_storage):
+    for archive_date, cost in [
+        ("02.03.2025", 500),
+        ("02.02.2025", 200),
+        ("15.02.2025", 300),
+        ("02.03.2024", 100),
+        ("20.03.2024", 999),
+    ]:
+        json_storage.create_archived_repair(
+            new_repair(archive_date=archive_date, cost=cost)
+        )
+    comparison = json_storage.compute_month_comparison(today=date(2025, 3, 3))
+    total = comparison["rows"][-1]
+    assert (total["current"], total["previous"], total["last_year"]) == (
+        (1, 500),
+        (1, 200),
+        (1, 100),
+    )
+
+    # В феврале меньше дней, чем в марте: 31-е сравнивается с целым февралём.
+    comparison = json_storage.compute_month_comparison(today=date(2025, 3, 31))
+    assert comparison["rows"][-1]["previous"] == (2, 500)
+
+    append_to_journal(json_storage, external_archived_repair(1000, "01.03.2025", 50))
+    comparison = json_storage.compute_month_comparison(today=date(2025, 3, 3))
+    assert comparison["rows"][-1]["current"] == (2, 550)
+
+
+def test_archive_version_tracks_only_archive(json_storage, monkeypatch):
+    repair_id = json_storage.create_repair(new_repair())
+    version = json_storage.archive_version()
+    assert json.loads(json.dumps(version)) == version
+
+    json_storage.update_repair_field(repair_id, "cost", 900)
+    json_storage.create_repair(new_repair())
+    assert json_storage.archive_version() == version
+
+    json_storage.archive_repair_by_id(repair_id)
+    archived = json_storage.archive_version()
+    assert archived != version
+
+    append_to_journal(json_storage, external_archived_repair(1000, "12.03.2025", 700))
+    assert json_storage.archive_version() != archived
+
+    # После перезапуска счётчик начинается заново, но токен процесса другой.
+    restarted = json_storage.archive_version()
+    monkeypatch.setattr(json_storage, "_PROCESS_TOKEN", "другой процесс")
+    assert json_storage.archive_version() != restarted
+
+
+def test_columnar_report_matches_loop(json_storage, monkeypatch):
+    pytest.importorskip("numpy")
+    import config
+
+    rng = random.Random(3)
+    for _ in range(300):
+        day = date(2024, 1, 1) + timedelta(days=rng.randint(0, 500))
+        json_storage.create_archived_repair(
+            new_repair(
+                repair_type=rng.choice(["familiar", "avito", "scooter"]),
+                cost=rng.randint(0, 5000),
+                archive_date=day.strftime("%d.%m.%Y"),
+            )
+        )
+    today = date(2025, 5, 20)
+
+    monkeypatch.setattr(config, "REPORTS_NUMPY_THRESHOLD", 300, raising=False)
+    assert json_storage.get_columnar_report("month", 12, today=today) is None
+
+    monkeypatch.setattr(config, "REPORTS_NUMPY_THRESHOLD", 0)
+    for period_type, num_periods in [("week", 4), ("month", 12), ("quarter", 8)]:
+        for source in ("all", "avito", "нет такого"):
+            expected = [
+                {k: v for k, v in report.items() if k != "repairs"}
+                for report in json_storage.compute_reports_data(
+                    period_type, num_periods, source, today=today
+                )
+            ]
+            actual = json_storage.get_columnar_report(
+                period_type, num_periods, source, today=today
+            )
+            assert actual == expected, (period_type, source)
+
+    # Колонки перестраиваются после изменения архива.
+    json_storage.create_archived_repair(new_repair(archive_date="20.05.2025"))
+    [*_, may] = json_storage.get_columnar_report("month", 12, today=today)
+    assert may["total_cost"] == json_storage.get_report_totals(
+        "month", 1, today=today
+    )[0]["total_cost"]
+
+
+def test_report_cache_stats_do_not_wait_for_lock(json_storage):
+    held, release, done = threading.Event(), threading.Event(), threading.Event()
+
+    def hold_lock():
+        # Так держит блокировку поток хранилища, пока считает отчёт.
+        with json_storage.lock:
+            held.set()
+            release.wait(5)
+
+    def read_stats():
+        json_storage.report_cache_stats()
+        done.set()
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    try:
+        assert held.wait(5)
+        threading.Thread(target=read_stats, daemon=True).start()
+        assert done.wait(1)
+    finally:
+        release.set()
+        holder.join()
@@ -125,6 +125,21 @@ def format_archived_repair_details(repair: Dict[str, Any]) -> str:
     return message_text
 
 
+def format_archived_repair_line(repair: Dict[str, Any], number: int) -> str:
+    """
+    Краткая строка архивного ремонта для списка архива:
+    '12. Иванов И.И. — Trek · 05.03.2025 · 1500 руб.'
+    """
+    fio = format_name(repair.get("FIO", "Без имени"))
+    namebike = (repair.get("namebike") or "").strip()
+    title = f"{fio} — {namebike}" if namebike and namebike != "-" else fio
+    archive_date = repair.get("archive_date") or "—"
+    return (
+        f"<b>{number}.</b> {title} · <code>{archive_date}</code>"
+        f" · {repair.get('cost', 0)} руб."
+    )
+
+
 def format_name(full_name: str) -> str:
     """Сокращает ФИО в формат 'Фамилия И.О.'"""
     # parts = full_name.split()
@@ -10,8 +10,11 @@ from utils.formatter import (
 from services import (
     storage,
 )
+from services.reports import month_title
 from config import ELECTRIC_BIKE_BREAKDOWNS_PATH, REPAIR_SOURCES
 
+import calendar
+from datetime import date
 from re import search
 
 def main_reply_kb() -> ReplyKeyboardMarkup:
@@ -76,24 +79,21 @@ def source_filter_inline_kb(prefix: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+def _active_repair_button(r: dict) -> InlineKeyboardButton:
+    fio = format_name(r.get("FIO", "Без имени"))
+    namebike = (r.get("namebike") or "").strip()
+    # К ФИО добавляем название велосипеда, чтобы ремонты было легче
+    # различать в списке (например: "Иванов — Trek Fuel EX").
+    button_text = f"{fio} — {namebike}" if namebike and namebike != "-" else fio
+    return InlineKeyboardButton(
+        text=button_text, callback_data=f"show_active_repair_details:{r.get('id')}"
+    )
+
+
 def active_repairs_inline(active_list: list = []) -> InlineKeyboardMarkup:
-    keyboard = []
-    for r in active_list:
-        fio = format_name(r.get("FIO", "Без имени"))
-        namebike = (r.get("namebike") or "").strip()
-        # К ФИО добавляем название велосипеда, чтобы ремонты было легче
-        # различать в списке (например: "Иванов — Trek Fuel EX").
-        button_text = f"{fio} — {namebike}" if namebike and namebike != "-" else fio
-        rid = r.get("id")
-        if rid is not None:
-            keyboard.append(
-                [
-                    InlineKeyboardButton(
-                        text=button_text,
-                        callback_data=f"show_active_repair_details:{rid}",
-                    )
-                ]
-            )
+    keyboard = [
+        [_active_repair_button(r)] for r in active_list if r.get("id") is not None
+    ]
     if active_list:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
@@ -107,6 +107,62 @@ def active_repairs_inline(active_list: list = []) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+# Сколько номеров страниц показывать в строке навигации.
+PAGE_NUMBERS = 5
+
+ACTIVE_ORDER_NAMES = {"date": "по дате", "id": "по ID"}
+
+
+def page_numbers_row(page: int, total_pages: int, callback) -> list:
+    """
+    Строка навигации: ⬅️, номера страниц вокруг текущей (не больше
+    PAGE_NUMBERS), ➡️. callback(номер страницы) — callback_data кнопки;
+    текущая страница отмечена и ничего не делает.
+    """
+    first = min(max(page - PAGE_NUMBERS // 2, 0), max(total_pages - PAGE_NUMBERS, 0))
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton(text="⬅️", callback_data=callback(page - 1)))
+    for number in range(first, min(first + PAGE_NUMBERS, total_pages)):
+        if number == page:
+            row.append(
+                InlineKeyboardButton(text=f"· {number + 1} ·", callback_data="ignore")
+            )
+        else:
+            row.append(
+                InlineKeyboardButton(
+                    text=str(number + 1), callback_data=callback(number)
+                )
+            )
+    if page < total_pages - 1:
+        row.append(InlineKeyboardButton(text="➡️", callback_data=callback(page + 1)))
+    return row
+
+
+def active_repairs_page_inline(
+    repairs: list, page: int, total_pages: int, order: str
+) -> InlineKeyboardMarkup:
+    """
+    Страница списка действующих ремонтов: кнопки ремонтов, навигация по
+    страницам (active_page:<порядок>:<страница>) и смена сортировки.
+    """
+    keyboard = [[_active_repair_button(r)] for r in repairs if r.get("id") is not None]
+    if total_pages > 1:
+        keyboard.append(
+            page_numbers_row(page, total_pages, lambda n: f"active_page:{order}:{n}")
+        )
+    other = "id" if order == "date" else "date"
+    keyboard.append(
+        [
+            InlineKeyboardButton(
+                text=f"🔃 Сортировать {ACTIVE_ORDER_NAMES[other]}",
+                callback_data=f"active_page:{other}:0",
+            )
+        ]
+    )
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
 def detail_repair_inline(repair_id: str | int) -> InlineKeyboardMarkup:
     str_repair_id = str(repair_id)
     keyboard = [
@@ -275,7 +331,35 @@ def report_options_inline_kb() -> InlineKeyboardMarkup:
         [
             InlineKeyboardButton(text="По неделям", callback_data="report_type:week"),
             InlineKeyboardButton(text="По месяцям", callback_data="report_type:month"),
-        ]
+        ],
+        [
+            InlineKeyboardButton(
+                text="По дням месяца", callback_data="report_type:day"
+            ),
+            InlineKeyboardButton(
+                text="По кварталам", callback_data="report_type:quarter"
+            ),
+        ],
+        [
+            InlineKeyboardButton(text="По годам", callback_data="report_type:year"),
+            InlineKeyboardButton(
+                text="Свой период", callback_data="report_type:range"
+            ),
+        ],
+        [
+            InlineKeyboardButton(
+                text="Топ поломок", callback_data="report_type:breakdowns"
+            ),
+            InlineKeyboardButton(
+                text="Сроки ремонта", callback_data="report_type:turnaround"
+            ),
+        ],
+        [
+            InlineKeyboardButton(
+                text="Сравнение с прошлым месяцем и годом",
+                callback_data="report_type:compare",
+            ),
+        ],
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
@@ -298,7 +382,7 @@ def confirm_total_cost_kb(suggested_cost: int) -> InlineKeyboardMarkup:
 
 
 def archive_pagination_kb(
-    page: int, total_pages: int, repair_id: int
+    page: int, total_pages: int, repair_id: int, list_page: int | None = None
 ) -> InlineKeyboardMarkup:
     buttons = [[]]
     if page > 0:
@@ -315,9 +399,154 @@ def archive_pagination_kb(
             )
         )
     buttons.extend(archive_repair_inline(repair_id).inline_keyboard)
+    if list_page is not None:
+        buttons.append(
+            [
+                InlineKeyboardButton(
+                    text="📋 К списку", callback_data=f"archive_list:{list_page}"
+                )
+            ]
+        )
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+# На сколько страниц переходят кнопки «-10» / «+10» списка архива.
+ARCHIVE_JUMP = 10
+
+
+def archive_list_page_inline(
+    repairs: list, first_index: int, page: int, total_pages: int
+) -> InlineKeyboardMarkup:
+    """
+    Страница списка архива: кнопки подробностей по номерам строк
+    (archive_page:<номер ремонта> открывает карточку), номера страниц
+    (archive_list:<страница>), переходы в начало/конец и на ARCHIVE_JUMP
+    страниц, ввод номера страницы. first_index — номер первого ремонта
+    страницы в списке.
+    """
+    buttons = [
+        InlineKeyboardButton(
+            text=f"🔍 {index + 1}", callback_data=f"archive_page:{index}"
+        )
+        for index in range(first_index, first_index + len(repairs))
+    ]
+    # Кнопки подробностей — по номерам строк списка, по 5 в ряд.
+    keyboard = [buttons[i : i + 5] for i in range(0, len(buttons), 5)]
+    if total_pages > 1:
+        keyboard.append(
+            page_numbers_row(page, total_pages, lambda n: f"archive_list:{n}")
+        )
+        last = total_pages - 1
+        # (текст, страница, показывать ли кнопку)
+        jumps = [
+            ("⏮", 0, page > 0),
+            (f"-{ARCHIVE_JUMP}", page - ARCHIVE_JUMP, page - ARCHIVE_JUMP >= 0),
+            (f"+{ARCHIVE_JUMP}", page + ARCHIVE_JUMP, page + ARCHIVE_JUMP <= last),
+            ("⏭", last, page < last),
+        ]
+        keyboard.append(
+            [
+                InlineKeyboardButton(text=text, callback_data=f"archive_list:{target}")
+                for text, target, shown in jumps
+                if shown
+            ]
+            + [InlineKeyboardButton(text="🔢 Страница…", callback_data="archive_goto")]
+        )
+    keyboard.append(
+        [
+            InlineKeyboardButton(
+                text="📅 Выбрать период", callback_data="archive_period"
+            )
+        ]
+    )
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+# Сколько последних месяцев с ремонтами предлагать в меню периода архива;
+# более старые выбираются календарём.
+ARCHIVE_PERIOD_MONTHS = 24
+
+
+def archive_period_inline(months: list) -> InlineKeyboardMarkup:
+    """
+    Меню периода архива: последние 2 месяца, месяцы с ремонтами
+    (months — [(год, месяц, число ремонтов), ...] от новых к старым)
+    и выбор своего периода календарём.
+    """
+    today = date.today()
+    buttons = [
+        InlineKeyboardButton(
+            text=f"{month_title(year, month)} ({count})",
+            callback_data=f"archive_month:{year}-{month:02d}",
+        )
+        for year, month, count in months[:ARCHIVE_PERIOD_MONTHS]
+    ]
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text="🕑 Последние 2 месяца", callback_data="archive_range:recent"
+            )
+        ],
+        *(buttons[i : i + 2] for i in range(0, len(buttons), 2)),
+        [
+            InlineKeyboardButton(
+                text="🗓 Свой период",
+                callback_data=f"archive_cal:start:nav:{today.year}-{today.month:02d}",
+            )
+        ],
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+WEEKDAY_NAMES = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+
+def calendar_inline(
+    year: int, month: int, prefix: str, back_callback: str
+) -> InlineKeyboardMarkup:
+    """
+    Календарь месяца для выбора даты: «◀️ Месяц ГГГГ ▶️», дни недели,
+    сетка дней и кнопка «Назад» (back_callback). Кнопки дней —
+    {prefix}:day:ГГГГ-ММ-ДД, листание месяцев — {prefix}:nav:ГГГГ-ММ;
+    пустые клетки и подписи ничего не делают.
+    """
+    index = year * 12 + month - 1
+
+    def nav(shift: int) -> str:
+        nav_year, nav_month = divmod(index + shift, 12)
+        return f"{prefix}:nav:{nav_year}-{nav_month + 1:02d}"
+
+    keyboard = [
+        [
+            InlineKeyboardButton(text="◀️", callback_data=nav(-1)),
+            InlineKeyboardButton(text=month_title(year, month), callback_data="ignore"),
+            InlineKeyboardButton(text="▶️", callback_data=nav(1)),
+        ],
+        [
+            InlineKeyboardButton(text=name, callback_data="ignore")
+            for name in WEEKDAY_NAMES
+        ],
+    ]
+    for week in calendar.monthcalendar(year, month):
+        keyboard.append(
+            [
+                InlineKeyboardButton(
+                    text=str(day) if day else " ",
+                    callback_data=(
+                        f"{prefix}:day:{date(year, month, day).isoformat()}"
+                        if day
+                        else "ignore"
+                    ),
+                )
+                for day in week
+            ]
+        )
+    keyboard.append(
+        [InlineKeyboardButton(text="⬅️ Назад", callback_data=back_callback)]
+    )
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
 def edit_repair_type_keyboard(repair_id):
     # Создаем клавиатуру с вариантами источников
     buttons = []